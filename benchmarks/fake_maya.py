@@ -0,0 +1,1559 @@
+import os
+import re
+import sys
+import tempfile
+import types
+from collections import Counter
+from fnmatch import fnmatchcase
+
+# An in-memory stand-in for maya.cmds and maya.api.OpenMaya
+#
+# Covers the commands and API classes the tools use, closely enough to run
+# them end to end outside Maya and count what they do. It is not Maya:
+# every attribute exists unless listed in TYPE_ATTRIBUTES or added with addAttr,
+# world positions only sum translations, and names are unique across the scene.
+# Commands that are not implemented are recorded and return None.
+
+# Node types with a place in the DAG, besides the ones ending in "Light"
+DAG_TYPES = ["transform", "joint", "camera", "mesh", "locator", "nurbsCurve"]
+
+# Nodes every new scene has, that the tools connect to
+DEFAULT_NODES = {
+    "defaultLightSet": "objectSet",
+    "defaultShaderList1": "defaultShaderList",
+    "defaultTextureList1": "defaultTextureList",
+    "defaultRenderUtilityList1": "defaultRenderUtilityList",
+    "renderPartition": "partition",
+    "defaultArnoldRenderOptions": "aiOptions",
+    "time1": "time",
+}
+
+COMPOUND_CHILDREN = {
+    "translate": ["translateX", "translateY", "translateZ"],
+    "rotate": ["rotateX", "rotateY", "rotateZ"],
+    "scale": ["scaleX", "scaleY", "scaleZ"],
+    "rotatePivot": ["rotatePivotX", "rotatePivotY", "rotatePivotZ"],
+    "color": ["colorR", "colorG", "colorB"],
+    "outColor": ["outColorR", "outColorG", "outColorB"],
+    "repeatUV": ["repeatU", "repeatV"],
+    "input1": ["input1X", "input1Y", "input1Z"],
+    "input2": ["input2X", "input2Y", "input2Z"],
+    "output": ["outputX", "outputY", "outputZ"],
+    "color1": ["color1R", "color1G", "color1B"],
+    "color2": ["color2R", "color2G", "color2B"],
+    "value": ["valueR", "valueG", "valueB"],
+    "colorIfTrue": ["colorIfTrueR", "colorIfTrueG", "colorIfTrueB"],
+    "colorIfFalse": ["colorIfFalseR", "colorIfFalseG", "colorIfFalseB"],
+}
+# Compounds whose children depend on the node type
+TYPE_COMPOUND_CHILDREN = {
+    ("blendColors", "output"): ["outputR", "outputG", "outputB"],
+}
+
+# Attributes only some node types have
+TYPE_ATTRIBUTES = {
+    "coneAngle": ["spotLight"],
+    "penumbraAngle": ["spotLight"],
+    "dropoff": ["spotLight"],
+}
+
+DEFAULT_VALUES = {
+    "scaleX": 1.0,
+    "scaleY": 1.0,
+    "scaleZ": 1.0,
+    "visibility": True,
+    "colorR": 1.0,
+    "colorG": 1.0,
+    "colorB": 1.0,
+    "intensity": 1.0,
+    "coneAngle": 40.0,
+    "aiColorTemperature": 6500.0,
+    "aiSamples": 1,
+    "aiDiffuse": 1.0,
+    "aiSpecular": 1.0,
+    "aiSss": 1.0,
+    "aiIndirect": 1.0,
+    "aiVolume": 1.0,
+    "aiMaxBounces": 999,
+}
+
+ANGLE_ATTRIBUTES = ["rotateX", "rotateY", "rotateZ", "coneAngle", "penumbraAngle"]
+DISTANCE_ATTRIBUTES = ["translateX", "translateY", "translateZ"]
+
+ARRAY_ELEMENT = re.compile(r"^(.*)\[(\d+)\]$")
+
+
+def is_dag_type(node_type: str):
+    return node_type in DAG_TYPES or node_type.endswith("Light")
+
+
+#############
+### Scene ###
+#############
+
+
+class FakeNode:
+    def __init__(self, node_type: str, name: str):
+        self.type = node_type
+        self.name = name
+        self.is_dag = is_dag_type(node_type)
+        self.values = {}
+        self.added_attributes = {}  # name -> parent compound or None
+        self.attribute_types = {}  # added attribute name -> attributeType
+        self.color_attributes = set()
+        self.inputs = {}  # attribute -> (source node, source attribute)
+        self.outputs = {}  # attribute -> {(destination node, destination attribute)}
+        self.parent = None
+        self.children = []
+        self.alive = True
+
+    def has_attribute(self, attribute: str):
+        attribute = get_array_name(attribute)
+        if attribute in self.added_attributes or attribute in self.values:
+            return True
+        if attribute in TYPE_ATTRIBUTES:
+            return self.type in TYPE_ATTRIBUTES[attribute]
+
+        return not attribute.startswith("mayaTools")
+
+    def get_children_attributes(self, attribute: str):
+        children = [
+            child
+            for child, parent in self.added_attributes.items()
+            if parent == attribute
+        ]
+        if children:
+            return children
+
+        type_children = TYPE_COMPOUND_CHILDREN.get((self.type, attribute))
+        return type_children or COMPOUND_CHILDREN.get(attribute, [])
+
+    def get_path(self):
+        path = []
+        node = self
+        while node is not None:
+            path.append(node.name)
+            node = node.parent
+        return "|" + "|".join(reversed(path))
+
+
+def get_array_name(attribute: str):
+    match = ARRAY_ELEMENT.match(attribute)
+    return match.group(1) if match else attribute
+
+
+class FakeScene:
+    def __init__(self):
+        self.calls = Counter()
+        self.callbacks = {}
+        self.next_callback_id = 1
+        self.option_vars = {}
+        self.controls = {}
+        self.plugins = set()
+        self.new()
+
+    # Replace every node with the default nodes of a new scene
+    def new(self):
+        self.fire_scene_event(MSceneMessage.kBeforeNew)
+        self.nodes = {}  # name -> FakeNode
+        self.name_counters = {}
+        self.selection = []  # FakeNodes, in selection order
+        for name, node_type in DEFAULT_NODES.items():
+            self.add_node(FakeNode(node_type, name), notify=False)
+        self.fire_scene_event(MSceneMessage.kAfterNew)
+
+    def add_node(self, node: FakeNode, notify: bool = True):
+        node.name = self.get_unique_name(node.name)
+        self.nodes[node.name] = node
+        if notify:
+            self.fire("node_added", MObject(node))
+        return node
+
+    def create_node(self, node_type: str, name: str = None, parent: FakeNode = None):
+        node = FakeNode(node_type, name or f"{node_type}1")
+        if parent is not None:
+            self.set_parent(node, parent)
+        return self.add_node(node)
+
+    def delete_node(self, node: FakeNode):
+        for child in list(node.children):
+            self.delete_node(child)
+        for attribute in list(node.inputs):
+            self.disconnect(*node.inputs[attribute], node, attribute)
+        for attribute, destinations in list(node.outputs.items()):
+            for destination, destination_attribute in list(destinations):
+                self.disconnect(node, attribute, destination, destination_attribute)
+        self.set_parent(node, None)
+        self.fire("node_removed", MObject(node))
+        if node in self.selection:
+            self.selection.remove(node)
+        node.alive = False
+        del self.nodes[node.name]
+
+    def rename(self, node: FakeNode, name: str):
+        previous_name = node.name
+        del self.nodes[node.name]
+        node.name = self.get_unique_name(name)
+        self.nodes[node.name] = node
+        self.fire("name_changed", MObject(node), previous_name, node=node)
+        return node.name
+
+    # Maya adds a number to names that are taken, e.g. key_light -> key_light1
+    def get_unique_name(self, name: str):
+        if name not in self.nodes:
+            return name
+
+        base_name = name.rstrip("0123456789")
+        number = self.name_counters.get(base_name, 0)
+        while True:
+            number += 1
+            candidate = f"{base_name}{number}"
+            if candidate not in self.nodes:
+                self.name_counters[base_name] = number
+                return candidate
+
+    def set_parent(self, node: FakeNode, parent: FakeNode):
+        if node.parent is not None:
+            node.parent.children.remove(node)
+        node.parent = parent
+        if parent is not None:
+            parent.children.append(node)
+
+    def find(self, name: str):
+        name = name.rpartition("|")[2]
+        node = self.nodes.get(name)
+        if node is None:
+            raise RuntimeError(f"No object matches name: {name}")
+        return node
+
+    def connect(self, source, source_attribute, destination, destination_attribute):
+        if destination_attribute in destination.inputs:
+            self.disconnect(
+                *destination.inputs[destination_attribute],
+                destination,
+                destination_attribute,
+            )
+        destination.inputs[destination_attribute] = (source, source_attribute)
+        source.outputs.setdefault(source_attribute, set()).add(
+            (destination, destination_attribute)
+        )
+
+    def disconnect(self, source, source_attribute, destination, destination_attribute):
+        destination.inputs.pop(destination_attribute, None)
+        destinations = source.outputs.get(source_attribute, set())
+        destinations.discard((destination, destination_attribute))
+        if not destinations:
+            source.outputs.pop(source_attribute, None)
+
+    def get_value(self, node: FakeNode, attribute: str):
+        children = node.get_children_attributes(attribute)
+        if children:
+            return tuple(self.get_value(node, child) for child in children)
+
+        return node.values.get(attribute, DEFAULT_VALUES.get(attribute, 0.0))
+
+    def set_value(self, node: FakeNode, attribute: str, value):
+        children = node.get_children_attributes(attribute)
+        if children and isinstance(value, (list, tuple)):
+            for child, child_value in zip(children, value):
+                self.set_value(node, child, child_value)
+            return
+
+        node.values[attribute] = value
+        self.fire("attribute_changed", MPlug(node, attribute), node=node)
+
+    # Translations summed up the hierarchy, rotation and scale are ignored
+    def get_world_position(self, node: FakeNode):
+        position = [0.0, 0.0, 0.0]
+        while node is not None:
+            for i, axis in enumerate("XYZ"):
+                position[i] += node.values.get(f"translate{axis}", 0.0)
+            node = node.parent
+        return position
+
+    # Meshes are unit cubes, a transform bounds its children and is offset by
+    # its translation, the box is in the node's parent space like Maya's
+    def get_bounding_box(self, node: FakeNode):
+        bounds = MBoundingBox()
+        if node.type == "mesh":
+            bounds.expand(MPoint(-0.5, -0.5, -0.5))
+            bounds.expand(MPoint(0.5, 0.5, 0.5))
+        for child in node.children:
+            child_bounds = self.get_bounding_box(child)
+            if not child_bounds.empty:
+                bounds.expand(child_bounds)
+        if node.type == "transform" and not bounds.empty:
+            offset = [node.values.get(f"translate{axis}", 0.0) for axis in "XYZ"]
+            bounds.transformUsing(MMatrix(offset))
+        return bounds
+
+    ##################
+    ### Callbacks ###
+    ##################
+
+    def add_callback(self, kind: str, function, client_data=None, node=None):
+        callback_id = self.next_callback_id
+        self.next_callback_id += 1
+        self.callbacks[callback_id] = (kind, function, client_data, node)
+        return callback_id
+
+    def remove_callback(self, callback_id: int):
+        self.callbacks.pop(callback_id, None)
+
+    def fire(self, kind: str, *args, node: FakeNode = None):
+        for callback_kind, function, client_data, callback_node in list(
+            self.callbacks.values()
+        ):
+            if callback_kind != kind:
+                continue
+            if callback_node is not None and callback_node is not node:
+                continue
+            function(*args, client_data)
+
+    def fire_scene_event(self, event: int):
+        self.fire(f"scene_{event}")
+
+
+
+def resolve_plug(plug_name: str):
+    node_name, _, attribute = plug_name.partition(".")
+    return scene.find(node_name), attribute
+
+
+################
+### Commands ###
+################
+
+COMMANDS = {}
+
+
+# Register a fake command, every call is counted in scene.calls
+def command(function):
+    name = function.__name__.rstrip("_")
+
+    def recorded(*args, **kwargs):
+        scene.calls[name] += 1
+        return function(*args, **kwargs)
+
+    recorded.__name__ = name
+    COMMANDS[name] = recorded
+    return recorded
+
+
+# Read a flag by its long or short name
+def get_flag(kwargs: dict, long_name: str, short_name: str = None, default=None):
+    if long_name in kwargs:
+        return kwargs[long_name]
+    if short_name is not None and short_name in kwargs:
+        return kwargs[short_name]
+    return default
+
+
+@command
+def createNode(node_type: str, **kwargs):
+    parent = get_flag(kwargs, "parent", "p")
+    name = get_flag(kwargs, "name", "n")
+    parent_node = scene.find(parent) if parent else None
+    return scene.create_node(node_type, name, parent_node).name
+
+
+@command
+def shadingNode(node_type: str, **kwargs):
+    return scene.create_node(node_type, get_flag(kwargs, "name", "n")).name
+
+
+# Only the samplePlane form, writes an empty image in place of the baked one
+@command
+def convertSolidTx(plug: str, **kwargs):
+    path = get_flag(kwargs, "fileImageName", "fin")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    return [scene.create_node("file", "file1").name]
+
+
+@command
+def sets(*objects, **kwargs):
+    renderable = get_flag(kwargs, "renderable", "r", False)
+    node_type = "shadingEngine" if renderable else "objectSet"
+    name = get_flag(kwargs, "name", "n") or "set1"
+    return scene.create_node(node_type, name).name
+
+
+@command
+def connectAttr(source: str, destination: str, **kwargs):
+    source_node, source_attribute = resolve_plug(source)
+    destination_node, destination_attribute = resolve_plug(destination)
+    force = get_flag(kwargs, "force", "f", False)
+    if destination_attribute in destination_node.inputs and not force:
+        raise RuntimeError(f"{destination} already has an incoming connection")
+    scene.connect(
+        source_node, source_attribute, destination_node, destination_attribute
+    )
+    return f"Connected {source} to {destination}."
+
+
+@command
+def disconnectAttr(source: str, destination: str, **kwargs):
+    scene.disconnect(*resolve_plug(source), *resolve_plug(destination))
+
+
+@command
+def setAttr(plug: str, *values, **kwargs):
+    node, attribute = resolve_plug(plug)
+    scene.set_value(node, attribute, values[0] if len(values) == 1 else values)
+
+
+@command
+def getAttr(plug: str, **kwargs):
+    node, attribute = resolve_plug(plug)
+    value = scene.get_value(node, attribute)
+    # Compound attributes come back as a list of one tuple
+    return [value] if isinstance(value, tuple) else value
+
+
+@command
+def addAttr(*args, **kwargs):
+    node = scene.find(args[0])
+    name = get_flag(kwargs, "longName", "ln")
+    node.added_attributes[name] = get_flag(kwargs, "parent", "p")
+    node.attribute_types[name] = get_flag(kwargs, "attributeType", "at", "double")
+    if get_flag(kwargs, "usedAsColor", "uac", False):
+        node.color_attributes.add(name)
+    default = get_flag(kwargs, "defaultValue", "dv")
+    if default is not None:
+        node.values[name] = default
+
+
+@command
+def deleteAttr(plug: str, **kwargs):
+    node, attribute = resolve_plug(plug)
+    node.added_attributes.pop(attribute, None)
+    node.values.pop(attribute, None)
+
+
+@command
+def attributeQuery(attribute: str, **kwargs):
+    node = scene.find(get_flag(kwargs, "node", "n"))
+    if get_flag(kwargs, "attributeType", "at", False):
+        return node.attribute_types.get(attribute, "double")
+    if get_flag(kwargs, "usedAsColor", "uac", False):
+        return attribute in node.color_attributes
+    if get_flag(kwargs, "listChildren", "lc", False):
+        return node.get_children_attributes(attribute) or None
+    if get_flag(kwargs, "listParent", "lp", False):
+        parent = node.added_attributes.get(attribute)
+        return [parent] if parent else None
+    if get_flag(kwargs, "listDefault", "ld", False):
+        children = node.get_children_attributes(attribute) or [attribute]
+        return [float(DEFAULT_VALUES.get(child, 0.0)) for child in children]
+    return node.has_attribute(attribute)
+
+
+@command
+def listAttr(name: str, **kwargs):
+    node = scene.find(name)
+    if get_flag(kwargs, "userDefined", "ud", False):
+        return list(node.added_attributes) or None
+    return list(node.values) or None
+
+
+# Only the connections=True, plugs=True form, as (this plug, other plug) pairs
+@command
+def listConnections(name: str, **kwargs):
+    node = scene.find(name)
+    result = []
+    if get_flag(kwargs, "source", "s", True):
+        for attribute, (source, source_attribute) in node.inputs.items():
+            result += [f"{node.name}.{attribute}", f"{source.name}.{source_attribute}"]
+    if get_flag(kwargs, "destination", "d", True):
+        for attribute, destinations in node.outputs.items():
+            for destination, destination_attribute in destinations:
+                result += [
+                    f"{node.name}.{attribute}",
+                    f"{destination.name}.{destination_attribute}",
+                ]
+    return result or None
+
+
+@command
+def nodeType(name: str, **kwargs):
+    return scene.find(name).type
+
+
+@command
+def objExists(name: str):
+    node_name, _, attribute = name.rpartition("|")[2].partition(".")
+    node = scene.nodes.get(node_name)
+    if node is None:
+        return False
+    return not attribute or node.has_attribute(attribute)
+
+
+@command
+def ls(*patterns, **kwargs):
+    node_type = get_flag(kwargs, "type", "typ")
+    node_types = [node_type] if isinstance(node_type, str) else node_type
+    nodes = list(scene.nodes.values())
+    if patterns:
+        pattern_list = []
+        for pattern in patterns:
+            pattern_list.extend([pattern] if isinstance(pattern, str) else pattern)
+        nodes = [
+            node
+            for node in nodes
+            if any(
+                fnmatchcase(node.name, pattern)
+                or fnmatchcase(node.name.rpartition(":")[2], pattern)
+                for pattern in pattern_list
+            )
+        ]
+    if node_types:
+        nodes = [node for node in nodes if node.type in node_types]
+    if get_flag(kwargs, "long", "l", False):
+        return [node.get_path() for node in nodes]
+    return [node.name for node in nodes]
+
+
+@command
+def listRelatives(name: str = None, **kwargs):
+    node = scene.find(name)
+    if get_flag(kwargs, "parent", "p", False):
+        nodes = [node.parent] if node.parent is not None else []
+    elif get_flag(kwargs, "allDescendents", "ad", False):
+        nodes = []
+        stack = list(node.children)
+        while stack:
+            child = stack.pop()
+            nodes.append(child)
+            stack.extend(child.children)
+    else:
+        nodes = list(node.children)
+        if get_flag(kwargs, "shapes", "s", False):
+            nodes = [child for child in nodes if child.type != "transform"]
+
+    node_type = get_flag(kwargs, "type", "typ")
+    if node_type is not None:
+        node_types = [node_type] if isinstance(node_type, str) else node_type
+        nodes = [child for child in nodes if child.type in node_types]
+    if not nodes:
+        return None
+    if get_flag(kwargs, "fullPath", "f", False):
+        return [child.get_path() for child in nodes]
+    return [child.name for child in nodes]
+
+
+@command
+def group(*objects, **kwargs):
+    name = get_flag(kwargs, "name", "n") or "group1"
+    parent = get_flag(kwargs, "parent", "p")
+    group_node = scene.create_node(
+        "transform", name, scene.find(parent) if parent else None
+    )
+    for name in objects:
+        scene.set_parent(scene.find(name), group_node)
+    return group_node.name
+
+
+@command
+def parent(*args, **kwargs):
+    if get_flag(kwargs, "world", "w", False):
+        children, parent_node = args, None
+    else:
+        children, parent_node = args[:-1], scene.find(args[-1])
+    for name in children:
+        scene.set_parent(scene.find(name), parent_node)
+    return [scene.find(name).name for name in children]
+
+
+@command
+def rename(name: str, new_name: str, **kwargs):
+    return scene.rename(scene.find(name), new_name)
+
+
+@command
+def delete(*names, **kwargs):
+    for name in names:
+        for node_name in [name] if isinstance(name, str) else name:
+            node = scene.nodes.get(node_name.rpartition("|")[2])
+            if node is not None and node.alive:
+                scene.delete_node(node)
+
+
+@command
+def select(*names, **kwargs):
+    if get_flag(kwargs, "clear", "cl", False):
+        scene.selection = []
+        return
+    if not get_flag(kwargs, "add", "add", False):
+        scene.selection = []
+    for name in names:
+        for node_name in [name] if isinstance(name, str) else name:
+            node = scene.find(node_name)
+            if node not in scene.selection:
+                scene.selection.append(node)
+
+
+@command
+def xform(name: str, **kwargs):
+    node = scene.find(name)
+    if get_flag(kwargs, "query", "q", False):
+        if get_flag(kwargs, "worldSpace", "ws", False):
+            return scene.get_world_position(node)
+        return list(scene.get_value(node, "translate"))
+
+    translation = get_flag(kwargs, "translation", "t")
+    if translation is not None:
+        scene.set_value(node, "translate", translation)
+
+
+def set_transform(attribute: str, args: tuple):
+    values, names = args[:3], args[3:] or ()
+    for name in names:
+        scene.set_value(scene.find(name), attribute, values)
+
+
+@command
+def move(*args, **kwargs):
+    set_transform("translate", args)
+
+
+@command
+def rotate(*args, **kwargs):
+    set_transform("rotate", args)
+
+
+@command
+def scale(*args, **kwargs):
+    set_transform("scale", args)
+
+
+# Light and camera commands create a transform with a shape under it
+def create_shape(shape_type: str, name: str = None):
+    transform = scene.create_node("transform", name or f"{shape_type}1")
+    shape_name = transform.name.replace(shape_type, f"{shape_type}Shape")
+    if shape_name == transform.name:
+        shape_name = f"{transform.name}Shape"
+    return transform, scene.create_node(shape_type, shape_name, transform)
+
+
+@command
+def camera(**kwargs):
+    transform, shape = create_shape("camera", get_flag(kwargs, "name", "n"))
+    return [transform.name, shape.name]
+
+
+def add_light_command(light_type: str):
+    def light_command(**kwargs):
+        _, shape = create_shape(light_type, get_flag(kwargs, "name", "n"))
+        for flag, attribute in [
+            ("coneAngle", "coneAngle"),
+            ("penumbra", "penumbraAngle"),
+            ("intensity", "intensity"),
+        ]:
+            if flag in kwargs:
+                scene.set_value(shape, attribute, kwargs[flag])
+        return shape.name
+
+    light_command.__name__ = light_type
+    command(light_command)
+
+
+for light_type in ["spotLight", "pointLight", "directionalLight", "ambientLight"]:
+    add_light_command(light_type)
+
+
+@command
+def file(*args, **kwargs):
+    if get_flag(kwargs, "new", "f", False):
+        scene.new()
+
+
+@command
+def undoInfo(**kwargs):
+    if get_flag(kwargs, "query", "q", False):
+        return True
+
+
+@command
+def error(message: str = "", **kwargs):
+    raise RuntimeError(message)
+
+
+@command
+def warning(message: str = "", **kwargs):
+    print(f"Warning: {message}")
+
+
+@command
+def optionVar(**kwargs):
+    for flag, short_name in [
+        ("stringValue", "sv"),
+        ("intValue", "iv"),
+        ("floatValue", "fv"),
+    ]:
+        value = get_flag(kwargs, flag, short_name)
+        if value is not None:
+            scene.option_vars[value[0]] = value[1]
+            return
+    name = get_flag(kwargs, "exists", "ex")
+    if name is not None:
+        return name in scene.option_vars
+    name = get_flag(kwargs, "remove", "rm")
+    if name is not None:
+        scene.option_vars.pop(name, None)
+        return
+    return scene.option_vars.get(get_flag(kwargs, "query", "q"))
+
+
+# UI controls only keep their values, so dialogs can be filled in and queried
+def add_control_command(control_type: str):
+    def control_command(name: str = None, **kwargs):
+        if get_flag(kwargs, "exists", "ex", False):
+            return name in scene.controls
+        if get_flag(kwargs, "query", "q", False):
+            return scene.controls.get(name, {}).get("value")
+
+        if name in scene.controls:
+            value = get_flag(kwargs, "value", "v")
+            if value is not None:
+                scene.controls[name]["value"] = value
+            return name
+
+        control_name = name or f"{control_type}{len(scene.controls) + 1}"
+        scene.controls[control_name] = {"value": get_flag(kwargs, "value", "v")}
+        return control_name
+
+    control_command.__name__ = control_type
+    command(control_command)
+
+
+for control_type in ["window", "checkBox", "button", "columnLayout", "text"]:
+    add_control_command(control_type)
+
+
+@command
+def deleteUI(*names, **kwargs):
+    for name in names:
+        scene.controls.pop(name, None)
+
+
+@command
+def showWindow(*args, **kwargs):
+    pass
+
+
+@command
+def playbackOptions(**kwargs):
+    if get_flag(kwargs, "minTime", "min", False):
+        return 1.0
+    if get_flag(kwargs, "maxTime", "max", False):
+        return 120.0
+
+
+@command
+def currentTime(*args, **kwargs):
+    return 1.0
+
+
+@command
+def evaluationManager(**kwargs):
+    return ["off"]
+
+
+@command
+def about(**kwargs):
+    return "fake"
+
+
+@command
+def internalVar(**kwargs):
+    return tempfile.gettempdir() + "/"
+
+
+@command
+def dgtimer(**kwargs):
+    return 0.0
+
+
+@command
+def evalDeferred(function=None, **kwargs):
+    if callable(function):
+        function()
+
+
+# Plugins are only recorded, their nodes are created like any other type
+@command
+def loadPlugin(path: str, **kwargs):
+    scene.plugins.add(os.path.splitext(os.path.basename(path))[0])
+
+
+@command
+def pluginInfo(name: str, **kwargs):
+    return name in scene.plugins
+
+
+@command
+def getModulePath(**kwargs):
+    raise RuntimeError("Module not found")
+
+
+def get_unimplemented_command(name: str):
+    if name.startswith("__"):
+        raise AttributeError(name)
+
+    def unimplemented_command(*args, **kwargs):
+        scene.calls[name] += 1
+
+    unimplemented_command.__name__ = name
+    return unimplemented_command
+
+
+##################
+### OpenMaya 2 ###
+##################
+
+
+class MFn:
+    kInvalid = 0
+    kDependencyNode = 1
+    kDagNode = 2
+    kTransform = 3
+    kAttribute = 4
+    kUnitAttribute = 5
+
+
+class MSpace:
+    kTransform = 1
+    kPreTransform = 2
+    kPostTransform = 3
+    kWorld = 4
+    kObject = kPreTransform
+
+
+class FakeAttribute:
+    def __init__(self, name: str):
+        self.name = name
+        self.unit_type = None
+        base_name = get_array_name(name)
+        if base_name in ANGLE_ATTRIBUTES:
+            self.unit_type = MFnUnitAttribute.kAngle
+        elif base_name in DISTANCE_ATTRIBUTES:
+            self.unit_type = MFnUnitAttribute.kDistance
+
+
+class MObject:
+    kNullObj = None
+
+    def __init__(self, node=None):
+        if isinstance(node, MObject):
+            node = node.node
+        self.node = node
+
+    def isNull(self):
+        return self.node is None
+
+    def hasFn(self, function_type: int):
+        if isinstance(self.node, FakeAttribute):
+            if function_type == MFn.kUnitAttribute:
+                return self.node.unit_type is not None
+            return function_type == MFn.kAttribute
+        if self.node is None:
+            return False
+        if function_type == MFn.kDependencyNode:
+            return True
+        if function_type == MFn.kDagNode:
+            return self.node.is_dag
+        if function_type == MFn.kTransform:
+            return self.node.type == "transform"
+        return False
+
+    def apiType(self):
+        return MFn.kDagNode if self.hasFn(MFn.kDagNode) else MFn.kDependencyNode
+
+    def __eq__(self, other):
+        return isinstance(other, MObject) and self.node is other.node
+
+    def __hash__(self):
+        return id(self.node)
+
+
+MObject.kNullObj = MObject()
+
+
+class MObjectHandle:
+    def __init__(self, node: MObject = None):
+        self.node = node.node if node is not None else None
+
+    def object(self):
+        return MObject(self.node)
+
+    def isValid(self):
+        return self.node is not None and self.node.alive
+
+    def isAlive(self):
+        return self.isValid()
+
+    def hashCode(self):
+        return id(self.node)
+
+
+class MAngle:
+    kDegrees = 2
+
+    def __init__(self, value: float = 0, unit: int = kDegrees):
+        self.value = value
+
+    @staticmethod
+    def uiUnit():
+        return MAngle.kDegrees
+
+    def asUnits(self, unit: int):
+        return self.value
+
+
+class MDistance:
+    kCentimeters = 6
+
+    def __init__(self, value: float = 0, unit: int = kCentimeters):
+        self.value = value
+
+    @staticmethod
+    def uiUnit():
+        return MDistance.kCentimeters
+
+    def asUnits(self, unit: int):
+        return self.value
+
+
+class MFnUnitAttribute:
+    kInvalid = 0
+    kAngle = 1
+    kDistance = 2
+    kTime = 3
+
+    def __init__(self, attribute: MObject = None):
+        self.attribute = attribute.node if attribute is not None else None
+
+    def create(self, long_name: str, short_name: str, unit_type: int):
+        self.attribute = FakeAttribute(long_name)
+        self.attribute.unit_type = unit_type
+        return MObject(self.attribute)
+
+    def unitType(self):
+        return self.attribute.unit_type or MFnUnitAttribute.kInvalid
+
+    keyable = property(lambda self: True, lambda self, value: None)
+
+
+UNIT_ATTRIBUTE_TYPES = {
+    MFnUnitAttribute.kAngle: "doubleAngle",
+    MFnUnitAttribute.kDistance: "doubleLinear",
+}
+
+
+class MFnNumericData:
+    kBoolean = 1
+    kInt = 7
+    kFloat = 10
+    kDouble = 11
+
+
+# Attributes are created detached and added to a node by a modifier
+class MFnNumericAttribute:
+    def __init__(self):
+        self.attribute = None
+
+    def create(self, long_name: str, short_name: str, *args):
+        self.attribute = FakeAttribute(long_name)
+        self.attribute.children = [
+            arg.node for arg in args if isinstance(arg, MObject)
+        ]
+        return MObject(self.attribute)
+
+    def createColor(self, long_name: str, short_name: str):
+        attribute = self.create(long_name, short_name)
+        self.attribute.children = [
+            FakeAttribute(f"{long_name}{channel}") for channel in "RGB"
+        ]
+        return attribute
+
+    keyable = property(lambda self: True, lambda self, value: None)
+    usedAsColor = property(lambda self: False, lambda self, value: None)
+
+
+class MPoint:
+    def __init__(self, x: float = 0, y: float = 0, z: float = 0, w: float = 1):
+        self.x, self.y, self.z, self.w = x, y, z, w
+
+    def __getitem__(self, index: int):
+        return (self.x, self.y, self.z, self.w)[index]
+
+
+MVector = MPoint
+
+
+class MPlug:
+    def __init__(self, node: FakeNode = None, attribute: str = None):
+        self.fake_node = node
+        self.attribute_name = attribute
+
+    def isNull(self):
+        return self.fake_node is None
+
+    def node(self):
+        return MObject(self.fake_node)
+
+    def name(self):
+        return f"{self.fake_node.name}.{self.attribute_name}"
+
+    def partialName(self, *args, **kwargs):
+        return self.attribute_name
+
+    def attribute(self):
+        return MObject(FakeAttribute(self.attribute_name))
+
+    def child(self, index: int):
+        children = self.fake_node.get_children_attributes(self.attribute_name)
+        return MPlug(self.fake_node, children[index])
+
+    def numChildren(self):
+        return len(self.fake_node.get_children_attributes(self.attribute_name))
+
+    @property
+    def isCompound(self):
+        return self.numChildren() > 0
+
+    def elementByLogicalIndex(self, index: int):
+        return MPlug(self.fake_node, f"{self.attribute_name}[{index}]")
+
+    def getExistingArrayAttributeIndices(self):
+        indices = set()
+        prefix = f"{self.attribute_name}["
+        for attribute in [
+            *self.fake_node.values,
+            *self.fake_node.inputs,
+            *self.fake_node.outputs,
+        ]:
+            if attribute.startswith(prefix):
+                indices.add(int(attribute[len(prefix) :].partition("]")[0]))
+        return sorted(indices)
+
+    def connectedTo(self, as_destination: bool, as_source: bool):
+        plugs = []
+        if as_destination and self.attribute_name in self.fake_node.inputs:
+            plugs.append(MPlug(*self.fake_node.inputs[self.attribute_name]))
+        if as_source:
+            for destination in self.fake_node.outputs.get(self.attribute_name, []):
+                plugs.append(MPlug(*destination))
+        return plugs
+
+    def source(self):
+        sources = self.connectedTo(True, False)
+        return sources[0] if sources else MPlug()
+
+    @property
+    def isConnected(self):
+        return bool(self.connectedTo(True, True))
+
+    def get_value(self):
+        return scene.get_value(self.fake_node, self.attribute_name)
+
+    def asDouble(self):
+        return float(self.get_value())
+
+    asFloat = asDouble
+
+    def asInt(self):
+        return int(self.get_value())
+
+    def asBool(self):
+        return bool(self.get_value())
+
+    def asString(self):
+        value = self.get_value()
+        return value if isinstance(value, str) else ""
+
+    def asMAngle(self):
+        return MAngle(self.asDouble())
+
+    def asMDistance(self):
+        return MDistance(self.asDouble())
+
+    def setDouble(self, value: float):
+        scene.set_value(self.fake_node, self.attribute_name, value)
+
+    setFloat = setInt = setBool = setString = setDouble
+
+
+class MFnDependencyNode:
+    def __init__(self, node: MObject = None):
+        self.fake_node = node.node if node is not None else None
+
+    def setObject(self, node: MObject):
+        self.fake_node = node.node
+        return self
+
+    def object(self):
+        return MObject(self.fake_node)
+
+    def name(self):
+        return self.fake_node.name
+
+    @property
+    def typeName(self):
+        return self.fake_node.type
+
+    def hasAttribute(self, attribute: str):
+        return self.fake_node.has_attribute(attribute)
+
+    def findPlug(self, attribute: str, want_networked_plug: bool = False):
+        if not self.fake_node.has_attribute(attribute):
+            raise RuntimeError(f"{self.fake_node.name} has no attribute {attribute}")
+        return MPlug(self.fake_node, attribute)
+
+    def getConnections(self):
+        attributes = {*self.fake_node.inputs, *self.fake_node.outputs}
+        return [MPlug(self.fake_node, attribute) for attribute in sorted(attributes)]
+
+
+class MFnDagNode(MFnDependencyNode):
+    def __init__(self, node=None):
+        if isinstance(node, MDagPath):
+            node = MObject(node.fake_node)
+        super().__init__(node)
+
+    @property
+    def boundingBox(self):
+        return scene.get_bounding_box(self.fake_node)
+
+    def partialPathName(self):
+        return self.fake_node.name
+
+    def fullPathName(self):
+        return self.fake_node.get_path()
+
+    def parentCount(self):
+        return 1 if self.fake_node.parent is not None else 0
+
+    def parent(self, index: int = 0):
+        return MObject(self.fake_node.parent)
+
+    def childCount(self):
+        return len(self.fake_node.children)
+
+    def child(self, index: int):
+        return MObject(self.fake_node.children[index])
+
+    def getPath(self):
+        return MDagPath(self.fake_node)
+
+
+class MDagPath:
+    def __init__(self, node=None):
+        if isinstance(node, MDagPath):
+            node = node.fake_node
+        self.fake_node = node
+
+    def node(self):
+        return MObject(self.fake_node)
+
+    def transform(self):
+        node = self.fake_node
+        if node.type != "transform" and node.parent is not None:
+            node = node.parent
+        return MObject(node)
+
+    def extendToShape(self):
+        for child in self.fake_node.children:
+            if child.type != "transform":
+                self.fake_node = child
+                return self
+        raise RuntimeError(f"{self.fake_node.name} has no shape")
+
+    def partialPathName(self):
+        return self.fake_node.name
+
+    def fullPathName(self):
+        return self.fake_node.get_path()
+
+    def isValid(self):
+        return self.fake_node is not None and self.fake_node.alive
+
+    def exclusiveMatrix(self):
+        parent = self.fake_node.parent
+        offset = scene.get_world_position(parent) if parent else [0.0] * 3
+        return MMatrix(offset)
+
+    def inclusiveMatrix(self):
+        return MMatrix(scene.get_world_position(self.fake_node))
+
+
+class MFnTransform(MFnDagNode):
+    def rotatePivot(self, space: int = MSpace.kTransform):
+        if space == MSpace.kWorld:
+            return MPoint(*scene.get_world_position(self.fake_node))
+        return MPoint()
+
+    def translation(self, space: int = MSpace.kTransform):
+        return MVector(*scene.get_value(self.fake_node, "translate"))
+
+
+class MSelectionList:
+    def __init__(self):
+        self.items = []
+
+    def add(self, name: str):
+        node_name, _, attribute = name.partition(".")
+        node = scene.find(node_name)
+        if attribute and not node.has_attribute(attribute):
+            raise RuntimeError(f"No object matches name: {name}")
+        self.items.append((node, attribute))
+        return self
+
+    def length(self):
+        return len(self.items)
+
+    def getDependNode(self, index: int):
+        return MObject(self.items[index][0])
+
+    def getDagPath(self, index: int):
+        node = self.items[index][0]
+        if not node.is_dag:
+            raise TypeError(f"{node.name} is not a DAG node")
+        return MDagPath(node)
+
+    def getPlug(self, index: int):
+        node, attribute = self.items[index]
+        return MPlug(node, attribute)
+
+
+class MItSelectionList:
+    def __init__(self, selection: MSelectionList, node_filter: int = MFn.kInvalid):
+        self.selection = selection
+        self.indices = [
+            i
+            for i in range(selection.length())
+            if node_filter != MFn.kDagNode or selection.items[i][0].is_dag
+        ]
+        self.index = 0
+
+    def isDone(self):
+        return self.index >= len(self.indices)
+
+    def getDagPath(self):
+        return self.selection.getDagPath(self.indices[self.index])
+
+    def getDependNode(self):
+        return self.selection.getDependNode(self.indices[self.index])
+
+    def next(self):
+        self.index += 1
+
+
+class MGlobal:
+    @staticmethod
+    def getActiveSelectionList():
+        selection = MSelectionList()
+        selection.items = [(node, "") for node in scene.selection]
+        return selection
+
+
+class MItDependencyNodes:
+    def __init__(self, *filters):
+        self.nodes = list(scene.nodes.values())
+        self.index = 0
+
+    def isDone(self):
+        return self.index >= len(self.nodes)
+
+    def thisNode(self):
+        return MObject(self.nodes[self.index])
+
+    def next(self):
+        self.index += 1
+
+
+# Operations are queued and only applied to the scene on doIt()
+class MDGModifier:
+    def __init__(self):
+        self.operations = []
+        self.undo_operations = []
+
+    def createNode(self, node_type: str):
+        node = FakeNode(node_type, f"{node_type}1")
+        self.operations.append(("create", node, None))
+        return MObject(node)
+
+    def renameNode(self, node: MObject, name: str):
+        self.operations.append(("rename", node.node, name))
+
+    def addAttribute(self, node: MObject, attribute: MObject):
+        self.operations.append(("add_attribute", node.node, attribute.node))
+
+    def deleteNode(self, node: MObject):
+        self.operations.append(("delete", node.node, None))
+
+    def connect(self, source: MPlug, destination: MPlug):
+        self.operations.append(("connect", source, destination))
+
+    def disconnect(self, source: MPlug, destination: MPlug):
+        self.operations.append(("disconnect", source, destination))
+
+    def newPlugValue(self, plug: MPlug, value):
+        self.operations.append(("set", plug, value))
+
+    def newPlugValueDouble(self, plug: MPlug, value: float):
+        self.newPlugValue(plug, value)
+
+    newPlugValueFloat = newPlugValueInt = newPlugValueBool = newPlugValueDouble
+    newPlugValueString = newPlugValueDouble
+
+    def newPlugValueMAngle(self, plug: MPlug, value: MAngle):
+        self.newPlugValue(plug, value.value)
+
+    newPlugValueMDistance = newPlugValueMAngle
+
+    def doIt(self):
+        scene.calls[f"{type(self).__name__}.doIt"] += 1
+        operations, self.operations = self.operations, []
+        for operation in operations:
+            self.apply(*operation)
+
+    def apply(self, kind: str, first, second):
+        if kind == "create":
+            create_modifier_node(first, second)
+            self.undo_operations.append(lambda: scene.delete_node(first))
+        elif kind == "rename":
+            previous_name = first.name
+            scene.rename(first, second)
+            self.undo_operations.append(lambda: scene.rename(first, previous_name))
+        elif kind == "delete":
+            scene.delete_node(first)
+        elif kind == "add_attribute":
+            first.added_attributes[second.name] = None
+            if second.unit_type in UNIT_ATTRIBUTE_TYPES:
+                first.attribute_types[second.name] = UNIT_ATTRIBUTE_TYPES[
+                    second.unit_type
+                ]
+            for child in getattr(second, "children", []):
+                first.added_attributes[child.name] = second.name
+        elif kind == "connect":
+            plugs = (first.fake_node, first.attribute_name)
+            plugs += (second.fake_node, second.attribute_name)
+            scene.connect(*plugs)
+            self.undo_operations.append(lambda: scene.disconnect(*plugs))
+        elif kind == "disconnect":
+            plugs = (first.fake_node, first.attribute_name)
+            plugs += (second.fake_node, second.attribute_name)
+            scene.disconnect(*plugs)
+            self.undo_operations.append(lambda: scene.connect(*plugs))
+        elif kind == "set":
+            previous_value = first.get_value()
+            scene.set_value(first.fake_node, first.attribute_name, second)
+            self.undo_operations.append(
+                lambda: scene.set_value(
+                    first.fake_node, first.attribute_name, previous_value
+                )
+            )
+        elif kind == "reparent":
+            previous_parent = first.parent
+            scene.set_parent(first, second)
+            self.undo_operations.append(
+                lambda: scene.set_parent(first, previous_parent)
+            )
+
+    def undoIt(self):
+        while self.undo_operations:
+            self.undo_operations.pop()()
+
+
+class MDagModifier(MDGModifier):
+    def createNode(self, node_type: str, parent: MObject = MObject.kNullObj):
+        node = FakeNode(node_type, f"{node_type}1")
+        parent_node = parent.node if parent is not None else None
+        self.operations.append(("create", node, parent_node))
+        return MObject(node)
+
+    def reparentNode(self, node: MObject, parent: MObject = MObject.kNullObj):
+        parent_node = parent.node if parent is not None else None
+        self.operations.append(("reparent", node.node, parent_node))
+
+
+# The modifier creates its node objects up front so the MObjects it returns
+# point at the nodes once they are in the scene
+# Shapes created without a parent get a transform, like in Maya
+def create_modifier_node(node: FakeNode, parent: FakeNode = None):
+    if parent is None and node.is_dag and node.type != "transform":
+        parent = scene.create_node("transform", "transform1")
+    if parent is not None:
+        scene.set_parent(node, parent)
+    return scene.add_node(node)
+
+
+class MMessage:
+    @staticmethod
+    def removeCallback(callback_id: int):
+        scene.remove_callback(callback_id)
+
+    @staticmethod
+    def removeCallbacks(callback_ids: list):
+        for callback_id in callback_ids:
+            scene.remove_callback(callback_id)
+
+
+class MDGMessage(MMessage):
+    @staticmethod
+    def addNodeAddedCallback(function, node_type: str = "dependNode", client_data=None):
+        return scene.add_callback("node_added", function, client_data)
+
+    @staticmethod
+    def addNodeRemovedCallback(
+        function, node_type: str = "dependNode", client_data=None
+    ):
+        return scene.add_callback("node_removed", function, client_data)
+
+
+class MNodeMessage(MMessage):
+    kConnectionMade = 1
+    kConnectionBroken = 2
+    kAttributeSet = 8
+
+    @staticmethod
+    def addNameChangedCallback(node: MObject, function, client_data=None):
+        return scene.add_callback("name_changed", function, client_data, node.node)
+
+    @staticmethod
+    def addAttributeChangedCallback(node: MObject, function, client_data=None):
+        def on_attribute_changed(plug, client_data):
+            function(MNodeMessage.kAttributeSet, plug, MPlug(), client_data)
+
+        return scene.add_callback(
+            "attribute_changed", on_attribute_changed, client_data, node.node
+        )
+
+
+class MSceneMessage(MMessage):
+    kBeforeNew = 1
+    kAfterNew = 2
+    kBeforeOpen = 3
+    kAfterOpen = 4
+    kBeforeSave = 5
+    kAfterSave = 6
+    kMayaExiting = 7
+
+    @staticmethod
+    def addCallback(event: int, function, client_data=None):
+        return scene.add_callback(f"scene_{event}", function, client_data)
+
+
+# Enough of the plugin API to import plugin modules, their nodes never compute
+class MTypeId:
+    def __init__(self, value: int):
+        self.value = value
+
+
+class MPxNode:
+    kDependNode = 0
+    kParallel = 3
+
+
+class MDataBlock:
+    pass
+
+
+# Translation only, rotation and scale are ignored like get_world_position
+class MMatrix:
+    def __init__(self, translation: list = None):
+        self.translation = list(translation or [0.0, 0.0, 0.0])
+
+
+class MBoundingBox:
+    def __init__(self):
+        self.empty = True
+        self.min = MPoint()
+        self.max = MPoint()
+
+    def expand(self, other):
+        if isinstance(other, MBoundingBox):
+            if other.empty:
+                return self
+            self.expand(other.min)
+            return self.expand(other.max)
+        if self.empty:
+            self.min = MPoint(other.x, other.y, other.z)
+            self.max = MPoint(other.x, other.y, other.z)
+            self.empty = False
+            return self
+        self.min = MPoint(*[min(a, b) for a, b in zip(self.min, other)][:3])
+        self.max = MPoint(*[max(a, b) for a, b in zip(self.max, other)][:3])
+        return self
+
+    def transformUsing(self, matrix: MMatrix):
+        x, y, z = matrix.translation
+        self.min = MPoint(self.min.x + x, self.min.y + y, self.min.z + z)
+        self.max = MPoint(self.max.x + x, self.max.y + y, self.max.z + z)
+        return self
+
+    center = property(
+        lambda self: MPoint(
+            *[(a + b) / 2 for a, b in zip(self.min[:3], self.max[:3])]
+        )
+    )
+    width = property(lambda self: self.max.x - self.min.x)
+    height = property(lambda self: self.max.y - self.min.y)
+    depth = property(lambda self: self.max.z - self.min.z)
+
+
+scene = FakeScene()
+
+
+###############
+### Install ###
+###############
+
+
+def make_module(name: str, attributes: dict):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+
+def build_modules():
+    cmds = make_module("maya.cmds", dict(COMMANDS))
+    cmds.__getattr__ = get_unimplemented_command
+    open_maya = make_module(
+        "maya.api.OpenMaya",
+        {
+            name: value
+            for name, value in globals().items()
+            if name.startswith("M") and isinstance(value, type)
+        },
+    )
+    mel = make_module("maya.mel", {"eval": lambda script: ""})
+    utils = make_module(
+        "maya.utils",
+        {
+            "executeDeferred": lambda function, *args: function(*args),
+            "executeInMainThreadWithResult": lambda function, *args: function(*args),
+        },
+    )
+    api = make_module("maya.api", {"OpenMaya": open_maya})
+    maya = make_module(
+        "maya", {"cmds": cmds, "mel": mel, "utils": utils, "api": api}
+    )
+    maya.__path__ = []
+    api.__path__ = []
+    return {
+        "maya": maya,
+        "maya.cmds": cmds,
+        "maya.mel": mel,
+        "maya.utils": utils,
+        "maya.api": api,
+        "maya.api.OpenMaya": open_maya,
+    }
+
+
+# Put the fake modules in place of maya, must run before any tool is imported
+def install():
+    sys.modules.update(build_modules())
+    return scene
@@ -0,0 +1,374 @@
+import argparse
+import importlib
+import json
+import platform
+import sys
+import time
+
+from . import fake_maya
+
+DEFAULT_COUNTS = [1, 10, 100]
+DEFAULT_REPEATS = 3
+
+# Texture maps given to each synthetic material, paths are never read
+MATERIAL_CHANNELS = ["albedo", "roughness", "normal", "metallic"]
+
+backend = None  # "fake" or "maya"
+
+
+def import_tool(module: str):
+    return importlib.import_module(f"..src.{module}", package=__package__)
+
+
+# Start Maya without its UI, or put the fake modules in its place
+def set_up_backend(use_fake: bool):
+    global backend
+    if use_fake:
+        fake_maya.install()
+        backend = "fake"
+        return
+
+    import maya.standalone
+
+    maya.standalone.initialize(name="python")
+    from maya import cmds
+
+    try:
+        cmds.loadPlugin("mtoa", quiet=True)
+    except RuntimeError:
+        print("Could not load mtoa, the Arnold attributes will be missing")
+    backend = "maya"
+
+
+def new_scene():
+    from maya import cmds
+
+    cmds.file(new=True, force=True)
+
+
+def get_backend_version():
+    from maya import cmds
+
+    return cmds.about(version=True)
+
+
+def count_nodes():
+    import maya.api.OpenMaya as om
+
+    count = 0
+    node_iterator = om.MItDependencyNodes()
+    while not node_iterator.isDone():
+        count += 1
+        node_iterator.next()
+    return count
+
+
+# Count the commands the benchmark runs
+# The fake counts its own commands and modifier doIt calls,
+# in Maya every maya.cmds call is wrapped while the benchmark runs
+def run_counting_calls(run, *args):
+    if backend == "fake":
+        calls_before = fake_maya.scene.calls.copy()
+        run(*args)
+        return dict(fake_maya.scene.calls - calls_before)
+
+    rig_profiler = import_tool("utils.rig_profiler")
+    with rig_profiler.CmdsCallTimer() as call_timer:
+        run(*args)
+    return {command: call["count"] for command, call in call_timer.calls.items()}
+
+
+##############
+### Scenes ###
+##############
+
+
+# The character, key light and character light rig of one shot
+def get_shot_specs(namespace: str = "", offset: float = 0):
+    environment_lighting = import_tool("environment_lighting.environment_lighting")
+    rig = {"name": f"{namespace}{environment_lighting.CHARACTER_RIG_NAME}"}
+    key = {
+        "name": f"{namespace}{environment_lighting.CHARACTER_KEY_NAME}",
+        "type": "spotLight",
+        "parent": rig,
+        "transform_attributes": {"translate": (offset + 5, 6, 5)},
+        "attributes": {"aiUseColorTemperature": True, "aiColorTemperature": 5200},
+    }
+    character = {
+        "name": f"{namespace}{environment_lighting.CHARACTER_NAME}",
+        "transform_attributes": {"translate": (offset, 1, 0)},
+    }
+    return [rig, key, character]
+
+
+def create_character_shots(count: int):
+    from maya import cmds
+
+    light_builder = import_tool("utils.light_builder")
+    specs = []
+    for i in range(count):
+        namespace = f"shot{i:03d}"
+        if not cmds.namespace(exists=namespace):
+            cmds.namespace(add=namespace)
+        specs.extend(get_shot_specs(f"{namespace}:", offset=i * 20))
+    light_builder.build_lights(specs)
+
+
+def create_character_shot(count: int):
+    light_builder = import_tool("utils.light_builder")
+    light_builder.build_lights(get_shot_specs())
+
+
+# Capture the rig templates before timing, so only stamping is timed
+def load_rig_templates(count: int):
+    import_tool("light_rig.easy_light_rig").stamp_easy_light_rigs([])
+    import_tool("light_pair.spotlight_pair").stamp_spotlight_pairs([])
+
+
+# A selected group of count meshes spread along X, for the framed rig
+def create_selected_meshes(count: int):
+    from maya import cmds
+
+    light_builder = import_tool("utils.light_builder")
+    group = {"name": "meshes"}
+    specs = [group]
+    for i in range(count):
+        specs.append(
+            {
+                "name": f"mesh{i:04d}",
+                "type": "transform",
+                "parent": group,
+                "transform_attributes": {"translate": (i * 2, 0, 0)},
+            }
+        )
+    light_builder.build_lights(specs)
+    for i in range(count):
+        cmds.createNode("mesh", name=f"mesh{i:04d}Shape", parent=f"mesh{i:04d}")
+    cmds.select("meshes")
+
+
+def get_stamp_prefixes(count: int):
+    return [f"rig{i:03d}_" for i in range(count)]
+
+
+def get_materials(count: int):
+    return {
+        f"material_{i}": {
+            channel: {
+                "path": f"/textures/material_{i}_{channel}.png",
+                "channel": channel,
+            }
+            for channel in MATERIAL_CHANNELS
+        }
+        for i in range(count)
+    }
+
+
+##################
+### Benchmarks ###
+##################
+
+
+def repeat(function, count: int, *args):
+    for _ in range(count):
+        function(*args)
+
+
+# module: tool module under src
+# setup(count): builds the scene the tool needs, not timed
+# run(module, count): the timed call, count scales the work
+BENCHMARKS = [
+    {
+        "name": "create_easy_light_rig",
+        "module": "light_rig.easy_light_rig",
+        "run": lambda module, count: repeat(module.create_easy_light_rig, count),
+    },
+    {
+        "name": "create_framed_easy_light_rig",
+        "module": "light_rig.easy_light_rig",
+        "setup": create_selected_meshes,
+        "run": lambda module, count: module.create_framed_easy_light_rig(),
+    },
+    {
+        "name": "create_spotlight_pair",
+        "module": "light_pair.spotlight_pair",
+        "run": lambda module, count: repeat(module.create_spotlight_pair, count),
+    },
+    {
+        "name": "stamp_easy_light_rigs",
+        "module": "light_rig.easy_light_rig",
+        "setup": load_rig_templates,
+        "run": lambda module, count: module.stamp_easy_light_rigs(
+            get_stamp_prefixes(count)
+        ),
+    },
+    {
+        "name": "stamp_spotlight_pairs",
+        "module": "light_pair.spotlight_pair",
+        "setup": load_rig_templates,
+        "run": lambda module, count: module.stamp_spotlight_pairs(
+            get_stamp_prefixes(count)
+        ),
+    },
+    {
+        "name": "create_linked_light_group",
+        "module": "light_pair.linked_light_group",
+        "run": lambda module, count: module.create_linked_light_group(count),
+    },
+    {
+        "name": "create_texture_shader",
+        "module": "init_texture_shader.init_texture_shader",
+        "run": lambda module, count: repeat(module.create_texture_shader, count),
+    },
+    {
+        "name": "build_material_networks",
+        "module": "init_texture_shader.batch_texture_shader",
+        "run": lambda module, count: module.build_material_networks(
+            get_materials(count)
+        ),
+    },
+    {
+        "name": "set_up_environment_lighting_around_character",
+        "module": "environment_lighting.environment_lighting",
+        "setup": create_character_shot,
+        "run": lambda module, count: repeat(
+            module.set_up_environment_lighting_around_character, count
+        ),
+    },
+    {
+        "name": "set_up_environment_lighting_batch",
+        "module": "environment_lighting.environment_lighting",
+        "setup": create_character_shots,
+        "run": lambda module, count: module.set_up_environment_lighting_batch(),
+    },
+    {
+        "name": "set_up_environment_lighting_batch_live",
+        "module": "environment_lighting.environment_lighting",
+        "setup": create_character_shots,
+        "run": lambda module, count: module.set_up_environment_lighting_batch(
+            live=True
+        ),
+    },
+    {
+        "name": "set_up_environment_lighting_batch_solver",
+        "module": "environment_lighting.environment_lighting",
+        "setup": create_character_shots,
+        "run": lambda module, count: module.set_up_environment_lighting_batch(
+            live=True, live_solver="plugin"
+        ),
+    },
+    {
+        "name": "create_godray_spotlight",
+        "module": "godray_spotlight.godray_spotlight",
+        "run": lambda module, count: repeat(module.create_godray_spotlight, count),
+    },
+]
+
+
+# Run one benchmark at one count in a new scene, keeping the fastest repeat
+def run_benchmark(benchmark: dict, count: int, repeats: int = DEFAULT_REPEATS):
+    module = import_tool(benchmark["module"])
+    best = None
+    for _ in range(repeats):
+        new_scene()
+        if "setup" in benchmark:
+            benchmark["setup"](count)
+
+        nodes_before = count_nodes()
+        start_time = time.perf_counter()
+        calls = run_counting_calls(benchmark["run"], module, count)
+        seconds = time.perf_counter() - start_time
+        nodes_created = count_nodes() - nodes_before
+
+        if best is None or seconds < best["seconds"]:
+            best = {
+                "name": benchmark["name"],
+                "count": count,
+                "seconds": seconds,
+                "seconds_per_item": seconds / count,
+                "nodes_created": nodes_created,
+                "nodes_per_second": nodes_created / seconds if seconds else None,
+                "call_count": sum(calls.values()),
+                "calls": dict(sorted(calls.items())),
+            }
+
+    return best
+
+
+def run_benchmarks(
+    names: list = None, counts: list = None, repeats: int = DEFAULT_REPEATS
+):
+    counts = counts or DEFAULT_COUNTS
+    benchmarks = [
+        benchmark for benchmark in BENCHMARKS if not names or benchmark["name"] in names
+    ]
+    results = []
+    for benchmark in benchmarks:
+        for count in counts:
+            result = run_benchmark(benchmark, count, repeats)
+            results.append(result)
+            print(
+                f"{result['name']:<46} x{count:<5} {result['seconds'] * 1000:>9.1f}ms "
+                f"{result['nodes_created']:>7} nodes {result['call_count']:>7} calls"
+            )
+
+    return {
+        "backend": backend,
+        "version": get_backend_version(),
+        "python": platform.python_version(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeats": repeats,
+        "results": results,
+    }
+
+
+# Print how each result changed from a baseline report, matched by name and count
+def compare_to_baseline(report: dict, baseline_path: str):
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    baseline_results = {
+        (result["name"], result["count"]): result for result in baseline["results"]
+    }
+
+    for result in report["results"]:
+        baseline_result = baseline_results.get((result["name"], result["count"]))
+        if baseline_result is None:
+            continue
+        change = result["seconds"] / baseline_result["seconds"] - 1
+        call_change = result["call_count"] - baseline_result["call_count"]
+        print(
+            f"{result['name']:<46} x{result['count']:<5} {change:>+8.1%} time "
+            f"{call_change:>+7} calls"
+        )
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Benchmark the maya_tools tools")
+    parser.add_argument(
+        "--fake",
+        action="store_true",
+        help="run against the in-memory fake maya instead of mayapy",
+    )
+    parser.add_argument("--counts", type=int, nargs="+", default=DEFAULT_COUNTS)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument(
+        "--only", nargs="+", help="names of the benchmarks to run, default all"
+    )
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    parser.add_argument("--baseline", help="compare to a report written before")
+    args = parser.parse_args(argv)
+
+    set_up_backend(args.fake)
+    report = run_benchmarks(args.only, args.counts, args.repeats)
+    if args.output:
+        with open(args.output, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"Report written to {args.output}")
+    if args.baseline:
+        compare_to_baseline(report, args.baseline)
+
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,58 +1,182 @@
-from maya import cmds
+import hashlib
+import importlib
+import json
+import os
+import time
+
+from maya import cmds, mel
 
 from ..paths import get_icon_path
-from .init_texture_shader.init_texture_shader import init_texture_shader_dialog
-from .light_rig.easy_light_rig import create_easy_light_rig
-from .light_pair.spotlight_pair import create_spotlight_pair
-from .environment_lighting.environment_lighting import (
-    set_up_environment_lighting_around_character,
-)
+from .utils.transaction import Transaction
 
 CUSTOM_SHELF_NAME = "SScripts"
-
-
-def add_init_texture_shader_button(shelf):
-    print("Creating texture shader init button")
+# optionVar holding the hash of the registry the shelf was last built from
+SHELF_HASH_OPTION_VAR = "SScriptsShelfHash"
+# Part of the hash, bump when the buttons are built differently so saved shelves
+# are rebuilt
+SHELF_VERSION = 2
+
+# Found once per session, see get_main_shelf_layout
+main_shelf_layout = None
+
+# Tool modules are only imported when their button is first clicked
+# module is relative to this package
+# Tools that open a dialog run their build in a Transaction of their own
+TOOLS = [
+    {
+        "label": "InitTexture",
+        "icon": "init_texture.png",
+        "module": ".init_texture_shader.init_texture_shader",
+        "function": "init_texture_shader_dialog",
+        "annotation": "Initialize a basic texture shading setup",
+    },
+    {
+        "label": "BatchTexture",
+        "icon": "init_texture.png",
+        "module": ".init_texture_shader.batch_texture_shader",
+        "function": "batch_init_texture_shader_dialog",
+        "annotation": "Build texture shaders for every texture set in a directory",
+    },
+    {
+        "label": "EasyRig",
+        "icon": "three_point.png",
+        "module": ".light_rig.easy_light_rig",
+        "function": "create_easy_light_rig",
+        "annotation": "Create simple 3-point lighting rig with a camera",
+    },
+    {
+        "label": "FramedRig",
+        "icon": "three_point.png",
+        "module": ".light_rig.easy_light_rig",
+        "function": "create_framed_easy_light_rig",
+        "annotation": "Create the 3-point lighting rig framed around the selection",
+    },
+    {
+        "label": "LightPair",
+        "icon": "two_spotlights.png",
+        "module": ".light_pair.spotlight_pair",
+        "function": "create_spotlight_pair",
+        "annotation": "Create two linked spot lights",
+    },
+    {
+        "label": "EnvLights",
+        "icon": "environment_lighting.png",
+        "module": ".environment_lighting.environment_lighting",
+        "function": "set_up_environment_lighting_around_character",
+        "annotation": "Create environment lights based on existing character lighting",
+    },
+    {
+        "label": "Godray",
+        "icon": "two_spotlights.png",
+        "module": ".godray_spotlight.godray_spotlight",
+        "function": "create_godray_spotlight",
+        "annotation": "Create a volume-only spot light with a baked noise gobo",
+    },
+    {
+        "label": "LightPanel",
+        "icon": "environment_lighting.png",
+        "module": ".environment_lighting.lighting_panel",
+        "function": "show_lighting_panel",
+        "annotation": "Dock the batch lighting panel, builds run in the background",
+    },
+    {
+        "label": "LightInventory",
+        "icon": "environment_lighting.png",
+        "module": ".environment_lighting.light_inventory",
+        "function": "show_light_inventory",
+        "annotation": "Dock a table of every Arnold light, edit selected rows together",
+    },
+    {
+        "label": "RayOptimize",
+        "icon": "environment_lighting.png",
+        "module": ".light_optimizer.ray_visibility",
+        "function": "optimize_ray_visibility",
+        "annotation": "Lower Arnold light ray visibility and samples",
+    },
+    {
+        "label": "SampleBudget",
+        "icon": "environment_lighting.png",
+        "module": ".light_optimizer.sample_budget",
+        "function": "allocate_light_samples",
+        "annotation": "Spread a fixed light sample budget over every Arnold light",
+    },
+]
+
+
+def get_tool(label: str):
+    for tool in TOOLS:
+        if tool["label"] == label:
+            return tool
+
+    raise KeyError(f"No tool registered with label: {label}")
+
+
+# Import the tool's module on first use and run it
+# Each run is one undo step, and is rolled back if the tool fails
+def run_tool(label: str):
+    tool = get_tool(label)
+    module = importlib.import_module(tool["module"], package=__package__)
+    with Transaction(label):
+        return getattr(module, tool["function"])()
+
+
+# Hash the registry and the icon files, so the shelf is only rebuilt when they change
+def get_registry_hash():
+    digest = hashlib.sha1(json.dumps([SHELF_VERSION, TOOLS], sort_keys=True).encode())
+    for tool in TOOLS:
+        icon_path = get_icon_path(tool["icon"])
+        if os.path.exists(icon_path):
+            icon_stat = os.stat(icon_path)
+            icon_key = f"{icon_path}:{icon_stat.st_size}:{icon_stat.st_mtime}"
+            digest.update(icon_key.encode())
+
+    return digest.hexdigest()
+
+
+# The command is a string, so Maya can save it with the shelf
+def get_tool_command(label: str):
+    return f"from {__name__} import run_tool; run_tool({label!r})"
+
+
+def add_tool_button(shelf, tool: dict):
+    print(f"Creating {tool['label']} button")
     cmds.shelfButton(
         parent=shelf,
-        i=get_icon_path("init_texture.png"),
-        c=init_texture_shader_dialog,
-        label="InitTexture",
-        annotation="Initialize a basic texture shading setup",
+        i=get_icon_path(tool["icon"]),
+        c=get_tool_command(tool["label"]),
+        sourceType="python",
+        label=tool["label"],
+        annotation=tool["annotation"],
     )
 
 
-def add_environment_lighting_button(shelf):
-    print("Creating easy light rig button")
-    cmds.shelfButton(
-        parent=shelf,
-        i=get_icon_path("environment_lighting.png"),
-        c=set_up_environment_lighting_around_character,
-        label="EnvLights",
-        annotation="Create environment lights based on existing character lighting",
-    )
+# Get the shelf tab layout, checking the cached one with a single existence query
+def get_main_shelf_layout():
+    global main_shelf_layout
+    if main_shelf_layout is not None and cmds.shelfTabLayout(
+        main_shelf_layout, exists=True
+    ):
+        return main_shelf_layout
 
+    main_shelf_layout = get_shelf_top_level()
+    if main_shelf_layout is None:
+        # Fall back to walking the UI
+        main_shelf_layout = find_main_shelf_layout("Shelf")
 
-def add_easy_light_rig_button(shelf):
-    print("Creating easy light rig button")
-    cmds.shelfButton(
-        parent=shelf,
-        i=get_icon_path("three_point.png"),
-        c=create_easy_light_rig,
-        label="LightPair",
-        annotation="Create simple 3-point lighting rig with a camera",
-    )
+    return main_shelf_layout
 
 
-def add_spotlight_pair_button(shelf):
-    print("Creating spotlight pair button")
-    cmds.shelfButton(
-        parent=shelf,
-        i=get_icon_path("two_spotlights.png"),
-        c=create_spotlight_pair,
-        label="LightPair",
-        annotation="Create two linked spot lights",
-    )
+# Maya keeps the shelf tab layout in the $gShelfTopLevel MEL global
+def get_shelf_top_level():
+    try:
+        shelf_top_level = mel.eval("$maya_tools_shelf_top_level = $gShelfTopLevel")
+    except RuntimeError:
+        return None
+
+    if shelf_top_level and cmds.shelfTabLayout(shelf_top_level, exists=True):
+        return shelf_top_level
+
+    return None
 
 
 # Search the layout tree until you get to the tool shelves
@@ -75,15 +199,33 @@ def find_main_shelf_layout(node: str):
 
 
 def add_or_update_custom_shelf():
+    start_time = time.perf_counter()
+    main_shelf = get_main_shelf_layout()
+    children = cmds.layout(main_shelf, q=1, childArray=1) or []
+    registry_hash = get_registry_hash()
+
+    shelf_exists = CUSTOM_SHELF_NAME in children
+    saved_hash = None
+    if cmds.optionVar(exists=SHELF_HASH_OPTION_VAR):
+        saved_hash = cmds.optionVar(q=SHELF_HASH_OPTION_VAR)
+
+    if shelf_exists and saved_hash == registry_hash:
+        print(
+            "SScripts shelf is up to date, "
+            f"setup took {(time.perf_counter() - start_time) * 1000:.1f}ms"
+        )
+        return
+
     print("Running SScripts Shelf Setup")
-    main_shelf = find_main_shelf_layout("Shelf")
-    children = cmds.layout(main_shelf, q=1, childArray=1)
-    if CUSTOM_SHELF_NAME in children:
+    if shelf_exists:
         cmds.deleteUI(f"{main_shelf}|{CUSTOM_SHELF_NAME}")
 
     custom_shelf = cmds.shelfLayout(CUSTOM_SHELF_NAME, parent=main_shelf)
-    add_init_texture_shader_button(custom_shelf)
-    add_easy_light_rig_button(custom_shelf)
-    add_spotlight_pair_button(custom_shelf)
-    add_environment_lighting_button(custom_shelf)
-    add_spotlight_button(custom_shelf)
+    for tool in TOOLS:
+        add_tool_button(custom_shelf, tool)
+
+    cmds.optionVar(sv=(SHELF_HASH_OPTION_VAR, registry_hash))
+    print(
+        "SScripts shelf built, "
+        f"setup took {(time.perf_counter() - start_time) * 1000:.1f}ms"
+    )
@@ -0,0 +1,286 @@
+from functools import lru_cache
+
+# numpy ships with recent versions of mayapy, the pure Python paths are used without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Range of the Planckian locus approximation, Arnold's default light is 6500K
+TEMPERATURE_MIN = 1000.0
+TEMPERATURE_MAX = 15000.0
+TABLE_STEP = 10.0
+
+# Light colors are in linear sRGB (Rec. 709 primaries, D65 white)
+RGB_TO_XYZ = (
+    (0.4124564, 0.3575761, 0.1804375),
+    (0.2126729, 0.7151522, 0.0721750),
+    (0.0193339, 0.1191920, 0.9503041),
+)
+XYZ_TO_RGB = (
+    (3.2404542, -1.5371385, -0.4985314),
+    (-0.9692660, 1.8760108, 0.0415560),
+    (0.0556434, -0.2040259, 1.0572252),
+)
+LUMINANCE_WEIGHTS = RGB_TO_XYZ[1]
+
+# How much of the key color's saturation the environment lights lose
+SUN_SPILL_DESATURATION = 0.25
+SKY_DIFFUSE_DESATURATION = 0.6
+
+
+#############
+### Locus ###
+#############
+
+
+# CIE 1960 (u, v) of a black body, Krystek's rational approximation
+def get_planckian_uv(temperature: float):
+    t = temperature
+    u = (0.860117757 + 1.54118254e-4 * t + 1.28641212e-7 * t**2) / (
+        1 + 8.42420235e-4 * t + 7.08145163e-7 * t**2
+    )
+    v = (0.317398726 + 4.22806245e-5 * t + 4.20481691e-8 * t**2) / (
+        1 - 2.89741816e-5 * t + 1.61456053e-7 * t**2
+    )
+    return u, v
+
+
+# Linear RGB of a chromaticity, scaled so the brightest channel is 1
+def uv_to_rgb(u: float, v: float):
+    denominator = 2 * u - 8 * v + 4
+    x = 3 * u / denominator
+    y = 2 * v / denominator
+    xyz = (x / y, 1.0, (1 - x - y) / y)
+    rgb = [max(0.0, sum(m * c for m, c in zip(row, xyz))) for row in XYZ_TO_RGB]
+    return normalize_color(rgb)
+
+
+def rgb_to_uv(color: list):
+    x, y, z = [sum(m * c for m, c in zip(row, color)) for row in RGB_TO_XYZ]
+    denominator = x + 15 * y + 3 * z
+    if denominator <= 0:
+        # Black has no chromaticity, treat it as white
+        return rgb_to_uv([1.0, 1.0, 1.0])
+
+    return 4 * x / denominator, 6 * y / denominator
+
+
+def normalize_color(color: list):
+    brightest = max(color)
+    if brightest <= 0:
+        return [1.0, 1.0, 1.0]
+
+    return [channel / brightest for channel in color]
+
+
+####################
+### Lookup Table ###
+####################
+
+
+# Kelvin <-> RGB samples of the Planckian locus, evenly spaced in temperature
+# Meant for interactive use, e.g. while the key light color is scrubbed
+class ColorTemperatureTable:
+    def __init__(
+        self,
+        temperature_min: float = TEMPERATURE_MIN,
+        temperature_max: float = TEMPERATURE_MAX,
+        step: float = TABLE_STEP,
+    ):
+        self.temperature_min = temperature_min
+        self.temperature_max = temperature_max
+        self.step = step
+        size = int(round((temperature_max - temperature_min) / step)) + 1
+        self.temperatures = [temperature_min + i * step for i in range(size)]
+        self.uvs = [get_planckian_uv(t) for t in self.temperatures]
+        self.colors = [uv_to_rgb(u, v) for u, v in self.uvs]
+        if np is not None:
+            self.temperature_array = np.asarray(self.temperatures)
+            self.uv_array = np.asarray(self.uvs)
+            self.color_array = np.asarray(self.colors)
+
+    # Temperatures outside of the table are clamped to its ends
+    def kelvin_to_rgb(self, temperature: float):
+        position = (self.clamp(temperature) - self.temperature_min) / self.step
+        # Samples are evenly spaced, so the index is found without searching
+        index = min(int(position), len(self.temperatures) - 2)
+        weight = position - index
+        low, high = self.colors[index], self.colors[index + 1]
+        return [a + weight * (b - a) for a, b in zip(low, high)]
+
+    def kelvin_to_rgb_array(self, temperatures):
+        if np is None:
+            return [self.kelvin_to_rgb(temperature) for temperature in temperatures]
+
+        temperatures = np.asarray(temperatures, dtype=np.float64)
+        return np.stack(
+            [
+                np.interp(temperatures, self.temperature_array, self.color_array[:, c])
+                for c in range(3)
+            ],
+            axis=-1,
+        )
+
+    # Estimate the correlated color temperature of a color
+    # The nearest table sample is refined by projecting onto the locus segments
+    # next to it. Returns (temperature, distance from the locus in uv),
+    # colors far from the locus, e.g. purple, are only loosely a temperature.
+    def rgb_to_kelvin(self, color: list):
+        u, v = rgb_to_uv(color)
+        nearest = min(
+            range(len(self.uvs)),
+            key=lambda i: (self.uvs[i][0] - u) ** 2 + (self.uvs[i][1] - v) ** 2,
+        )
+        best = None
+        for index in (nearest - 1, nearest):
+            if not 0 <= index < len(self.uvs) - 1:
+                continue
+            weight, distance = project_onto_segment(
+                (u, v), self.uvs[index], self.uvs[index + 1]
+            )
+            if best is None or distance < best[1]:
+                best = (self.temperatures[index] + weight * self.step, distance)
+
+        return best
+
+    # Vectorized rgb_to_kelvin, returns (temperatures, distances)
+    def rgb_to_kelvin_array(self, colors):
+        if np is None:
+            results = [self.rgb_to_kelvin(color) for color in colors]
+            return [t for t, _ in results], [d for _, d in results]
+
+        uv = rgb_to_uv_array(colors)
+        differences = uv[:, None, :] - self.uv_array[None, :, :]
+        nearest = np.argmin(np.einsum("ijk,ijk->ij", differences, differences), axis=1)
+
+        last_segment = len(self.temperatures) - 2
+        best_temperatures = None
+        best_distances = None
+        for offset in (-1, 0):
+            index = np.clip(nearest + offset, 0, last_segment)
+            start = self.uv_array[index]
+            segment = self.uv_array[index + 1] - start
+            weight = np.einsum("ij,ij->i", uv - start, segment) / np.einsum(
+                "ij,ij->i", segment, segment
+            )
+            weight = np.clip(weight, 0.0, 1.0)
+            closest = start + weight[:, None] * segment
+            distances = np.linalg.norm(uv - closest, axis=1)
+            temperatures = self.temperature_array[index] + weight * self.step
+            if best_temperatures is None:
+                best_temperatures, best_distances = temperatures, distances
+            else:
+                closer = distances < best_distances
+                best_temperatures = np.where(closer, temperatures, best_temperatures)
+                best_distances = np.where(closer, distances, best_distances)
+
+        return best_temperatures, best_distances
+
+    def clamp(self, temperature: float):
+        return min(max(temperature, self.temperature_min), self.temperature_max)
+
+
+@lru_cache(maxsize=4)
+def get_color_temperature_table(
+    temperature_min: float = TEMPERATURE_MIN,
+    temperature_max: float = TEMPERATURE_MAX,
+    step: float = TABLE_STEP,
+):
+    return ColorTemperatureTable(temperature_min, temperature_max, step)
+
+
+# Returns the segment weight of the closest point, and the distance to it
+def project_onto_segment(point: tuple, start: tuple, end: tuple):
+    segment = (end[0] - start[0], end[1] - start[1])
+    length_squared = segment[0] ** 2 + segment[1] ** 2
+    offset = (point[0] - start[0], point[1] - start[1])
+    weight = 0.0
+    if length_squared > 0:
+        weight = (offset[0] * segment[0] + offset[1] * segment[1]) / length_squared
+        weight = min(max(weight, 0.0), 1.0)
+
+    closest = (start[0] + weight * segment[0], start[1] + weight * segment[1])
+    distance = ((point[0] - closest[0]) ** 2 + (point[1] - closest[1]) ** 2) ** 0.5
+    return weight, distance
+
+
+def rgb_to_uv_array(colors):
+    colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+    xyz = colors @ np.asarray(RGB_TO_XYZ).T
+    denominator = xyz[:, 0] + 15 * xyz[:, 1] + 3 * xyz[:, 2]
+    black = denominator <= 0
+    if np.any(black):
+        xyz[black] = np.asarray(RGB_TO_XYZ).sum(axis=1)
+        denominator = xyz[:, 0] + 15 * xyz[:, 1] + 3 * xyz[:, 2]
+
+    return np.stack(
+        [4 * xyz[:, 0] / denominator, 6 * xyz[:, 1] / denominator], axis=-1
+    )
+
+
+##############
+### Colors ###
+##############
+
+
+def kelvin_to_rgb(temperature: float):
+    return get_color_temperature_table().kelvin_to_rgb(temperature)
+
+
+def rgb_to_kelvin(color: list):
+    return get_color_temperature_table().rgb_to_kelvin(color)
+
+
+# Move a color between temperatures while keeping its tint
+# e.g. a purple key moved to a cooler temperature stays purple, only bluer
+def shift_color_temperature(
+    color: list, from_temperature: float, to_temperature: float
+):
+    table = get_color_temperature_table()
+    from_color = table.kelvin_to_rgb(from_temperature)
+    to_color = table.kelvin_to_rgb(to_temperature)
+    shifted = [
+        channel * target / source if source > 0 else channel
+        for channel, source, target in zip(color, from_color, to_color)
+    ]
+    return normalize_color(shifted)
+
+
+# Blend a color toward the gray of the same luminance, amount 1 is fully gray
+def desaturate(color: list, amount: float):
+    luminance = sum(w * c for w, c in zip(LUMINANCE_WEIGHTS, color))
+    return normalize_color([c + amount * (luminance - c) for c in color])
+
+
+# Colors of the environment lights for a key light lit by color
+# instead of color temperature. The key's estimated temperature is moved by
+# the same ratios the temperature mode uses, then desaturated.
+# Returns the colors and the estimated temperatures
+def get_environment_colors(
+    key_color: list,
+    sun_spill_temp_ratio: float,
+    sky_diffuse_temp_ratio: float,
+    key_temperature: float = None,
+):
+    table = get_color_temperature_table()
+    key_color = normalize_color(list(key_color))
+    if key_temperature is None:
+        key_temperature, _ = table.rgb_to_kelvin(key_color)
+
+    sun_spill_temp = table.clamp(key_temperature * sun_spill_temp_ratio)
+    sky_diffuse_temp = table.clamp(key_temperature * sky_diffuse_temp_ratio)
+    return {
+        "sun_beam_temp": key_temperature,
+        "sun_spill_temp": sun_spill_temp,
+        "sky_diffuse_temp": sky_diffuse_temp,
+        "sun_beam_color": key_color,
+        "sun_spill_color": desaturate(
+            shift_color_temperature(key_color, key_temperature, sun_spill_temp),
+            SUN_SPILL_DESATURATION,
+        ),
+        "sky_diffuse_color": desaturate(
+            shift_color_temperature(key_color, key_temperature, sky_diffuse_temp),
+            SKY_DIFFUSE_DESATURATION,
+        ),
+    }
@@ -1,23 +1,29 @@
+import logging
+import threading
+import traceback
 import weakref
+
 import maya.cmds as cmds
 import maya.OpenMayaUI as omui
+import maya.utils
 from shiboken2 import wrapInstance
 
 from PySide2 import (
-    QtGui,
     QtWidgets,
     QtCore,
 )  # https://github.com/mottosso/Qt.py by Marcus Ottosson
 
+logger = logging.getLogger(__name__)
+
 
+# Build a workspace control and fill it with an instance of dialog_class
+# An existing control of the same name is replaced
+# Returns the dock content
 def dock_window(dialog_class):
-    try:
+    if cmds.workspaceControl(dialog_class.CONTROL_NAME, exists=True):
         cmds.deleteUI(dialog_class.CONTROL_NAME)
         logger.info("removed workspace {}".format(dialog_class.CONTROL_NAME))
 
-    except:
-        pass
-
     # building the workspace control with maya.cmds
     main_control = cmds.workspaceControl(
         dialog_class.CONTROL_NAME,
@@ -33,7 +39,7 @@ def dock_window(dialog_class):
     # convert the C++ pointer to Qt object we can use
     control_wrap = wrapInstance(int(control_widget), QtWidgets.QWidget)
 
-    # control_wrap is the widget of the docking window and now we can start working with it:
+    # control_wrap is the widget of the docking window
     control_wrap.setAttribute(QtCore.Qt.WA_DeleteOnClose)
     win = dialog_class(control_wrap)
 
@@ -48,8 +54,8 @@ def dock_window(dialog_class):
 
 class DockableGUI(QtWidgets.QWidget):
     instances = list()
-    CONTROL_NAME = "dockable_gui_test"
-    DOCK_LABEL_NAME = "Dockable GUI test"
+    CONTROL_NAME = "dockable_gui"
+    DOCK_LABEL_NAME = "Dockable GUI"
 
     def __init__(self, parent=None):
         super(DockableGUI, self).__init__(parent)
@@ -61,36 +67,86 @@ class DockableGUI(QtWidgets.QWidget):
         self.window_name = self.CONTROL_NAME
         self.ui = parent
         self.main_layout = parent.layout()
-
-        # here we can start coding our UI
-        # lets add 25 line_edits and 4 buttons LOL :>
-        for i in range(0, 25):
-            self.dynamiclineedit = QtWidgets.QLineEdit(self)
-            self.dynamiclineedit.setText("Text goes here")
-            self.main_layout.addWidget(self.dynamiclineedit)
-
-        for i in range(0, 5):
-            self.button = QtWidgets.QPushButton(self)
-            self.button.setText("Click Here")
-            self.main_layout.addWidget(self.button)
+        self.main_layout.addWidget(self)
 
     @staticmethod
     def delete_instances():
-        for ins in DockableGUI.instances:
+        for ins in list(DockableGUI.instances):
             logger.info("Delete {}".format(ins))
             try:
                 ins.setParent(None)
                 ins.deleteLater()
-            except:
-                # ignore the fact that the actual parent has already been deleted by Maya...
+            except ReferenceError:
+                # the actual parent has already been deleted by Maya
                 pass
 
             DockableGUI.instances.remove(ins)
-            del ins
 
     def run(self):
         return self
 
 
-# this is where we call the window
-my_dock = dock_window(DockableGUI)
+##################
+### Background ###
+##################
+
+
+class TaskSignals(QtCore.QObject):
+    # done, total, message
+    progress = QtCore.Signal(int, int, str)
+    failed = QtCore.Signal(str)
+    finished = QtCore.Signal(bool)  # True when cancelled
+
+
+# Work that runs in a QThreadPool, with its scene edits applied on the main thread
+# work(task): runs in the pool, must not touch the scene, its result goes to apply
+# apply(result, task): a generator run on the main thread through executeDeferred,
+# one step per yield, so Maya redraws and the panel handles cancel between steps
+# Both report progress with task.report and stop early when task.is_cancelled()
+class BackgroundTask(QtCore.QRunnable):
+    def __init__(self, work, apply):
+        super(BackgroundTask, self).__init__()
+        # Signals are still emitted after run returns
+        self.setAutoDelete(False)
+        self.work = work
+        self.apply = apply
+        self.signals = TaskSignals()
+        self.cancelled = threading.Event()
+
+    def run(self):
+        try:
+            result = self.work(self)
+        except Exception:
+            self.signals.failed.emit(traceback.format_exc())
+            return
+
+        if self.is_cancelled():
+            self.signals.finished.emit(True)
+            return
+        maya.utils.executeDeferred(self.apply_next, self.apply(result, self))
+
+    def apply_next(self, steps):
+        if self.is_cancelled():
+            steps.close()
+            self.signals.finished.emit(True)
+            return
+
+        try:
+            next(steps)
+        except StopIteration:
+            self.signals.finished.emit(False)
+            return
+        except Exception:
+            self.signals.failed.emit(traceback.format_exc())
+            return
+
+        maya.utils.executeDeferred(self.apply_next, steps)
+
+    def report(self, done: int, total: int, message: str = ""):
+        self.signals.progress.emit(done, total, message)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def is_cancelled(self):
+        return self.cancelled.is_set()
@@ -0,0 +1,188 @@
+import maya.api.OpenMaya as om
+
+# Maya loads plugins as top level modules, where the package is imported by name
+if __package__:
+    from .environment_lighting import (
+        SUN_DISTANCE_RATIO,
+        compute_distance_settings,
+        compute_temperature_settings,
+    )
+else:
+    from maya_tools.src.environment_lighting.environment_lighting import (
+        SUN_DISTANCE_RATIO,
+        compute_distance_settings,
+        compute_temperature_settings,
+    )
+
+PLUGIN_NAME = "env_light_solver"
+NODE_NAME = "envLightSolver"
+# From the 0x00000 - 0x7ffff block Autodesk keeps for plugins used in house,
+# register a block with Autodesk before sharing scenes that use the node
+NODE_ID = om.MTypeId(0x0007F7A0)
+
+# Output attributes (long name, short name) by compute_environment_settings key
+DISTANCE_OUTPUTS = {
+    "sun_y_distance": ("sunDistance", "sd"),
+    "sky_diffuse_distance": ("skyDistance", "skd"),
+    "sky_diffuse_scale": ("skyScale", "sks"),
+    "sun_beam_radius": ("sunBeamRadius", "sbr"),
+    "sun_spill_radius": ("sunSpillRadius", "ssr"),
+    "sun_beam_exposure": ("sunBeamExposure", "sbe"),
+    "sun_spill_exposure": ("sunSpillExposure", "sse"),
+    "sky_diffuse_exposure": ("skyExposure", "ske"),
+}
+TEMPERATURE_OUTPUTS = {
+    "sun_beam_temp": ("sunBeamTemperature", "sbt"),
+    "sun_spill_temp": ("sunSpillTemperature", "sst"),
+    "sky_diffuse_temp": ("skyTemperature", "skt"),
+}
+
+
+def maya_useNewAPI():
+    pass
+
+
+# Every environment light value of one shot, from its character and key light
+# Connect worldMatrix[0] of both to the matrix inputs and their rotatePivot to
+# the pivot inputs, distances are measured between the world space pivots
+# Outputs only depend on the inputs they are computed from, so moving the key
+# leaves the temperatures clean and changing the temperature leaves the
+# distances clean. Both groups are computed in one pass each.
+class EnvLightSolver(om.MPxNode):
+    character_matrix = None
+    character_pivot = None
+    key_matrix = None
+    key_pivot = None
+    key_temperature = None
+    distance_outputs = {}  # settings key -> attribute
+    temperature_outputs = {}
+
+    def __init__(self):
+        om.MPxNode.__init__(self)
+        # The key can move around the character without changing the distance,
+        # e.g. when both are parented to the same moving group
+        self.cached_distance = None
+        self.cached_settings = None
+
+    @staticmethod
+    def creator():
+        return EnvLightSolver()
+
+    @staticmethod
+    def initialize():
+        matrix_attribute = om.MFnMatrixAttribute()
+        EnvLightSolver.character_matrix = matrix_attribute.create(
+            "characterMatrix", "cm"
+        )
+        EnvLightSolver.key_matrix = matrix_attribute.create("keyMatrix", "km")
+
+        numeric_attribute = om.MFnNumericAttribute()
+        EnvLightSolver.character_pivot = numeric_attribute.createPoint(
+            "characterPivot", "cp"
+        )
+        EnvLightSolver.key_pivot = numeric_attribute.createPoint("keyPivot", "kp")
+        EnvLightSolver.key_temperature = numeric_attribute.create(
+            "keyTemperature", "kt", om.MFnNumericData.kDouble, 6500.0
+        )
+        numeric_attribute.keyable = True
+
+        distance_inputs = [
+            EnvLightSolver.character_matrix,
+            EnvLightSolver.character_pivot,
+            EnvLightSolver.key_matrix,
+            EnvLightSolver.key_pivot,
+        ]
+        temperature_inputs = [EnvLightSolver.key_temperature]
+        for attribute in distance_inputs + temperature_inputs:
+            om.MPxNode.addAttribute(attribute)
+
+        for outputs, affected_by, cache in [
+            (DISTANCE_OUTPUTS, distance_inputs, EnvLightSolver.distance_outputs),
+            (
+                TEMPERATURE_OUTPUTS,
+                temperature_inputs,
+                EnvLightSolver.temperature_outputs,
+            ),
+        ]:
+            for key, (long_name, short_name) in outputs.items():
+                attribute = numeric_attribute.create(
+                    long_name, short_name, om.MFnNumericData.kDouble, 0.0
+                )
+                numeric_attribute.writable = False
+                numeric_attribute.storable = False
+                om.MPxNode.addAttribute(attribute)
+                for input_attribute in affected_by:
+                    om.MPxNode.attributeAffects(input_attribute, attribute)
+                cache[key] = attribute
+
+    # Only the node's own data block and members are used, so any number of
+    # solvers can be evaluated at once by the evaluation manager
+    def schedulingType(self):
+        return om.MPxNode.kParallel
+
+    def compute(self, plug: om.MPlug, data: om.MDataBlock):
+        attribute = plug.attribute()
+        if is_any(attribute, EnvLightSolver.distance_outputs.values()):
+            self.compute_distances(data)
+        elif is_any(attribute, EnvLightSolver.temperature_outputs.values()):
+            self.compute_temperatures(data)
+        else:
+            # Not ours, let Maya handle it
+            return None
+
+        data.setClean(plug)
+
+    def compute_distances(self, data: om.MDataBlock):
+        character = get_world_pivot(
+            data, EnvLightSolver.character_matrix, EnvLightSolver.character_pivot
+        )
+        key = get_world_pivot(data, EnvLightSolver.key_matrix, EnvLightSolver.key_pivot)
+        distance = (key - character).length()
+        if distance != self.cached_distance:
+            self.cached_settings = compute_distance_settings(
+                distance * SUN_DISTANCE_RATIO
+            )
+            self.cached_distance = distance
+
+        set_outputs(data, EnvLightSolver.distance_outputs, self.cached_settings)
+
+    def compute_temperatures(self, data: om.MDataBlock):
+        temperature = data.inputValue(EnvLightSolver.key_temperature).asDouble()
+        set_outputs(
+            data,
+            EnvLightSolver.temperature_outputs,
+            compute_temperature_settings(temperature),
+        )
+
+
+def is_any(attribute: om.MObject, attributes):
+    return any(attribute == other for other in attributes)
+
+
+# The rotate pivot is in object space, the world matrix moves it to world space
+def get_world_pivot(data: om.MDataBlock, matrix: om.MObject, pivot: om.MObject):
+    world_matrix = data.inputValue(matrix).asMatrix()
+    return om.MPoint(data.inputValue(pivot).asDouble3()) * world_matrix
+
+
+# Write every output of a group and mark it clean,
+# pulling another output of the group then needs no compute
+def set_outputs(data: om.MDataBlock, outputs: dict, settings: dict):
+    for key, attribute in outputs.items():
+        handle = data.outputValue(attribute)
+        handle.setDouble(settings[key])
+        handle.setClean()
+
+
+def initializePlugin(plugin: om.MObject):
+    om.MFnPlugin(plugin, "maya_tools", "1.0").registerNode(
+        NODE_NAME,
+        NODE_ID,
+        EnvLightSolver.creator,
+        EnvLightSolver.initialize,
+        om.MPxNode.kDependNode,
+    )
+
+
+def uninitializePlugin(plugin: om.MObject):
+    om.MFnPlugin(plugin).deregisterNode(NODE_ID)
@@ -1,6 +1,21 @@
+import time
 import maya.cmds as cmds
+import maya.api.OpenMaya as om
 from math import sqrt
 
+from .color_temperature import get_color_temperature_table, get_environment_colors
+from .exposure import (
+    SKY_EXPOSURE_CURVE,
+    SUN_EXPOSURE_CURVE,
+    logistic_exposure,
+    logistic_exposure_array,
+)
+from ..utils.attr_writer import AttrWriter
+from ..utils.handles import get_node_name
+from ..utils.light_builder import build_lights
+from ..utils.scene_index import get_scene_index
+from ..utils.transaction import transactional
+
 CHARACTER_NAME = "mainCharacter"
 CHARACTER_RIG_NAME = "characterLightRig"
 CHARACTER_KEY_NAME = "onCharacter_key"
@@ -22,205 +37,450 @@ SKY_DIFFUSE_EXPOSURE_RATIO = 0.75  # sky exposure = sun exposure * this value
 SKY_DIFFUSE_DISTANCE_RATIO = 0.20  # sky distance = sun dist * this value
 SKY_DIFFUSE_SCALE_RATIO = 1.0  # sky scale = sky dist * this value
 
-SUN_BEAM_TEMP_DEFAULT = 6000
 SUN_SPILL_TEMP_RATIO = 0.85  # spill temp = beam temp * this value
 SKY_DIFFUSE_TEMP_RATIO = 1.45  # sky temp = beam temp * this value
 
-character_light_group = None
-spot_lights = {}
-area_lights = {}
-spot_light_transforms = {}
-area_light_transforms = {}
-
 ######################
 ### Helper Methods ###
 ######################
 
 
-# Maya light creation returns the light itself
-# Add to lights and transforms
-def create_spot_light(light_name: str, lights: dict, transforms: dict):
-    spot_light = cmds.spotLight(name=f"{light_name}_spot")
-    lights[light_name] = spot_light
-    # Get the transform
-    sun_beam_transform = cmds.listRelatives(spot_light, parent=True)
-    if sun_beam_transform:
-        sun_beam_transform = sun_beam_transform[0]
-        transforms[light_name] = sun_beam_transform
-    else:
-        cmds.error("Could not get transform for spot light")
-
-
-# Arnold light creation returns the transform
-# Add to lights and transforms
-def create_area_light(light_name: str, lights: dict, transforms: dict):
-    area_light_transform = cmds.shadingNode(
-        "aiAreaLight", asLight=True, name=f"{light_name}_areaShape"
-    )
-    transforms[light_name] = area_light_transform
-    area_light = cmds.listRelatives(area_light_transform, children=True)
-    # Get the lightShape
-    if area_light:
-        area_light = area_light[0]
-        lights[light_name] = area_light
-    else:
-        cmds.error("Could not get light object for area light")
-
-
-def set_attr(obj_name: str, attribute: str, value: any):
-    cmds.setAttr(f"{obj_name}.{attribute}", value)
-
-
 def euclidean_distance(a: list, b: list):
     return sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2)
 
 
 def calculate_sun_exposure(sun_distance: float):
-    return 43.71969 + (-3.606164 - 43.71969) / (
-        1 + (sun_distance / 748.8465) ** 0.2575185
-    )
+    return logistic_exposure(sun_distance, SUN_EXPOSURE_CURVE)
 
 
 def calculate_sky_exposure(sky_distance: float):
-    return 43.71969 + (-3.606164 - 43.71969) / (
-        1 + (sky_distance / 748.8465) ** 0.2575185
-    )
+    return logistic_exposure(sky_distance, SKY_EXPOSURE_CURVE)
 
 
 # Find the character rig
 def get_character_rig(name: str):
-    character_light_group_exists = cmds.objExists(name)
-    if character_light_group_exists is True:
-        character_light_group = cmds.ls(name)[0]
-    else:
+    character_light_group = get_scene_index().find_one(name)
+    if character_light_group is None:
         # Logging this error ends script execution
         cmds.error("Character lights not found.\n" f"expected group with name: {name}")
 
-    return character_light_group
-
-
-def set_up_environment_lighting_around_character():
-    # Create all the environment lights
-    create_spot_light(SUN_BEAM, spot_lights, spot_light_transforms)
-    create_spot_light(SUN_SPILL, spot_lights, spot_light_transforms)
-    create_area_light(SKY_DIFFUSE, area_lights, area_light_transforms)
-
-    ###################################
-    ### Get Character Lighting Data ###
-    ###################################
-
-    character_light_group = get_character_rig(name=CHARACTER_RIG_NAME)
+    return get_node_name(character_light_group)
+
+
+# Get the namespace prefix of a node, e.g. "shot010:" for "shot010:mainCharacter"
+def get_namespace(node: str):
+    namespace, _, _ = node.rpartition("|")[2].rpartition(":")
+    return f"{namespace}:" if namespace else ""
+
+
+# Find every (character, key light, character rig) triple in the scene
+# Characters are matched by pattern,
+# and their key and rig are expected in the same namespace
+def find_environment_shots(character_pattern: str = CHARACTER_NAME):
+    index = get_scene_index()
+    characters = [
+        get_node_name(handle)
+        for handle in index.match(character_pattern, node_type="transform")
+    ]
+    candidates = []
+    for character in characters:
+        namespace = get_namespace(character)
+        candidates.append(
+            (
+                character,
+                f"{namespace}{CHARACTER_KEY_NAME}",
+                f"{namespace}{CHARACTER_RIG_NAME}",
+            )
+        )
 
-    ### Position
-    character_key = {"transform": None, "light": None, "ws_position": None}
-    character_key["transform"] = cmds.ls(CHARACTER_KEY_NAME)[0]
-    if character_key["transform"] is None:
-        cmds.error(
-            f"Could not find character key light, expected name: {CHARACTER_KEY_NAME}"
+    return [
+        shot for shot in candidates if index.exists(shot[1]) and index.exists(shot[2])
+    ]
+
+
+# Make sure every node a shot needs exists
+def validate_shots(shots: list):
+    index = get_scene_index()
+    for character, key, rig in shots:
+        if not index.exists(rig):
+            cmds.error(
+                "Character lights not found.\n" f"expected group with name: {rig}"
+            )
+        if not index.exists(key):
+            cmds.error(f"Could not find character key light, expected name: {key}")
+        if not index.exists(character):
+            cmds.error(f"Could not find main character, expected name: {character}")
+
+
+# Read the character and key light data of every shot in one pass through the API
+# instead of several xform/getAttr calls per shot
+# Each shot's data has the seconds its reads took as "read_seconds"
+def read_shot_key_data(shots: list):
+    selection = om.MSelectionList()
+    for character, key, _ in shots:
+        selection.add(character)
+        selection.add(key)
+
+    shot_data = []
+    for i in range(len(shots)):
+        shot_start_time = time.perf_counter()
+        character_path = selection.getDagPath(i * 2)
+        key_path = selection.getDagPath(i * 2 + 1)
+        character_position = om.MFnTransform(character_path).rotatePivot(
+            om.MSpace.kWorld
+        )
+        key_position = om.MFnTransform(key_path).rotatePivot(om.MSpace.kWorld)
+
+        key_light = om.MFnDependencyNode(om.MDagPath(key_path).extendToShape().node())
+        color_plug = key_light.findPlug("color", False)
+        shot_data.append(
+            {
+                "character_ws_position": [
+                    character_position.x,
+                    character_position.y,
+                    character_position.z,
+                ],
+                "key_ws_position": [key_position.x, key_position.y, key_position.z],
+                "uses_color_temp": key_light.findPlug(
+                    "aiUseColorTemperature", False
+                ).asBool(),
+                "color_temp": key_light.findPlug("aiColorTemperature", False).asFloat(),
+                "color": [color_plug.child(c).asFloat() for c in range(3)],
+                "read_seconds": time.perf_counter() - shot_start_time,
+            }
         )
 
-    character_key_children = cmds.listRelatives(character_key["transform"], children=True)
-    character_key["light"] = character_key_children[0]
-    character_key["ws_position"] = cmds.xform(character_key["transform"], q=1, ws=1, rp=1)
+    return shot_data
 
-    character = cmds.ls(CHARACTER_NAME)[0]
-    if character is None:
-        cmds.error(
-            f"Could not find main character, expected name: {CHARACTER_NAME}"
-        )
 
-    character_ws_position = cmds.xform(character, q=1, ws=1, rp=1)
+def get_sun_distance(key_data: dict):
     character_to_key_distance = euclidean_distance(
-        character_ws_position, character_key["ws_position"]
+        key_data["character_ws_position"], key_data["key_ws_position"]
     )
+    return character_to_key_distance * SUN_DISTANCE_RATIO
 
-    ### Color
-    character_key["uses_color_temp"] = (
-        cmds.getAttr(f"{character_key['light']}.aiUseColorTemperature") == 1
-    )
-    if character_key["uses_color_temp"] is True:
-        character_key["color_temp"] = cmds.getAttr(
-            f"{character_key['light']}.aiColorTemperature"
-        )
-    else:
-        character_key["color"] = cmds.getAttr(f"{character_key['light']}.color")
 
-    #################################
-    ### Adjust Environment Lights ###
-    #################################
+# Distances, radii and exposures of the environment lights for a sun distance
+# sun_beam_exposure can be passed in when it was already evaluated
+def compute_distance_settings(sun_y_distance: float, sun_beam_exposure: float = None):
+    sky_diffuse_distance = sun_y_distance * SKY_DIFFUSE_DISTANCE_RATIO
 
-    ### Position
-    # Set Sun light positions based on character key light
-    sun_group = cmds.group(em=True, name=SUN_GROUP_NAME)
-    cmds.parent(spot_light_transforms[SUN_BEAM], sun_group)
-    cmds.parent(spot_light_transforms[SUN_SPILL], sun_group)
-    sun_y_distance = character_to_key_distance * SUN_DISTANCE_RATIO
-    set_attr(sun_group, "translateY", sun_y_distance)
-    set_attr(sun_group, "rotateX", -90)
+    if sun_beam_exposure is None:
+        sun_beam_exposure = calculate_sun_exposure(sun_y_distance)
+
+    return {
+        "sun_y_distance": sun_y_distance,
+        "sky_diffuse_distance": sky_diffuse_distance,
+        "sky_diffuse_scale": sky_diffuse_distance * SKY_DIFFUSE_SCALE_RATIO,
+        "sun_beam_exposure": sun_beam_exposure,
+        "sun_spill_exposure": sun_beam_exposure * SUN_SPILL_EXPOSURE_RATIO,
+        "sky_diffuse_exposure": sun_beam_exposure * SKY_DIFFUSE_EXPOSURE_RATIO,
+        "sun_beam_radius": sun_y_distance * SUN_BEAM_RADIUS_RATIO,
+        "sun_spill_radius": sun_y_distance * SUN_SPILL_RADIUS_RATIO,
+    }
+
+
+def compute_temperature_settings(sun_beam_temp: float):
+    return {
+        "sun_beam_temp": sun_beam_temp,
+        "sun_spill_temp": sun_beam_temp * SUN_SPILL_TEMP_RATIO,
+        "sky_diffuse_temp": sun_beam_temp * SKY_DIFFUSE_TEMP_RATIO,
+    }
+
+
+# Calculate every environment light value from the character key data of one shot
+# sun_beam_exposure can be passed in when it was already evaluated for many shots,
+# and key_color_temp when the key color's temperature was already estimated
+def compute_environment_settings(
+    key_data: dict, sun_beam_exposure: float = None, key_color_temp: float = None
+):
+    settings = compute_distance_settings(get_sun_distance(key_data), sun_beam_exposure)
+    settings["uses_color_temp"] = key_data["uses_color_temp"] is True
 
-    # Set Sky Diffuse pointing down from above character
-    sky_diffuse_distance = sun_y_distance * SKY_DIFFUSE_DISTANCE_RATIO
-    set_attr(area_light_transforms[SKY_DIFFUSE], "translateY", sky_diffuse_distance)
-    set_attr(area_light_transforms[SKY_DIFFUSE], "rotateX", -90)
-
-    # Sky area scale
-    sky_diffuse_scale = sky_diffuse_distance * SKY_DIFFUSE_SCALE_RATIO
-    set_attr(area_light_transforms[SKY_DIFFUSE], "scaleX", sky_diffuse_scale)
-    set_attr(area_light_transforms[SKY_DIFFUSE], "scaleY", sky_diffuse_scale)
-    set_attr(area_light_transforms[SKY_DIFFUSE], "scaleZ", sky_diffuse_scale)
-
-    ### Exposure
-    # Sun Exposure
-    sun_beam_exposure = calculate_sun_exposure(sun_y_distance)
-    sun_spill_exposure = sun_beam_exposure * SUN_SPILL_EXPOSURE_RATIO
-    set_attr(spot_light_transforms[SUN_BEAM], "aiExposure", sun_beam_exposure)
-    set_attr(spot_light_transforms[SUN_SPILL], "aiExposure", sun_spill_exposure)
-
-    # Sky Exposure
-    sky_diffuse_exposure = sun_beam_exposure * SKY_DIFFUSE_EXPOSURE_RATIO
-    set_attr(area_lights[SKY_DIFFUSE], "aiExposure", sky_diffuse_exposure)
-
-    ### Color
     # Environment light colors are based on character light colors.
     # If character is lit by color temperature, env light temp is easier
-    # TODO: If character is lit by color w/o temp, find appropriate colors based on these
+    if settings["uses_color_temp"]:
+        settings.update(compute_temperature_settings(key_data["color_temp"]))
+    else:
+        # Lit by color, the temperature ratios are applied to the key color's
+        # estimated temperature and the sky and spill are desaturated
+        settings.update(
+            get_environment_colors(
+                key_data["color"],
+                SUN_SPILL_TEMP_RATIO,
+                SKY_DIFFUSE_TEMP_RATIO,
+                key_temperature=key_color_temp,
+            )
+        )
 
-    sun_beam_temp = SUN_BEAM_TEMP_DEFAULT
+    return settings
 
-    if character_key["uses_color_temp"] is True:
-        sun_beam_temp = character_key["color_temp"]
 
-    sun_spill_temp = sun_beam_temp * SUN_SPILL_TEMP_RATIO
-    sky_diffuse_temp = sun_beam_temp * SKY_DIFFUSE_TEMP_RATIO
+# Color or temperature attributes of one environment light
+def get_color_attributes(settings: dict, light: str):
+    if settings["uses_color_temp"]:
+        return {
+            "aiUseColorTemperature": 1,
+            "aiColorTemperature": settings[f"{light}_temp"],
+        }
 
-    # Sun Color
-    set_attr(spot_lights[SUN_BEAM], "aiUseColorTemperature", 1)
-    set_attr(spot_lights[SUN_SPILL], "aiUseColorTemperature", 1)
-    set_attr(spot_lights[SUN_BEAM], "aiColorTemperature", sun_beam_temp)
-    set_attr(spot_lights[SUN_SPILL], "aiColorTemperature", sun_spill_temp)
+    return {"aiUseColorTemperature": 0, "color": settings[f"{light}_color"]}
 
-    # Sky Color
-    set_attr(area_lights[SKY_DIFFUSE], "aiUseColorTemperature", 1)
-    set_attr(area_lights[SKY_DIFFUSE], "aiColorTemperature", sky_diffuse_temp)
 
-    # Sun Beam + Spill radius
-    sun_beam_radius = sun_y_distance * SUN_BEAM_RADIUS_RATIO
-    sun_spill_radius = sun_y_distance * SUN_SPILL_RADIUS_RATIO
-    set_attr(spot_light_transforms[SUN_BEAM], "aiRadius", sun_beam_radius)
-    set_attr(spot_light_transforms[SUN_SPILL], "aiRadius", sun_spill_radius)
+# Describe the environment rig of one shot for light_builder.build_lights
+# The environment group spec is first, and adopts the character light group
+def get_environment_rig_specs(
+    character_light_group: str, settings: dict, prefix: str = ""
+):
+    sky_diffuse_scale = settings["sky_diffuse_scale"]
+    sky_ray_attributes = {ray_type: 0 for ray_type in DISABLED_SKY_RAYS}
 
-    # Ray Types
+    env_light_group = {
+        "name": f"{prefix}{ENV_LIGHT_RIG_NAME}",
+        "children": [character_light_group],
+    }
+    # Set Sun light positions based on character key light
+    sun_group = {
+        "name": f"{prefix}{SUN_GROUP_NAME}",
+        "parent": env_light_group,
+        "transform_attributes": {
+            "translate": (0, settings["sun_y_distance"], 0),
+            "rotate": (-90, 0, 0),
+        },
+    }
+    sun_beam = {
+        "name": f"{prefix}{SUN_BEAM}_spot",
+        "type": "spotLight",
+        "parent": sun_group,
+        "attributes": {
+            "aiExposure": settings["sun_beam_exposure"],
+            **get_color_attributes(settings, SUN_BEAM),
+            "aiRadius": settings["sun_beam_radius"],
+        },
+    }
+    sun_spill = {
+        "name": f"{prefix}{SUN_SPILL}_spot",
+        "type": "spotLight",
+        "parent": sun_group,
+        "attributes": {
+            "aiExposure": settings["sun_spill_exposure"],
+            **get_color_attributes(settings, SUN_SPILL),
+            "aiRadius": settings["sun_spill_radius"],
+        },
+    }
+    # Set Sky Diffuse pointing down from above character
     # Remove specular from Sky diffuse
-    for ray_type in DISABLED_SKY_RAYS:
-        set_attr(area_lights[SKY_DIFFUSE], ray_type, 0)
+    sky_diffuse = {
+        "name": f"{prefix}{SKY_DIFFUSE}_area",
+        "type": "aiAreaLight",
+        "parent": env_light_group,
+        "transform_attributes": {
+            "translate": (0, settings["sky_diffuse_distance"], 0),
+            "rotate": (-90, 0, 0),
+            "scale": (sky_diffuse_scale, sky_diffuse_scale, sky_diffuse_scale),
+        },
+        "attributes": {
+            "aiExposure": settings["sky_diffuse_exposure"],
+            **get_color_attributes(settings, SKY_DIFFUSE),
+            "aiMaxBounces": SKY_BOUNCES,
+            **sky_ray_attributes,
+        },
+    }
+
+    return [env_light_group, sun_group, sun_beam, sun_spill, sky_diffuse]
+
+
+# Pick the lights of one rig out of the build_lights results,
+# index is where the rig's specs from get_environment_rig_specs start
+def get_environment_rig_lights(results: list, index: int):
+    return {
+        ENV_LIGHT_RIG_NAME: results[index],
+        SUN_GROUP_NAME: results[index + 1],
+        SUN_BEAM: results[index + 2],
+        SUN_SPILL: results[index + 3],
+        SKY_DIFFUSE: results[index + 4],
+    }
+
+
+# Calculate the settings of many shots, evaluating the exposure curve
+# and the key color temperatures for all at once
+def compute_environment_settings_batch(shot_data: list):
+    sun_y_distances = [get_sun_distance(key_data) for key_data in shot_data]
+    sun_beam_exposures = logistic_exposure_array(sun_y_distances, SUN_EXPOSURE_CURVE)
+
+    key_color_temps = [None] * len(shot_data)
+    color_indices = [
+        i
+        for i, key_data in enumerate(shot_data)
+        if key_data["uses_color_temp"] is not True
+    ]
+    if color_indices:
+        temperatures, _ = get_color_temperature_table().rgb_to_kelvin_array(
+            [shot_data[i]["color"] for i in color_indices]
+        )
+        for i, temperature in zip(color_indices, temperatures):
+            key_color_temps[i] = float(temperature)
+
+    return [
+        compute_environment_settings(key_data, float(sun_beam_exposure), key_color_temp)
+        for key_data, sun_beam_exposure, key_color_temp in zip(
+            shot_data, sun_beam_exposures, key_color_temps
+        )
+    ]
+
+
+# Create the environment lights of one shot and apply its settings
+# Returns the environment rig group
+def build_environment_rig(
+    character_light_group: str, settings: dict, prefix: str = ""
+):
+    specs = get_environment_rig_specs(character_light_group, settings, prefix=prefix)
+    return get_node_name(build_lights(specs)[0]["transform"])
+
+
+# Create the environment rigs of shots whose settings are already computed
+# Scene edits only, so the settings can be computed away from the main thread
+# Returns a report with the per-shot rigs and timings, and the timing of each phase
+# Each shot's "timings" has the seconds of its own specs and sample budget, its
+# share of the single build by its number of specs and an even share of the
+# live links, see add_shot_timing
+def build_environment_lighting(
+    shots: list,
+    shot_settings: list,
+    live: bool = False,
+    live_solver: str = "network",
+    sample_budget: int = None,
+):
+    report = {"shots": []}
+    # Every rig is described first and then created with a single modifier
+    spec_start_time = time.perf_counter()
+    specs = []
+    env_light_group_indices = []
+    for (character, key, rig), settings in zip(shots, shot_settings):
+        shot_start_time = time.perf_counter()
+        # Keep environment rigs in different namespaces from colliding
+        prefix = get_namespace(character).replace(":", "_")
+        env_light_group_indices.append(len(specs))
+        specs.extend(get_environment_rig_specs(rig, settings, prefix=prefix))
+        shot = {"character": character, "key": key, "rig": rig, "timings": {}}
+        add_shot_timing(shot, "spec", time.perf_counter() - shot_start_time)
+        report["shots"].append(shot)
+    report["spec_seconds"] = time.perf_counter() - spec_start_time
+
+    build_start_time = time.perf_counter()
+    results = build_lights(specs)
+    report["build_seconds"] = time.perf_counter() - build_start_time
+
+    spec_ends = env_light_group_indices[1:] + [len(specs)]
+    for shot, index, end in zip(report["shots"], env_light_group_indices, spec_ends):
+        shot["environment_rig"] = get_node_name(results[index]["transform"])
+        share = (end - index) / len(specs)
+        add_shot_timing(shot, "build", report["build_seconds"] * share)
+
+    if live:
+        # Imported here, the live rig builds on this module's ratios
+        from .live_environment_rig import link_environment_rigs
+
+        link_start_time = time.perf_counter()
+        rigs = [
+            get_environment_rig_lights(results, index)
+            for index in env_light_group_indices
+        ]
+        report["link_nodes"] = link_environment_rigs(
+            shots, rigs, shot_settings, live_solver
+        )
+        report["link_seconds"] = time.perf_counter() - link_start_time
+        for shot in report["shots"]:
+            add_shot_timing(shot, "link", report["link_seconds"] / len(shots))
+
+    if sample_budget is not None:
+        # Imported here, the budget builds on this module's distance math
+        from ..light_optimizer.sample_budget import (
+            allocate_light_samples,
+            get_group_lights,
+        )
 
-    set_attr(area_lights[SKY_DIFFUSE], "aiMaxBounces", SKY_BOUNCES)
+        writer = AttrWriter(use_modifier=True)
+        for shot in report["shots"]:
+            shot_start_time = time.perf_counter()
+            allocate_light_samples(
+                sample_budget,
+                get_group_lights(shot["environment_rig"]),
+                shot["character"],
+                writer=writer,
+            )
+            add_shot_timing(shot, "budget", time.perf_counter() - shot_start_time)
+        writer.flush()
+
+    return report
+
+
+# Shot timings by phase, e.g. "read", "build", with their sum as "seconds"
+# Batched phases, like the build and the vectorized compute, are shared out
+# between the shots instead of timed per shot
+def add_shot_timing(shot: dict, phase: str, seconds: float):
+    shot["timings"][phase] = seconds
+    shot["seconds"] = sum(shot["timings"].values())
+
+
+# Set up environment lighting for many shots in one pass
+# shots: list of (character, key light, character rig) triples,
+# discovered with character_pattern when not given
+# With live=True the rigs are driven by a node network that follows the key,
+# instead of keeping the values computed now, live_solver is "network" for
+# native utility nodes or "plugin" for the envLightSolver node
+# With a sample_budget, the squared aiSamples of every light in each shot's
+# environment rig add up to it, see light_optimizer.sample_budget
+# Returns a report with the per-shot rigs and the timing of each phase
+# A failed setup is rolled back, nothing is left half built
+@transactional("set_up_environment_lighting")
+def set_up_environment_lighting_batch(
+    shots: list = None,
+    character_pattern: str = CHARACTER_NAME,
+    live: bool = False,
+    live_solver: str = "network",
+    sample_budget: int = None,
+):
+    start_time = time.perf_counter()
+    if shots is None:
+        shots = find_environment_shots(character_pattern)
+    else:
+        validate_shots(shots)
 
-    # Group the environment lights
-    env_light_group = cmds.group(em=True, name=ENV_LIGHT_RIG_NAME)
-    cmds.parent(sun_group, env_light_group)
+    read_start_time = time.perf_counter()
+    shot_data = read_shot_key_data(shots)
+    read_seconds = time.perf_counter() - read_start_time
 
-    for area_light_transform in area_light_transforms.values():
-        cmds.parent(area_light_transform, env_light_group)
+    compute_start_time = time.perf_counter()
+    shot_settings = compute_environment_settings_batch(shot_data)
+    compute_seconds = time.perf_counter() - compute_start_time
 
-    cmds.parent(character_light_group, env_light_group)
+    report = build_environment_lighting(
+        shots, shot_settings, live, live_solver, sample_budget
+    )
+    report["read_seconds"] = read_seconds
+    report["compute_seconds"] = compute_seconds
+    for shot, key_data in zip(report["shots"], shot_data):
+        add_shot_timing(shot, "read", key_data["read_seconds"])
+        add_shot_timing(shot, "compute", compute_seconds / len(shots))
+    report["total_seconds"] = time.perf_counter() - start_time
+    print(
+        f"Environment lighting set up for {len(report['shots'])} shots "
+        f"in {report['total_seconds']:.3f}s "
+        f"(read {read_seconds:.3f}s, compute {compute_seconds:.3f}s, "
+        f"build {report['build_seconds']:.3f}s)"
+    )
+    if report["shots"]:
+        slowest = max(report["shots"], key=lambda shot: shot["seconds"])
+        print(f"Slowest shot: {slowest['character']} {slowest['seconds']:.3f}s")
+    return report
+
+
+def set_up_environment_lighting_around_character(
+    live: bool = False, live_solver: str = "network"
+):
+    return set_up_environment_lighting_batch(
+        [(CHARACTER_NAME, CHARACTER_KEY_NAME, CHARACTER_RIG_NAME)],
+        live=live,
+        live_solver=live_solver,
+    )
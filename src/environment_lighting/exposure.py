@@ -0,0 +1,331 @@
+import time
+from bisect import bisect_right
+from functools import lru_cache
+from math import exp, log
+
+# numpy ships with recent versions of mayapy, the pure Python paths are used without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Four parameter logistic curve fit from sample renders:
+# exposure = top + (bottom - top) / (1 + (distance / midpoint) ** slope)
+# Curves are (bottom, top, midpoint, slope)
+SUN_EXPOSURE_CURVE = (-3.606164, 43.71969, 748.8465, 0.2575185)
+SKY_EXPOSURE_CURVE = (-3.606164, 43.71969, 748.8465, 0.2575185)
+
+# The table is sampled evenly in log(distance), the curve is a logistic of
+# log(distance), so samples are densest near the character where exposure
+# changes fastest. Distances outside of the table are evaluated exactly.
+LOOKUP_TABLE_SIZE = 4096
+LOOKUP_TABLE_MIN_DISTANCE = 0.001
+LOOKUP_TABLE_MAX_DISTANCE = 100000.0
+
+
+#######################
+### Curve Functions ###
+#######################
+
+
+def logistic_exposure(distance: float, curve: tuple = SUN_EXPOSURE_CURVE):
+    bottom, top, midpoint, slope = curve
+    return top + (bottom - top) / (1 + (distance / midpoint) ** slope)
+
+
+# Evaluate the curve for many distances at once, e.g. a whole crowd
+# Returns a numpy array when numpy is available, otherwise a list
+def logistic_exposure_array(distances, curve: tuple = SUN_EXPOSURE_CURVE):
+    if np is None:
+        return [logistic_exposure(distance, curve) for distance in distances]
+
+    bottom, top, midpoint, slope = curve
+    distances = np.asarray(distances, dtype=np.float64)
+    return top + (bottom - top) / (1 + (distances / midpoint) ** slope)
+
+
+# Solve for the distance that gives the target exposure
+# Only exposures strictly between the curve's bottom and top have a solution
+def inverse_logistic_exposure(exposure: float, curve: tuple = SUN_EXPOSURE_CURVE):
+    bottom, top, midpoint, slope = curve
+    if not min(bottom, top) < exposure < max(bottom, top):
+        raise ValueError(
+            f"Exposure {exposure} is outside of the curve range ({bottom}, {top})"
+        )
+
+    return midpoint * ((bottom - top) / (exposure - top) - 1) ** (1 / slope)
+
+
+def inverse_logistic_exposure_array(exposures, curve: tuple = SUN_EXPOSURE_CURVE):
+    if np is None:
+        return [inverse_logistic_exposure(exposure, curve) for exposure in exposures]
+
+    bottom, top, midpoint, slope = curve
+    exposures = np.asarray(exposures, dtype=np.float64)
+    if np.any((exposures <= min(bottom, top)) | (exposures >= max(bottom, top))):
+        raise ValueError(f"Exposures must be within the curve range ({bottom}, {top})")
+
+    return midpoint * ((bottom - top) / (exposures - top) - 1) ** (1 / slope)
+
+
+####################
+### Lookup Table ###
+####################
+
+
+# Precomputed curve samples with linear interpolation between them
+# Meant for interactive use, e.g. while a slider is dragged
+class ExposureLookupTable:
+    def __init__(
+        self,
+        curve: tuple = SUN_EXPOSURE_CURVE,
+        max_distance: float = LOOKUP_TABLE_MAX_DISTANCE,
+        size: int = LOOKUP_TABLE_SIZE,
+        min_distance: float = LOOKUP_TABLE_MIN_DISTANCE,
+    ):
+        self.curve = curve
+        self.min_distance = min_distance
+        self.max_distance = max_distance
+        self.log_min_distance = log(min_distance)
+        self.step = (log(max_distance) - self.log_min_distance) / (size - 1)
+        self.log_distances = [
+            self.log_min_distance + i * self.step for i in range(size)
+        ]
+        self.exposures = [logistic_exposure(exp(x), curve) for x in self.log_distances]
+        if np is not None:
+            self.log_distances = np.asarray(self.log_distances)
+            self.exposures = np.asarray(self.exposures)
+
+    def __call__(self, distance: float):
+        if not self.min_distance < distance < self.max_distance:
+            return logistic_exposure(distance, self.curve)
+
+        # Samples are evenly spaced in log(distance), so the index is found
+        # without searching
+        position = (log(distance) - self.log_min_distance) / self.step
+        index = min(int(position), len(self.exposures) - 2)
+        weight = position - index
+        return float(
+            self.exposures[index]
+            + weight * (self.exposures[index + 1] - self.exposures[index])
+        )
+
+    def lookup_array(self, distances):
+        if np is None:
+            return [self(distance) for distance in distances]
+
+        distances = np.asarray(distances, dtype=np.float64)
+        clamped = np.clip(distances, self.min_distance, self.max_distance)
+        exposures = np.interp(np.log(clamped), self.log_distances, self.exposures)
+        outside = (distances <= self.min_distance) | (distances >= self.max_distance)
+        if outside.any():
+            exposures[outside] = logistic_exposure_array(distances[outside], self.curve)
+        return exposures
+
+    # Inverse lookup, valid because the curve is monotonic
+    def inverse(self, exposure: float):
+        exposures = self.exposures
+        if np is not None:
+            exposures = exposures.tolist()
+        low, high = sorted((exposures[0], exposures[-1]))
+        if not low < exposure < high:
+            return inverse_logistic_exposure(exposure, self.curve)
+
+        if exposures[-1] < exposures[0]:
+            exposures = [-e for e in exposures]
+            exposure = -exposure
+        index = min(max(bisect_right(exposures, exposure) - 1, 0), len(exposures) - 2)
+        span = exposures[index + 1] - exposures[index]
+        weight = (exposure - exposures[index]) / span if span else 0.0
+        return exp(float(self.log_distances[index]) + weight * self.step)
+
+
+@lru_cache(maxsize=8)
+def get_lookup_table(
+    curve: tuple = SUN_EXPOSURE_CURVE,
+    max_distance: float = LOOKUP_TABLE_MAX_DISTANCE,
+    size: int = LOOKUP_TABLE_SIZE,
+    min_distance: float = LOOKUP_TABLE_MIN_DISTANCE,
+):
+    return ExposureLookupTable(curve, max_distance, size, min_distance)
+
+
+#####################
+### Curve Fitting ###
+#####################
+
+
+# Fit new curve coefficients to (distance, exposure) samples from test renders
+# Uses Levenberg-Marquardt, starting from an existing curve
+def fit_exposure_curve(
+    distances: list,
+    exposures: list,
+    initial_curve: tuple = SUN_EXPOSURE_CURVE,
+    iterations: int = 200,
+    tolerance: float = 1e-10,
+):
+    if len(distances) != len(exposures):
+        raise ValueError("Need one exposure per distance")
+    if len(distances) < 4:
+        raise ValueError("Need at least 4 samples to fit 4 curve parameters")
+    if min(distances) <= 0:
+        raise ValueError("Sample distances must be greater than 0")
+
+    distances = [float(d) for d in distances]
+    exposures = [float(e) for e in exposures]
+    curve = list(initial_curve)
+    damping = 1e-3
+    error = get_squared_error(distances, exposures, curve)
+
+    for _ in range(iterations):
+        jacobian, residuals = get_jacobian_and_residuals(distances, exposures, curve)
+        normal_matrix = [
+            [sum(row[i] * row[j] for row in jacobian) for j in range(4)]
+            for i in range(4)
+        ]
+        gradient = [
+            sum(row[i] * r for row, r in zip(jacobian, residuals)) for i in range(4)
+        ]
+
+        # Raise the damping until a step lowers the error
+        while True:
+            damped_matrix = [list(row) for row in normal_matrix]
+            for i in range(4):
+                damped_matrix[i][i] *= 1 + damping
+            step = solve_linear_system(damped_matrix, gradient)
+            candidate = [c + s for c, s in zip(curve, step)] if step else None
+            if candidate and candidate[2] > 0:
+                candidate_error = get_squared_error(distances, exposures, candidate)
+                if candidate_error < error:
+                    break
+            damping *= 10
+            if damping > 1e12:
+                return tuple(curve)
+
+        converged = error - candidate_error < tolerance * max(error, tolerance)
+        curve, error = candidate, candidate_error
+        damping = max(damping / 10, 1e-12)
+        if converged:
+            break
+
+    return tuple(curve)
+
+
+def get_squared_error(distances: list, exposures: list, curve: list):
+    try:
+        return sum(
+            (logistic_exposure(d, curve) - e) ** 2 for d, e in zip(distances, exposures)
+        )
+    except (OverflowError, ZeroDivisionError):
+        return float("inf")
+
+
+def get_jacobian_and_residuals(distances: list, exposures: list, curve: list):
+    bottom, top, midpoint, slope = curve
+    jacobian = []
+    residuals = []
+    for distance, exposure in zip(distances, exposures):
+        u = (distance / midpoint) ** slope
+        denominator = 1 + u
+        d_exposure_d_u = -(bottom - top) / denominator**2
+        jacobian.append(
+            [
+                1 / denominator,
+                1 - 1 / denominator,
+                d_exposure_d_u * u * -slope / midpoint,
+                d_exposure_d_u * u * log(distance / midpoint),
+            ]
+        )
+        residuals.append(exposure - (top + (bottom - top) / denominator))
+
+    return jacobian, residuals
+
+
+# Gaussian elimination with partial pivoting, returns None for singular systems
+def solve_linear_system(matrix: list, values: list):
+    size = len(values)
+    rows = [list(row) + [value] for row, value in zip(matrix, values)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda r: abs(rows[r][column]))
+        if abs(rows[pivot][column]) < 1e-300:
+            return None
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        for row in range(column + 1, size):
+            factor = rows[row][column] / rows[column][column]
+            for i in range(column, size + 1):
+                rows[row][i] -= factor * rows[column][i]
+
+    solution = [0.0] * size
+    for row in reversed(range(size)):
+        total = sum(rows[row][i] * solution[i] for i in range(row + 1, size))
+        solution[row] = (rows[row][size] - total) / rows[row][row]
+
+    return solution
+
+
+#################
+### Benchmark ###
+#################
+
+
+# Time the scalar, vectorized and lookup table paths for each crowd size, and
+# check the lookup table against the exact curve in both directions
+# Distances are spread evenly in log(distance) from 0.1 to the table's end
+# Returns {size: {"scalar": seconds, "vectorized": seconds, "lookup_table": seconds,
+#   "max_error": stops, "max_inverse_error": relative distance error}}
+def benchmark_exposure(sizes: tuple = (1, 10, 100, 1000, 10000), repeats: int = 20):
+    table = get_lookup_table()
+    results = {}
+    for size in sizes:
+        distance_range = LOOKUP_TABLE_MAX_DISTANCE / 0.1
+        distances = [0.1 * distance_range ** ((i + 0.5) / size) for i in range(size)]
+        if np is not None:
+            distance_array = np.asarray(distances)
+        else:
+            distance_array = distances
+
+        timings = {
+            "scalar": time_call(
+                lambda: [logistic_exposure(d) for d in distances], repeats
+            ),
+            "vectorized": time_call(
+                lambda: logistic_exposure_array(distance_array), repeats
+            ),
+            "lookup_table": time_call(
+                lambda: table.lookup_array(distance_array), repeats
+            ),
+        }
+        fastest = min(timings, key=timings.get)
+        exact = [logistic_exposure(d) for d in distances]
+        max_error = max(
+            abs(table(d) - exposure) for d, exposure in zip(distances, exact)
+        )
+        max_inverse_error = max(
+            abs(table.inverse(exposure) - d) / d
+            for d, exposure in zip(distances, exact)
+        )
+        results[size] = {
+            **timings,
+            "max_error": max_error,
+            "max_inverse_error": max_inverse_error,
+        }
+        summary = ", ".join(
+            f"{name} {seconds * 1e6:.1f}us" for name, seconds in timings.items()
+        )
+        print(
+            f"{size:>7} lights: {summary} -> {fastest}, "
+            f"max error {max_error:.2e} stops, inverse {max_inverse_error:.2e}"
+        )
+
+    return results
+
+
+# Best time of several runs
+def time_call(function, repeats: int):
+    best = float("inf")
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start_time)
+
+    return best
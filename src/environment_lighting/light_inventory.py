@@ -0,0 +1,412 @@
+from PySide2 import QtCore, QtWidgets
+
+import maya.api.OpenMaya as om
+
+from .dockable_ui import DockableGUI, dock_window
+from ..light_optimizer.ray_visibility import ARNOLD_LIGHT_TYPES, RAY_ATTRIBUTES
+from ..utils.attr_writer import AttrWriter
+from ..utils.scene_index import DROP_EVENTS, LOADED_EVENTS, get_scene_index
+from ..utils.transaction import Transaction
+
+# (header, light shape attribute), "name" and "type" are not attributes
+COLUMNS = [
+    ("Name", "name"),
+    ("Type", "type"),
+    ("Exposure", "aiExposure"),
+    ("Temperature", "aiColorTemperature"),
+    ("Radius", "aiRadius"),
+    ("Diffuse", "aiDiffuse"),
+    ("Specular", "aiSpecular"),
+    ("SSS", "aiSss"),
+    ("Indirect", "aiIndirect"),
+    ("Volume", "aiVolume"),
+]
+COLUMN_KEYS = [key for _, key in COLUMNS]
+NODE_KEYS = ["name", "type"]
+NAME_COLUMN = 0
+# Ray columns show a check box, a ray is on when its multiplier is above 0
+RAY_ON_VALUE = 1.0
+
+# Callback changes are collected and shown at most this often
+UPDATE_INTERVAL_MS = 100
+ROW_HEIGHT = 20
+
+
+# Every Arnold light in the scene, one row per light shape
+#
+# Values are read from the scene when the view first asks for them, so only
+# the rows on screen are ever read, then cached until the light changes.
+# Attribute changed callbacks on each light clear the changed values, node
+# added/removed callbacks insert and remove rows, and the changes are shown
+# together on a timer instead of once per callback.
+class LightInventoryModel(QtCore.QAbstractTableModel):
+    def __init__(self, parent=None):
+        super(LightInventoryModel, self).__init__(parent)
+        self.handles = []
+        self.rows = {}  # hash code -> row
+        self.values = {}  # hash code -> {column key: value}
+        self.transforms = {}  # transform hash code -> light hash code
+        self.node_callback_ids = {}  # hash code -> callback ids
+        self.scene_callback_ids = []
+        self.callback_ids = []
+
+        self.changed_rows = set()
+        self.added = []
+        self.removed = set()
+        self.update_timer = QtCore.QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(UPDATE_INTERVAL_MS)
+        self.update_timer.timeout.connect(self.apply_updates)
+
+        self.add_scene_lights()
+        self.add_callbacks()
+
+    def add_scene_lights(self):
+        index = get_scene_index()
+        for light_type in ARNOLD_LIGHT_TYPES:
+            for handle in index.find_by_type(light_type):
+                self.add_light(handle)
+
+    def add_callbacks(self):
+        self.scene_callback_ids = [
+            om.MSceneMessage.addCallback(event, self.on_scene_closing)
+            for event in DROP_EVENTS
+        ] + [
+            om.MSceneMessage.addCallback(event, self.on_scene_replaced)
+            for event in LOADED_EVENTS
+        ]
+        self.add_node_callbacks()
+
+    # Removed while a scene is replaced, so they do not run for its nodes
+    def add_node_callbacks(self):
+        for light_type in ARNOLD_LIGHT_TYPES:
+            self.callback_ids.append(
+                om.MDGMessage.addNodeAddedCallback(self.on_node_added, light_type)
+            )
+            self.callback_ids.append(
+                om.MDGMessage.addNodeRemovedCallback(self.on_node_removed, light_type)
+            )
+        self.callback_ids.append(
+            om.MNodeMessage.addNameChangedCallback(
+                om.MObject.kNullObj, self.on_name_changed
+            )
+        )
+
+    def remove_callbacks(self):
+        callback_ids = self.scene_callback_ids + self.callback_ids + [
+            callback_id
+            for node_callback_ids in self.node_callback_ids.values()
+            for callback_id in node_callback_ids
+        ]
+        if callback_ids:
+            om.MMessage.removeCallbacks(callback_ids)
+        self.scene_callback_ids = []
+        self.callback_ids = []
+        self.node_callback_ids = {}
+
+    ##############
+    ### Lights ###
+    ##############
+
+    def add_light(self, handle: om.MObjectHandle):
+        hash_code = handle.hashCode()
+        if hash_code in self.rows:
+            return
+
+        self.rows[hash_code] = len(self.handles)
+        self.handles.append(handle)
+        self.node_callback_ids[hash_code] = [
+            om.MNodeMessage.addAttributeChangedCallback(
+                handle.object(), self.on_attribute_changed
+            )
+        ]
+
+    def remove_lights(self, hash_codes: set):
+        rows = sorted(
+            [self.rows[hash_code] for hash_code in hash_codes & set(self.rows)],
+            reverse=True,
+        )
+        # One removal per run of neighbouring rows
+        while rows:
+            last = first = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+            self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+            del self.handles[first : last + 1]
+            self.endRemoveRows()
+
+        for hash_code in hash_codes:
+            self.values.pop(hash_code, None)
+            callback_ids = self.node_callback_ids.pop(hash_code, [])
+            if callback_ids:
+                om.MMessage.removeCallbacks(callback_ids)
+        self.transforms = {
+            transform: light
+            for transform, light in self.transforms.items()
+            if light not in hash_codes
+        }
+        self.rows = {handle.hashCode(): row for row, handle in enumerate(self.handles)}
+
+    # One value of a row, read from the scene on first use
+    def get_value(self, row: int, key: str):
+        handle = self.handles[row]
+        hash_code = handle.hashCode()
+        values = self.values.get(hash_code)
+        if values is None:
+            values = self.values[hash_code] = {}
+            # The name shown is the transform's
+            transform = om.MFnDagNode(handle.object()).parent(0)
+            self.transforms[om.MObjectHandle(transform).hashCode()] = hash_code
+        if key not in values:
+            values[key] = read_light_value(handle, key)
+
+        return values[key]
+
+    # Write one attribute of many lights with a single modifier, as one undo step
+    def set_values(self, rows: list, attribute: str, value: any):
+        with Transaction(f"set_{attribute}"):
+            writer = AttrWriter(use_modifier=True)
+            for row in rows:
+                writer.set(self.handles[row], attribute, value)
+            writer.flush()
+
+    #################
+    ### Callbacks ###
+    #################
+
+    def on_node_added(self, node, client_data=None):
+        self.added.append(om.MObjectHandle(node))
+        self.update_timer.start()
+
+    def on_node_removed(self, node, client_data=None):
+        self.removed.add(om.MObjectHandle(node).hashCode())
+        self.update_timer.start()
+
+    def on_name_changed(self, node, previous_name, client_data=None):
+        hash_code = om.MObjectHandle(node).hashCode()
+        self.clear_value(self.transforms.get(hash_code, hash_code), "name")
+
+    def on_attribute_changed(self, message, plug, other_plug, client_data=None):
+        if not message & om.MNodeMessage.kAttributeSet:
+            return
+
+        attribute = plug.partialName(useLongNames=True)
+        if attribute in COLUMN_KEYS:
+            self.clear_value(om.MObjectHandle(plug.node()).hashCode(), attribute)
+
+    # The table is emptied before the scene is torn down
+    def on_scene_closing(self, client_data=None):
+        self.beginResetModel()
+        self.clear()
+        self.endResetModel()
+
+    # Every light is replaced, the rows are read again
+    def on_scene_replaced(self, client_data=None):
+        self.beginResetModel()
+        self.clear()
+        self.add_scene_lights()
+        self.add_node_callbacks()
+        self.endResetModel()
+
+    def clear(self):
+        callback_ids = self.callback_ids + [
+            callback_id
+            for node_callback_ids in self.node_callback_ids.values()
+            for callback_id in node_callback_ids
+        ]
+        if callback_ids:
+            om.MMessage.removeCallbacks(callback_ids)
+        self.callback_ids = []
+        self.update_timer.stop()
+        self.handles = []
+        self.rows = {}
+        self.values = {}
+        self.transforms = {}
+        self.node_callback_ids = {}
+        self.changed_rows = set()
+        self.added = []
+        self.removed = set()
+
+    # Forget a cached value, it is read again when the view asks for it
+    def clear_value(self, hash_code: int, key: str):
+        row = self.rows.get(hash_code)
+        values = self.values.get(hash_code)
+        if row is None or values is None:
+            return
+
+        values.pop(key, None)
+        self.changed_rows.add(row)
+        self.update_timer.start()
+
+    # Show the changes collected since the last update
+    def apply_updates(self):
+        if self.removed:
+            # Rows move up, changes of the lights that are left move with them
+            changed = [self.handles[row].hashCode() for row in self.changed_rows]
+            self.remove_lights(self.removed)
+            self.removed = set()
+            self.changed_rows = {
+                self.rows[hash_code] for hash_code in changed if hash_code in self.rows
+            }
+
+        added = [handle for handle in self.added if handle.isValid()]
+        self.added = []
+        if added:
+            first = len(self.handles)
+            self.beginInsertRows(QtCore.QModelIndex(), first, first + len(added) - 1)
+            for handle in added:
+                self.add_light(handle)
+            self.endInsertRows()
+
+        if self.changed_rows:
+            first, last = min(self.changed_rows), max(self.changed_rows)
+            self.changed_rows = set()
+            self.dataChanged.emit(
+                self.index(first, 0), self.index(last, len(COLUMNS) - 1)
+            )
+
+    #############
+    ### Model ###
+    #############
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.handles)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return COLUMNS[section][0]
+
+        return None
+
+    def flags(self, index):
+        flags = QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+        key = COLUMN_KEYS[index.column()]
+        if key in RAY_ATTRIBUTES:
+            flags |= QtCore.Qt.ItemIsUserCheckable
+        elif key not in NODE_KEYS:
+            flags |= QtCore.Qt.ItemIsEditable
+
+        return flags
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or not self.handles[index.row()].isValid():
+            return None
+        if role not in (
+            QtCore.Qt.DisplayRole,
+            QtCore.Qt.EditRole,
+            QtCore.Qt.CheckStateRole,
+        ):
+            return None
+
+        key = COLUMN_KEYS[index.column()]
+        value = self.get_value(index.row(), key)
+        if value is None or key in NODE_KEYS:
+            return value if role == QtCore.Qt.DisplayRole else None
+        if key in RAY_ATTRIBUTES:
+            if role == QtCore.Qt.CheckStateRole:
+                return QtCore.Qt.Checked if value > 0 else QtCore.Qt.Unchecked
+            return f"{value:g}" if role == QtCore.Qt.DisplayRole else None
+        if role == QtCore.Qt.CheckStateRole:
+            return None
+
+        return round(value, 3)
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        key = COLUMN_KEYS[index.column()]
+        if key in NODE_KEYS:
+            return False
+
+        if role == QtCore.Qt.CheckStateRole:
+            value = RAY_ON_VALUE if value == QtCore.Qt.Checked else 0.0
+        elif role != QtCore.Qt.EditRole:
+            return False
+
+        self.set_values([index.row()], key, float(value))
+        return True
+
+
+# Name, type or one attribute value of a light shape
+def read_light_value(handle: om.MObjectHandle, key: str):
+    shape = om.MFnDagNode(handle.object())
+    if key == "name":
+        return om.MFnDagNode(shape.parent(0)).partialPathName()
+    if key == "type":
+        return shape.typeName
+    if not shape.hasAttribute(key):
+        return None
+
+    return shape.findPlug(key, False).asFloat()
+
+
+# Dockable table of every Arnold light in the scene
+# Selected rows are edited together, with one write for all of them
+class LightInventoryPanel(DockableGUI):
+    CONTROL_NAME = "maya_tools_light_inventory"
+    DOCK_LABEL_NAME = "Light Inventory"
+
+    def __init__(self, parent=None):
+        super(LightInventoryPanel, self).__init__(parent)
+        layout = QtWidgets.QVBoxLayout(self)
+
+        self.model = LightInventoryModel(self)
+        self.proxy = QtCore.QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setFilterKeyColumn(NAME_COLUMN)
+        self.proxy.setFilterCaseSensitivity(QtCore.Qt.CaseInsensitive)
+
+        self.filter_edit = QtWidgets.QLineEdit(self)
+        self.filter_edit.setPlaceholderText("Filter by name")
+        self.filter_edit.textChanged.connect(self.proxy.setFilterWildcard)
+        layout.addWidget(self.filter_edit)
+
+        # Fixed row heights let the view place rows without measuring them
+        self.view = QtWidgets.QTableView(self)
+        self.view.setModel(self.proxy)
+        self.view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.view.setWordWrap(False)
+        vertical_header = self.view.verticalHeader()
+        vertical_header.setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(ROW_HEIGHT)
+        vertical_header.hide()
+        layout.addWidget(self.view)
+
+        # Bulk edit of the selected rows
+        edit_layout = QtWidgets.QHBoxLayout()
+        self.attribute_box = QtWidgets.QComboBox(self)
+        for header, key in COLUMNS:
+            if key not in NODE_KEYS:
+                self.attribute_box.addItem(header, key)
+        edit_layout.addWidget(self.attribute_box)
+        self.value_box = QtWidgets.QDoubleSpinBox(self)
+        self.value_box.setRange(-100000, 100000)
+        self.value_box.setDecimals(3)
+        edit_layout.addWidget(self.value_box)
+        apply_button = QtWidgets.QPushButton("Set Selected", self)
+        apply_button.clicked.connect(self.set_selected)
+        edit_layout.addWidget(apply_button)
+        layout.addLayout(edit_layout)
+
+        # Not a method of the model, which may be deleted first
+        model = self.model
+        self.destroyed.connect(lambda *args: model.remove_callbacks())
+
+    def get_selected_rows(self):
+        return sorted(
+            {
+                self.proxy.mapToSource(index).row()
+                for index in self.view.selectionModel().selectedRows()
+            }
+        )
+
+    def set_selected(self):
+        rows = self.get_selected_rows()
+        if rows:
+            attribute = self.attribute_box.currentData()
+            self.model.set_values(rows, attribute, self.value_box.value())
+
+
+def show_light_inventory():
+    return dock_window(LightInventoryPanel)
@@ -0,0 +1,211 @@
+from PySide2 import QtCore, QtWidgets
+
+import maya.cmds as cmds
+
+from .dockable_ui import BackgroundTask, DockableGUI, dock_window
+from .environment_lighting import (
+    CHARACTER_NAME,
+    build_environment_lighting,
+    compute_environment_settings_batch,
+    find_environment_shots,
+    read_shot_key_data,
+)
+from ..init_texture_shader.batch_texture_shader import build_material_networks
+from ..init_texture_shader.texture_discovery import discover_materials
+from ..init_texture_shader.texture_mipmaps import (
+    configure_arnold_texture_streaming,
+    use_tx_textures,
+)
+from ..utils.transaction import Transaction
+
+# Shots and materials are computed and built this many at a time, the panel
+# updates and checks for cancel in between
+SHOT_CHUNK_SIZE = 25
+MATERIAL_CHUNK_SIZE = 25
+
+
+def get_chunks(items: list, size: int):
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+# Dockable panel for the batch lighting tools
+# Everything that does not touch the scene runs in a QThreadPool: exposure and
+# color math, texture discovery and .tx conversion. Scene edits are applied in
+# chunks on the main thread, so Maya stays responsive and a run can be cancelled
+class LightingPanel(DockableGUI):
+    CONTROL_NAME = "maya_tools_lighting_panel"
+    DOCK_LABEL_NAME = "Lighting"
+
+    def __init__(self, parent=None):
+        super(LightingPanel, self).__init__(parent)
+        self.task = None
+        self.buttons = []
+        layout = QtWidgets.QVBoxLayout(self)
+
+        # Environment lighting
+        environment_box = QtWidgets.QGroupBox("Environment Lighting", self)
+        environment_layout = QtWidgets.QFormLayout(environment_box)
+        self.character_pattern = QtWidgets.QLineEdit(CHARACTER_NAME, self)
+        environment_layout.addRow("Characters", self.character_pattern)
+        self.live_checkbox = QtWidgets.QCheckBox("Follow Key Light", self)
+        environment_layout.addRow(self.live_checkbox)
+        self.add_button(
+            environment_layout, "Build Environment Lights", self.build_environment
+        )
+        layout.addWidget(environment_box)
+
+        # Texture shaders
+        texture_box = QtWidgets.QGroupBox("Texture Shaders", self)
+        texture_layout = QtWidgets.QFormLayout(texture_box)
+        directory_layout = QtWidgets.QHBoxLayout()
+        self.texture_directory = QtWidgets.QLineEdit(self)
+        directory_layout.addWidget(self.texture_directory)
+        browse_button = QtWidgets.QPushButton("...", self)
+        browse_button.clicked.connect(self.browse_texture_directory)
+        directory_layout.addWidget(browse_button)
+        texture_layout.addRow("Directory", directory_layout)
+        self.dedup_checkbox = QtWidgets.QCheckBox("Share Identical Nodes", self)
+        texture_layout.addRow(self.dedup_checkbox)
+        self.tiled_checkbox = QtWidgets.QCheckBox("Tiled Textures (.tx)", self)
+        texture_layout.addRow(self.tiled_checkbox)
+        self.add_button(texture_layout, "Build Texture Shaders", self.build_textures)
+        layout.addWidget(texture_box)
+
+        # Progress
+        self.progress_bar = QtWidgets.QProgressBar(self)
+        layout.addWidget(self.progress_bar)
+        self.status_label = QtWidgets.QLabel("", self)
+        layout.addWidget(self.status_label)
+        self.cancel_button = QtWidgets.QPushButton("Cancel", self)
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel)
+        layout.addWidget(self.cancel_button)
+        layout.addStretch()
+
+    def add_button(self, layout: QtWidgets.QFormLayout, label: str, callback):
+        button = QtWidgets.QPushButton(label, self)
+        button.clicked.connect(callback)
+        layout.addRow(button)
+        self.buttons.append(button)
+
+    def browse_texture_directory(self):
+        directory = cmds.fileDialog2(fileMode=3, caption="Texture Directory")
+        if directory:
+            self.texture_directory.setText(directory[0])
+
+    def start(self, work, apply, message: str):
+        if self.task is not None:
+            return
+
+        self.task = BackgroundTask(work, apply)
+        self.task.signals.progress.connect(self.show_progress)
+        self.task.signals.failed.connect(self.show_failure)
+        self.task.signals.finished.connect(self.show_finished)
+        for button in self.buttons:
+            button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.progress_bar.setRange(0, 0)
+        self.status_label.setText(message)
+        QtCore.QThreadPool.globalInstance().start(self.task)
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.status_label.setText("Cancelling...")
+
+    def stop(self):
+        self.task = None
+        for button in self.buttons:
+            button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.progress_bar.setRange(0, 1)
+
+    def show_progress(self, done: int, total: int, message: str):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+        if message:
+            self.status_label.setText(message)
+
+    def show_failure(self, error: str):
+        self.stop()
+        self.status_label.setText(error.strip().splitlines()[-1])
+        cmds.warning(error)
+
+    def show_finished(self, cancelled: bool):
+        self.stop()
+        self.progress_bar.setValue(0 if cancelled else 1)
+        if cancelled:
+            self.status_label.setText("Cancelled, finished steps were kept")
+
+    # The shots are read on the main thread, Maya's scene is not thread safe,
+    # the settings are computed in the pool and the rigs built in chunks
+    def build_environment(self):
+        pattern = self.character_pattern.text() or CHARACTER_NAME
+        shots = find_environment_shots(pattern)
+        shot_data = read_shot_key_data(shots)
+        live = self.live_checkbox.isChecked()
+
+        def work(task: BackgroundTask):
+            shot_settings = []
+            for chunk in get_chunks(shot_data, SHOT_CHUNK_SIZE):
+                if task.is_cancelled():
+                    break
+                shot_settings.extend(compute_environment_settings_batch(chunk))
+                task.report(len(shot_settings), len(shots), "Computing settings")
+
+            return shot_settings
+
+        def apply(shot_settings: list, task: BackgroundTask):
+            built = 0
+            for chunk in get_chunks(list(range(len(shots))), SHOT_CHUNK_SIZE):
+                with Transaction("set_up_environment_lighting"):
+                    build_environment_lighting(
+                        [shots[i] for i in chunk],
+                        [shot_settings[i] for i in chunk],
+                        live=live,
+                    )
+                built += len(chunk)
+                task.report(built, len(shots), f"Built {built} of {len(shots)} shots")
+                yield
+
+        self.start(work, apply, f"Found {len(shots)} shots")
+
+    # Texture files are found, probed and converted in the pool, the shading
+    # networks are built in chunks
+    def build_textures(self):
+        directory = self.texture_directory.text()
+        if not directory:
+            self.status_label.setText("Pick a texture directory first")
+            return
+        dedup = self.dedup_checkbox.isChecked()
+        tiled = self.tiled_checkbox.isChecked()
+
+        def work(task: BackgroundTask):
+            materials = discover_materials(directory)
+            task.report(0, len(materials), f"Found {len(materials)} texture sets")
+            if tiled and not task.is_cancelled():
+                task.report(0, 0, "Converting textures to .tx")
+                use_tx_textures(materials)
+
+            return materials
+
+        def apply(materials: dict, task: BackgroundTask):
+            if tiled:
+                configure_arnold_texture_streaming()
+            built = 0
+            for chunk in get_chunks(list(materials), MATERIAL_CHUNK_SIZE):
+                with Transaction("build_material_networks"):
+                    build_material_networks(
+                        {material: materials[material] for material in chunk},
+                        dedup=dedup,
+                    )
+                built += len(chunk)
+                message = f"Built {built} of {len(materials)} materials"
+                task.report(built, len(materials), message)
+                yield
+
+        self.start(work, apply, f"Searching {directory}")
+
+
+def show_lighting_panel():
+    return dock_window(LightingPanel)
@@ -0,0 +1,392 @@
+import os
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from .color_temperature import (
+    SKY_DIFFUSE_DESATURATION,
+    SUN_SPILL_DESATURATION,
+    get_color_temperature_table,
+)
+from .environment_lighting import (
+    SKY_DIFFUSE,
+    SKY_DIFFUSE_DISTANCE_RATIO,
+    SKY_DIFFUSE_EXPOSURE_RATIO,
+    SKY_DIFFUSE_SCALE_RATIO,
+    SKY_DIFFUSE_TEMP_RATIO,
+    SUN_BEAM,
+    SUN_BEAM_RADIUS_RATIO,
+    SUN_DISTANCE_RATIO,
+    SUN_GROUP_NAME,
+    SUN_SPILL,
+    SUN_SPILL_EXPOSURE_RATIO,
+    SUN_SPILL_RADIUS_RATIO,
+    SUN_SPILL_TEMP_RATIO,
+    get_namespace,
+)
+from .env_light_solver import (
+    DISTANCE_OUTPUTS,
+    NODE_NAME,
+    PLUGIN_NAME,
+    TEMPERATURE_OUTPUTS,
+)
+from .exposure import SUN_EXPOSURE_CURVE
+from ..utils.node_network import ShadingNetworkBuilder
+
+# multiplyDivide and plusMinusAverage operations
+MULTIPLY = 1
+DIVIDE = 2
+POWER = 3
+SUM = 1
+
+# condition operation
+GREATER_THAN = 2
+
+# How the rig values are computed, see add_environment_network
+SOLVER_NETWORK = "network"
+SOLVER_PLUGIN = "plugin"
+
+
+# Drive the environment rig of each shot from its character and key light with
+# a node network, so the rig follows the key as it moves or is animated
+# Nothing runs in the tools per frame, the network evaluates in parallel
+# with the rest of the scene
+#
+# solver: SOLVER_NETWORK builds it from native utility nodes,
+# SOLVER_PLUGIN from one envLightSolver node per shot
+#
+# shots: (character, key light, character rig) triples
+# rigs: get_environment_rig_lights output per shot
+# settings: compute_environment_settings output per shot, for the color tints
+def link_environment_rigs(
+    shots: list, rigs: list, settings: list, solver: str = SOLVER_NETWORK
+):
+    if solver == SOLVER_PLUGIN:
+        load_solver_plugin()
+
+    builder = ShadingNetworkBuilder()
+    selection = om.MSelectionList()
+    for character, key, _ in shots:
+        selection.add(character)
+        selection.add(key)
+
+    for i, (rig, shot_settings) in enumerate(zip(rigs, settings)):
+        character = selection.getDependNode(i * 2)
+        key_path = selection.getDagPath(i * 2 + 1)
+        key = key_path.node()
+        key_shape = om.MDagPath(key_path).extendToShape().node()
+        # Named like the shot's environment lights
+        prefix = get_namespace(shots[i][0]).replace(":", "_")
+        add_environment_network(
+            builder, prefix, character, key, key_shape, rig, shot_settings, solver
+        )
+
+    builder.commit()
+    return builder.nodes_created
+
+
+def load_solver_plugin():
+    if not cmds.pluginInfo(PLUGIN_NAME, q=True, loaded=True):
+        cmds.loadPlugin(os.path.join(os.path.dirname(__file__), f"{PLUGIN_NAME}.py"))
+
+
+def add_environment_network(
+    builder: ShadingNetworkBuilder,
+    prefix: str,
+    character: om.MObject,
+    key: om.MObject,
+    key_shape: om.MObject,
+    rig: dict,
+    settings: dict,
+    solver: str = SOLVER_NETWORK,
+):
+    sun_group = rig[SUN_GROUP_NAME]["transform"].object()
+    sun_beam = rig[SUN_BEAM]["shape"].object()
+    sun_spill = rig[SUN_SPILL]["shape"].object()
+    sky_diffuse = rig[SKY_DIFFUSE]["shape"].object()
+    sky_diffuse_transform = rig[SKY_DIFFUSE]["transform"].object()
+
+    def create(node_type: str, name: str, classification: str = "utility"):
+        return builder.create_node(node_type, f"{prefix}{name}", classification)
+
+    if solver == SOLVER_PLUGIN:
+        outputs = add_solver_node(builder, create, character, key, key_shape)
+    else:
+        outputs = add_ratio_network(builder, create, character, key, key_shape)
+
+    destinations = {
+        "sun_y_distance": [(sun_group, "translateY")],
+        "sky_diffuse_distance": [(sky_diffuse_transform, "translateY")],
+        "sky_diffuse_scale": [
+            (sky_diffuse_transform, f"scale{axis}") for axis in "XYZ"
+        ],
+        "sun_beam_radius": [(sun_beam, "aiRadius")],
+        "sun_spill_radius": [(sun_spill, "aiRadius")],
+        "sun_beam_exposure": [(sun_beam, "aiExposure")],
+        "sun_spill_exposure": [(sun_spill, "aiExposure")],
+        "sky_diffuse_exposure": [(sky_diffuse, "aiExposure")],
+        "sun_beam_temp": [(sun_beam, "aiColorTemperature")],
+        "sun_spill_temp": [(sun_spill, "aiColorTemperature")],
+        "sky_diffuse_temp": [(sky_diffuse, "aiColorTemperature")],
+    }
+    for key_name, (source, source_attribute) in outputs.items():
+        for destination, attribute in destinations[key_name]:
+            builder.connect(source, source_attribute, destination, attribute)
+
+    # The key decides between temperature and color for every light
+    for light in [sun_beam, sun_spill, sky_diffuse]:
+        builder.connect(
+            key_shape, "aiUseColorTemperature", light, "aiUseColorTemperature"
+        )
+
+    # Colors follow the key color, the temperature shift is fixed when the rig
+    # is linked while the desaturation follows the key
+    # All of them are normalized like color_temperature.get_environment_colors
+    sun_beam_color = add_normalize_network(
+        builder, create, key_shape, "color", "env_sun_beam"
+    )
+    builder.connect(sun_beam_color, "outColor", sun_beam, "color")
+    add_color_network(
+        builder,
+        create,
+        key_shape,
+        sun_spill,
+        "env_sun_spill",
+        get_temperature_tint(settings["sun_beam_temp"], settings["sun_spill_temp"]),
+        SUN_SPILL_DESATURATION,
+    )
+    add_color_network(
+        builder,
+        create,
+        key_shape,
+        sky_diffuse,
+        "env_sky_diffuse",
+        get_temperature_tint(settings["sun_beam_temp"], settings["sky_diffuse_temp"]),
+        SKY_DIFFUSE_DESATURATION,
+    )
+
+
+# One envLightSolver node computes every value, see env_light_solver.py
+# Returns (node, attribute) by compute_environment_settings key
+def add_solver_node(
+    builder: ShadingNetworkBuilder,
+    create,
+    character: om.MObject,
+    key: om.MObject,
+    key_shape: om.MObject,
+):
+    # Not a shading node, so it stays out of the render utility list
+    solver = create(NODE_NAME, "env_light_solver", None)
+    builder.connect(character, "worldMatrix[0]", solver, "characterMatrix")
+    builder.connect(character, "rotatePivot", solver, "characterPivot")
+    builder.connect(key, "worldMatrix[0]", solver, "keyMatrix")
+    builder.connect(key, "rotatePivot", solver, "keyPivot")
+    builder.connect(key_shape, "aiColorTemperature", solver, "keyTemperature")
+    return {
+        key_name: (solver, attribute)
+        for outputs in (DISTANCE_OUTPUTS, TEMPERATURE_OUTPUTS)
+        for key_name, (attribute, _) in outputs.items()
+    }
+
+
+# The same values from native utility nodes, no plugin needed
+# Returns (node, attribute) by compute_environment_settings key
+def add_ratio_network(
+    builder: ShadingNetworkBuilder,
+    create,
+    character: om.MObject,
+    key: om.MObject,
+    key_shape: om.MObject,
+):
+    # Character to key distance, between their world space rotate pivots like
+    # read_shot_key_data, not their transform origins
+    distance = create("distanceBetween", "env_key_distance")
+    for node, name, point in [
+        (character, "env_character_pivot", "point1"),
+        (key, "env_key_pivot", "point2"),
+    ]:
+        pivot = create("pointMatrixMult", name)
+        builder.connect(node, "rotatePivot", pivot, "inPoint")
+        builder.connect(node, "worldMatrix[0]", pivot, "inMatrix")
+        builder.connect(pivot, "output", distance, point)
+
+    # X: sun distance, Y: sky distance, Z: sky scale
+    sky_distance_ratio = SUN_DISTANCE_RATIO * SKY_DIFFUSE_DISTANCE_RATIO
+    distances = create("multiplyDivide", "env_distances")
+    builder.set(distances, "operation", MULTIPLY)
+    builder.set(
+        distances,
+        "input2",
+        [
+            SUN_DISTANCE_RATIO,
+            sky_distance_ratio,
+            sky_distance_ratio * SKY_DIFFUSE_SCALE_RATIO,
+        ],
+    )
+    connect_to_channels(builder, distance, "distance", distances, "input1")
+
+    # X: sun beam radius, Y: sun spill radius, Z: sun distance / curve midpoint
+    bottom, top, midpoint, slope = SUN_EXPOSURE_CURVE
+    radii = create("multiplyDivide", "env_radii")
+    builder.set(radii, "operation", MULTIPLY)
+    builder.set(
+        radii,
+        "input2",
+        [
+            SUN_DISTANCE_RATIO * SUN_BEAM_RADIUS_RATIO,
+            SUN_DISTANCE_RATIO * SUN_SPILL_RADIUS_RATIO,
+            SUN_DISTANCE_RATIO / midpoint,
+        ],
+    )
+    connect_to_channels(builder, distance, "distance", radii, "input1")
+
+    # Sun exposure, see exposure.logistic_exposure:
+    # top + (bottom - top) / (1 + (distance / midpoint) ** slope)
+    power = create("multiplyDivide", "env_exposure_power")
+    builder.set(power, "operation", POWER)
+    builder.set(power, "input2X", slope)
+    builder.connect(radii, "outputZ", power, "input1X")
+
+    denominator = create("plusMinusAverage", "env_exposure_denominator")
+    builder.set(denominator, "operation", SUM)
+    builder.connect(power, "outputX", denominator, "input1D[0]")
+    builder.set(denominator, "input1D[1]", 1.0)
+
+    fraction = create("multiplyDivide", "env_exposure_fraction")
+    builder.set(fraction, "operation", DIVIDE)
+    builder.set(fraction, "input1X", bottom - top)
+    builder.connect(denominator, "output1D", fraction, "input2X")
+
+    sun_exposure = create("plusMinusAverage", "env_sun_exposure")
+    builder.set(sun_exposure, "operation", SUM)
+    builder.connect(fraction, "outputX", sun_exposure, "input1D[0]")
+    builder.set(sun_exposure, "input1D[1]", top)
+
+    # X: sun beam, Y: sun spill, Z: sky diffuse exposure
+    exposures = create("multiplyDivide", "env_exposures")
+    builder.set(exposures, "operation", MULTIPLY)
+    builder.set(
+        exposures, "input2", [1.0, SUN_SPILL_EXPOSURE_RATIO, SKY_DIFFUSE_EXPOSURE_RATIO]
+    )
+    connect_to_channels(builder, sun_exposure, "output1D", exposures, "input1")
+
+    # X: sun beam, Y: sun spill, Z: sky diffuse temperature
+    temperatures = create("multiplyDivide", "env_temperatures")
+    builder.set(temperatures, "operation", MULTIPLY)
+    builder.set(
+        temperatures, "input2", [1.0, SUN_SPILL_TEMP_RATIO, SKY_DIFFUSE_TEMP_RATIO]
+    )
+    connect_to_channels(
+        builder, key_shape, "aiColorTemperature", temperatures, "input1"
+    )
+
+    return {
+        "sun_y_distance": (distances, "outputX"),
+        "sky_diffuse_distance": (distances, "outputY"),
+        "sky_diffuse_scale": (distances, "outputZ"),
+        "sun_beam_radius": (radii, "outputX"),
+        "sun_spill_radius": (radii, "outputY"),
+        "sun_beam_exposure": (exposures, "outputX"),
+        "sun_spill_exposure": (exposures, "outputY"),
+        "sky_diffuse_exposure": (exposures, "outputZ"),
+        "sun_beam_temp": (temperatures, "outputX"),
+        "sun_spill_temp": (temperatures, "outputY"),
+        "sky_diffuse_temp": (temperatures, "outputZ"),
+    }
+
+
+# Tint the key color, then blend it toward its luminance and normalize it
+def add_color_network(
+    builder: ShadingNetworkBuilder,
+    create,
+    key_shape: om.MObject,
+    light: om.MObject,
+    name: str,
+    tint: list,
+    desaturation: float,
+):
+    tinted = create("multiplyDivide", f"{name}_tint")
+    builder.set(tinted, "operation", MULTIPLY)
+    builder.set(tinted, "input2", tint)
+    builder.connect(key_shape, "color", tinted, "input1")
+
+    luminance = create("luminance", f"{name}_luminance")
+    builder.connect(tinted, "output", luminance, "value")
+
+    desaturated = create("blendColors", f"{name}_desaturate")
+    # blender 1 keeps color1
+    builder.set(desaturated, "blender", 1 - desaturation)
+    builder.connect(tinted, "output", desaturated, "color1")
+    connect_to_channels(builder, luminance, "outValue", desaturated, "color2", "RGB")
+    # Tint and desaturation are linear, so normalizing once at the end matches
+    # normalizing after each step
+    normalized = add_normalize_network(builder, create, desaturated, "output", name)
+    builder.connect(normalized, "outColor", light, "color")
+
+
+# Divide a color by its brightest channel like color_temperature.normalize_color,
+# black becomes white
+# Returns the condition node, its outColor is the normalized color
+def add_normalize_network(
+    builder: ShadingNetworkBuilder,
+    create,
+    source: om.MObject,
+    source_attribute: str,
+    name: str,
+):
+    red, green, blue = [f"{source_attribute}{channel}" for channel in "RGB"]
+
+    # max(red, green), then max(that, blue), in outColorR
+    brightest_red_green = create("condition", f"{name}_brightest_red_green")
+    builder.set(brightest_red_green, "operation", GREATER_THAN)
+    builder.connect(source, red, brightest_red_green, "firstTerm")
+    builder.connect(source, green, brightest_red_green, "secondTerm")
+    builder.connect(source, red, brightest_red_green, "colorIfTrueR")
+    builder.connect(source, green, brightest_red_green, "colorIfFalseR")
+
+    brightest = create("condition", f"{name}_brightest")
+    builder.set(brightest, "operation", GREATER_THAN)
+    builder.connect(brightest_red_green, "outColorR", brightest, "firstTerm")
+    builder.connect(source, blue, brightest, "secondTerm")
+    builder.connect(brightest_red_green, "outColorR", brightest, "colorIfTrueR")
+    builder.connect(source, blue, brightest, "colorIfFalseR")
+
+    divided = create("multiplyDivide", f"{name}_normalize")
+    builder.set(divided, "operation", DIVIDE)
+    builder.connect(source, source_attribute, divided, "input1")
+    connect_to_channels(builder, brightest, "outColorR", divided, "input2")
+
+    normalized = create("condition", f"{name}_normalized")
+    builder.set(normalized, "operation", GREATER_THAN)
+    builder.connect(brightest, "outColorR", normalized, "firstTerm")
+    builder.set(normalized, "secondTerm", 0.0)
+    builder.connect(divided, "output", normalized, "colorIfTrue")
+    builder.set(normalized, "colorIfFalse", [1.0, 1.0, 1.0])
+    return normalized
+
+
+# Per channel factors that move a color from one temperature to another,
+# like color_temperature.shift_color_temperature without the normalization
+def get_temperature_tint(from_temperature: float, to_temperature: float):
+    table = get_color_temperature_table()
+    from_color = table.kelvin_to_rgb(from_temperature)
+    to_color = table.kelvin_to_rgb(to_temperature)
+    return [
+        target / source if source > 0 else 1.0
+        for source, target in zip(from_color, to_color)
+    ]
+
+
+# Connect one plug to the X/Y/Z (or R/G/B) children of a compound
+def connect_to_channels(
+    builder: ShadingNetworkBuilder,
+    source: om.MObject,
+    source_attribute: str,
+    destination: om.MObject,
+    destination_attribute: str,
+    channels: str = "XYZ",
+):
+    for channel in channels:
+        builder.connect(
+            source, source_attribute, destination, f"{destination_attribute}{channel}"
+        )
@@ -1,35 +1,242 @@
+import hashlib
+import json
+import os
 import time
+
 from maya import cmds
 
-# Create a slightly warm spotlight
-spotlight = cmds.spotLight(coneAngle=40, penumbra=10)
-cmds.setAttr(spotlight + ".aiUseColorTemperature", 1)
-cmds.setAttr(spotlight + ".aiColorTemperature", 5000)
-cmds.setAttr(spotlight + ".aiExposure", 10)
-
-# Disable all rays except volume
-cmds.setAttr(spotlight + ".aiDiffuse", 0.0)
-cmds.setAttr(spotlight + ".aiSpecular", 0.0)
-cmds.setAttr(spotlight + ".aiSss", 0.0)
-cmds.setAttr(spotlight + ".aiIndirect", 0.0)
-
-# Get the spotlight's parent transform
-spotlight_transform = cmds.listRelatives(spotlight, parent=True)
-if spotlight_transform:
-    spotlight_transform = spotlight_transform[-1]
-
-# Rotate the light to point downward
-cmds.rotate(-90, 0, 0, spotlight_transform)
-
-# Create a noise texture
-noise_node = cmds.shadingNode("noise", asTexture=True)
-cmds.setAttr(noise_node + ".frequency", 20)
-
-# Connect the noise to the spotlight through a gobo
-gobo_node = cmds.shadingNode("aiGobo", asUtility=True)
-cmds.connectAttr(gobo_node + ".message", spotlight + ".aiFilters[0]")
-cmds.connectAttr(noise_node + ".outColor", gobo_node + ".slidemap")
-
-# Name the spotlight
-timestamp = str(int(time.time()))[-5:]
-cmds.rename(spotlight_transform, "spot_gobo_noise_" + timestamp)
+from ..init_texture_shader.texture_mipmaps import TxJobQueue, get_tx_path
+from ..utils.attr_writer import AttrWriter
+from ..utils.handles import get_node_name
+from ..utils.light_builder import build_light
+from ..utils.node_network import ShadingNetworkBuilder
+
+GODRAY_NAME = "spot_gobo_noise"
+
+# Noise texture attributes of the gobo, anything not given keeps its default
+DEFAULT_NOISE = {"frequency": 20}
+# The gobo is baked to a square image of this size, then to a tiled .tx, so
+# Arnold reads it from its texture cache instead of evaluating the noise on
+# every volume sample
+GOBO_RESOLUTION = 1024
+TEXTURE_DIRECTORY_NAME = "maya_tools_textures"
+# Gobo textures already baked this session, image path -> path to use
+baked_gobos = {}
+
+# Volume cost controls, and the node each one is set on
+# volume_samples: the light's own volume samples
+# gi_volume_samples: the render's indirect volume samples
+# step_size: ray marching step of every aiVolume in the scene, smaller is slower
+VOLUME_CONTROLS = {
+    "volume_samples": "aiVolumeSamples",
+    "gi_volume_samples": "GIVolumeSamples",
+    "step_size": "stepSize",
+}
+DEFAULT_VOLUME_SAMPLES = 2
+ARNOLD_OPTIONS_NAME = "defaultArnoldRenderOptions"
+
+# Preview renders are small, the cost of volume settings scales with pixels
+# so their relative cost holds at full resolution
+PREVIEW_WIDTH = 320
+PREVIEW_HEIGHT = 180
+PREVIEW_SETTINGS = [{"volume_samples": samples} for samples in [1, 2, 4, 8]]
+
+
+############
+### Gobo ###
+############
+
+
+# Identical noise settings share one baked texture
+def get_gobo_path(noise: dict, resolution: int = GOBO_RESOLUTION):
+    key = json.dumps({"noise": noise, "resolution": resolution}, sort_keys=True)
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    directory = os.path.join(
+        cmds.internalVar(userAppDir=True), TEXTURE_DIRECTORY_NAME
+    )
+    return os.path.join(directory, f"godray_noise_{digest}.tif")
+
+
+# Bake a noise texture to a tiled .tx once, later calls with the same noise
+# settings reuse the file
+# Returns the .tx path, or the baked image when it could not be converted
+def bake_gobo_texture(noise: dict = None, resolution: int = GOBO_RESOLUTION):
+    noise = DEFAULT_NOISE if noise is None else noise
+    image_path = get_gobo_path(noise, resolution)
+    if os.path.exists(baked_gobos.get(image_path, "")):
+        return baked_gobos[image_path]
+    tx_path = get_tx_path(image_path)
+    if os.path.exists(tx_path):
+        return tx_path
+
+    if not os.path.exists(image_path):
+        os.makedirs(os.path.dirname(image_path), exist_ok=True)
+        noise_node = cmds.shadingNode("noise", asTexture=True)
+        writer = AttrWriter(undo_chunk_name="godray_gobo_noise")
+        writer.set_many(noise_node, noise)
+        writer.flush()
+
+        file_nodes = cmds.convertSolidTx(
+            f"{noise_node}.outColor",
+            samplePlane=True,
+            resolutionX=resolution,
+            resolutionY=resolution,
+            fileFormat="tif",
+            fileImageName=image_path,
+            force=True,
+        )
+        cmds.delete(noise_node, *(file_nodes or []))
+
+    queue = TxJobQueue()
+    queue.add(image_path)
+    baked_gobos[image_path] = image_path if queue.run() else tx_path
+    return baked_gobos[image_path]
+
+
+##############
+### Godray ###
+##############
+
+
+# Create a slightly warm spotlight that only lights volumes,
+# with a baked noise gobo that breaks its beam into rays
+# noise: noise texture attributes, e.g. {"frequency": 20, "amplitude": 0.8}
+# Returns the spotlight transform name
+def create_godray_spotlight(
+    noise: dict = None,
+    volume_samples: int = DEFAULT_VOLUME_SAMPLES,
+    resolution: int = GOBO_RESOLUTION,
+    name: str = None,
+):
+    if name is None:
+        name = f"{GODRAY_NAME}_{str(int(time.time()))[-5:]}"
+    gobo_path = bake_gobo_texture(noise, resolution)
+
+    # Pointing downward, with every ray but volume disabled
+    light = build_light(
+        {
+            "name": name,
+            "type": "spotLight",
+            "transform_attributes": {"rotateX": -90},
+            "attributes": {
+                "coneAngle": 40,
+                "penumbraAngle": 10,
+                "aiUseColorTemperature": True,
+                "aiColorTemperature": 5000,
+                "aiExposure": 10,
+                "aiDiffuse": 0.0,
+                "aiSpecular": 0.0,
+                "aiSss": 0.0,
+                "aiIndirect": 0.0,
+                "aiVolumeSamples": volume_samples,
+            },
+        }
+    )
+
+    # The baked texture reaches the light through a gobo filter
+    network = ShadingNetworkBuilder()
+    file_node = network.create_node("file", f"{name}_gobo_file", "texture")
+    network.set(file_node, "fileTextureName", gobo_path)
+    gobo_node = network.create_node("aiGobo", f"{name}_gobo", "utility")
+    network.connect(file_node, "outColor", gobo_node, "slidemap")
+    network.connect(gobo_node, "message", light["shape"].object(), "aiFilters[0]")
+    network.commit()
+
+    return get_node_name(light["transform"])
+
+
+######################
+### Volume quality ###
+######################
+
+
+# Set the volume cost controls that are given, see VOLUME_CONTROLS
+# light: the godray spotlight transform or shape
+# Returns the previous values of the controls that were set, per node
+# {control: {node: value}}, see restore_volume_quality
+def set_volume_quality(
+    light: str,
+    volume_samples: int = None,
+    gi_volume_samples: int = None,
+    step_size: float = None,
+):
+    values = {
+        "volume_samples": volume_samples,
+        "gi_volume_samples": gi_volume_samples,
+        "step_size": step_size,
+    }
+    writer = AttrWriter(undo_chunk_name="godray_volume_quality")
+    previous = {}
+    for control, value in values.items():
+        if value is None:
+            continue
+        attribute = VOLUME_CONTROLS[control]
+        previous[control] = {}
+        for node in get_control_nodes(control, light):
+            previous[control][node] = cmds.getAttr(f"{node}.{attribute}")
+            writer.set(node, attribute, value)
+
+    writer.flush()
+    return previous
+
+
+# Set each node back to its own value from set_volume_quality
+def restore_volume_quality(previous: dict):
+    writer = AttrWriter(undo_chunk_name="godray_volume_quality")
+    for control, node_values in previous.items():
+        for node, value in node_values.items():
+            writer.set(node, VOLUME_CONTROLS[control], value)
+
+    writer.flush()
+
+
+def get_control_nodes(control: str, light: str):
+    if control == "volume_samples":
+        return cmds.listRelatives(light, shapes=True, fullPath=True) or [light]
+    if control == "gi_volume_samples":
+        return [ARNOLD_OPTIONS_NAME] if cmds.objExists(ARNOLD_OPTIONS_NAME) else []
+
+    return cmds.ls(type="aiVolume", long=True) or []
+
+
+# Time a small render with each of the volume settings, to see what they cost
+# without rendering full frames
+# settings: dicts of set_volume_quality arguments, the first is the baseline
+# The light's settings are restored afterwards, also when a render fails
+# Returns one {"settings", "seconds", "relative"} report per settings dict
+def preview_volume_cost(
+    light: str,
+    settings: list = None,
+    camera: str = "persp",
+    width: int = PREVIEW_WIDTH,
+    height: int = PREVIEW_HEIGHT,
+):
+    settings = PREVIEW_SETTINGS if settings is None else settings
+
+    # The first render also translates the scene and fills the texture cache
+    render_preview(camera, width, height)
+
+    reports = []
+    for values in settings:
+        previous = set_volume_quality(light, **values)
+        try:
+            seconds = render_preview(camera, width, height)
+        finally:
+            restore_volume_quality(previous)
+        reports.append({"settings": values, "seconds": seconds})
+
+    baseline = reports[0]["seconds"] if reports else 0
+    for report in reports:
+        report["relative"] = report["seconds"] / baseline if baseline else None
+        print(
+            f"{json.dumps(report['settings']):<40} {report['seconds']:>7.2f}s "
+            f"x{report['relative'] or 0:.2f}"
+        )
+
+    return reports
+
+
+def render_preview(camera: str, width: int, height: int):
+    start_time = time.perf_counter()
+    cmds.arnoldRender(camera=camera, width=width, height=height, batch=True)
+    return time.perf_counter() - start_time
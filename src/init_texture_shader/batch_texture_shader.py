@@ -0,0 +1,314 @@
+import re
+import time
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from .texture_discovery import discover_materials, load_manifest
+from .texture_mipmaps import (
+    TX_EXTENSION,
+    configure_arnold_texture_streaming,
+    get_arnold_texture_path,
+    is_udim_path,
+    use_tx_textures,
+)
+from ..utils.handles import get_node_name
+from ..utils.node_network import NetworkCache, ShadingNetworkBuilder
+from ..utils.transaction import Transaction
+
+BATCH_DIALOG_NAME = "batch_init_texture_shader_dialog"
+
+# Non-color maps are read as raw data
+COLOR_SPACES = {
+    "albedo": "sRGB",
+    "roughness": "Raw",
+    "normal": "Raw",
+    "metallic": "Raw",
+    "ao": "Raw",
+}
+
+
+# Shared by both texture shader modes
+network_cache = NetworkCache()
+
+
+# Node names cannot start with a digit or contain punctuation
+def get_safe_name(name: str):
+    name = re.sub(r"\W", "_", name)
+    if not name or name[0].isdigit():
+        name = f"m_{name}"
+
+    return name
+
+
+#########################
+### Material Networks ###
+#########################
+
+
+# Networks with the same tiling can share one place2dTexture
+def get_place_texture_key(repeat_uv: tuple = (1, 1)):
+    return ("place2dTexture", tuple(repeat_uv))
+
+
+# Queue the same network init_texture_shader builds, with the texture paths filled in
+# textures: {channel: texture info} from texture_discovery
+def add_material_network(
+    builder: ShadingNetworkBuilder,
+    material: str,
+    textures: dict,
+    repeat_uv: tuple = (1, 1),
+):
+    name = get_safe_name(material)
+    shader_node = builder.create_node("aiStandardSurface", f"{name}_shader", "shader")
+    shading_group_node = builder.create_node(
+        "shadingEngine", f"{name}_SG", "shading_group"
+    )
+    builder.connect(shader_node, "outColor", shading_group_node, "surfaceShader")
+
+    # Place Texture UV Node
+    place_texture_key = get_place_texture_key(repeat_uv)
+    place_texture_node = builder.get_cached(place_texture_key)
+    if place_texture_node is None:
+        place_texture_node = builder.create_node(
+            "place2dTexture", f"{name}_place2dTexture", "utility"
+        )
+        if tuple(repeat_uv) != (1, 1):
+            builder.set(place_texture_node, "repeatUV", repeat_uv)
+        builder.add_cached(place_texture_key, place_texture_node)
+    place_texture_id = om.MObjectHandle(place_texture_node).hashCode()
+
+    # Albedo
+    if "albedo" in textures:
+        albedo_file_node = add_file_node(
+            builder, place_texture_node, f"{name}_albedo", textures["albedo"]
+        )
+
+        # Ambient Occlusion
+        # NOTE: Don't (yet? ever?) allow AO input without albedo
+        if "ao" in textures:
+            ao_math_key = (
+                "ao_multiply",
+                place_texture_id,
+                textures["albedo"]["path"],
+                textures["ao"]["path"],
+            )
+            ao_math_node = builder.get_cached(ao_math_key, node_count=2)
+            if ao_math_node is None:
+                ao_file_node = add_file_node(
+                    builder, place_texture_node, f"{name}_ao", textures["ao"]
+                )
+                ao_math_node = builder.create_node(
+                    "colorMath", f"{name}_ao_multiply", "utility"
+                )
+                builder.set(ao_math_node, "operation", 3)
+                builder.connect(ao_file_node, "outColor", ao_math_node, "colorB")
+
+                # Multiply Albedo by AO
+                builder.connect(albedo_file_node, "outColor", ao_math_node, "colorA")
+                builder.add_cached(ao_math_key, ao_math_node)
+
+            builder.connect(ao_math_node, "outColor", shader_node, "baseColor")
+        else:
+            builder.connect(albedo_file_node, "outColor", shader_node, "baseColor")
+
+    # Roughness
+    if "roughness" in textures:
+        add_float_map(
+            builder,
+            place_texture_node,
+            shader_node,
+            f"{name}_roughness",
+            textures["roughness"],
+            "specularRoughness",
+        )
+
+    # Normal
+    if "normal" in textures:
+        normal_key = ("normal_map", place_texture_id, textures["normal"]["path"])
+        ai_normal_node = builder.get_cached(normal_key, node_count=2)
+        if ai_normal_node is None:
+            ai_image_node = builder.create_node("aiImage", f"{name}_normal", "texture")
+            builder.set(
+                ai_image_node,
+                "filename",
+                get_arnold_texture_path(textures["normal"]["path"]),
+            )
+            builder.set(ai_image_node, "colorSpace", COLOR_SPACES["normal"])
+            ai_normal_node = builder.create_node(
+                "aiNormalMap", f"{name}_normalMap", "utility"
+            )
+            builder.connect(ai_image_node, "outColor", ai_normal_node, "input")
+            builder.connect(place_texture_node, "outUV", ai_image_node, "uvcoords")
+            builder.add_cached(normal_key, ai_normal_node)
+
+        builder.connect(ai_normal_node, "outValue", shader_node, "normalCamera")
+
+    # Metallic
+    if "metallic" in textures:
+        add_float_map(
+            builder,
+            place_texture_node,
+            shader_node,
+            f"{name}_metallic",
+            textures["metallic"],
+            "metalness",
+        )
+
+    return {"shader": shader_node, "shading_group": shading_group_node}
+
+
+# Files pointing at the same image share one node, keyed by path and color space
+def add_file_node(
+    builder: ShadingNetworkBuilder,
+    place_texture_node: om.MObject,
+    name: str,
+    texture: dict,
+):
+    color_space = COLOR_SPACES[texture["channel"]]
+    file_key = (
+        "file",
+        om.MObjectHandle(place_texture_node).hashCode(),
+        texture["path"],
+        color_space,
+    )
+    file_node = builder.get_cached(file_key)
+    if file_node is not None:
+        return file_node
+
+    file_node = builder.create_node("file", name, "texture")
+    builder.set(file_node, "fileTextureName", texture["path"])
+    builder.set(file_node, "colorSpace", color_space)
+    builder.set(file_node, "ignoreColorSpaceFileRules", True)
+    if is_udim_path(texture["path"]):
+        # UDIM (Mari)
+        builder.set(file_node, "uvTilingMode", 3)
+    if texture["path"].lower().endswith(TX_EXTENSION):
+        # Already tiled and mipmapped
+        builder.set(file_node, "aiAutoTx", False)
+    builder.connect(place_texture_node, "outUV", file_node, "uv")
+    builder.add_cached(file_key, file_node)
+    return file_node
+
+
+# File -> aiColorToFloat -> remapValue -> shader, as in add_roughness_map
+# Maps of the same image share the whole chain
+def add_float_map(
+    builder: ShadingNetworkBuilder,
+    place_texture_node: om.MObject,
+    shader_node: om.MObject,
+    name: str,
+    texture: dict,
+    shader_attribute: str,
+):
+    chain_key = (
+        "float_map",
+        om.MObjectHandle(place_texture_node).hashCode(),
+        texture["path"],
+    )
+    remap_value_node = builder.get_cached(chain_key, node_count=3)
+    if remap_value_node is None:
+        file_node = add_file_node(builder, place_texture_node, name, texture)
+        color_to_float_node = builder.create_node(
+            "aiColorToFloat", f"{name}_colorToFloat", "utility"
+        )
+        remap_value_node = builder.create_node("remapValue", f"{name}_remap", "utility")
+        builder.connect(file_node, "outColor", color_to_float_node, "input")
+        builder.connect(color_to_float_node, "outValue", remap_value_node, "inputValue")
+        builder.add_cached(chain_key, remap_value_node)
+
+    builder.connect(remap_value_node, "outValue", shader_node, shader_attribute)
+
+
+# Build every material's network in one modifier pass
+# materials: {material name: {channel: texture info}}
+# dedup shares the place2dTexture, file nodes and utility chains of identical inputs,
+# also with networks from earlier dedup builds
+# tiled uses .tx versions of the textures, converting the missing ones,
+# and has Arnold stream them from its texture cache
+# Returns {material name: shading group name}
+def build_material_networks(materials: dict, dedup: bool = False, tiled: bool = False):
+    start_time = time.perf_counter()
+    if tiled:
+        use_tx_textures(materials)
+        configure_arnold_texture_streaming()
+
+    builder = ShadingNetworkBuilder(cache=network_cache if dedup else None)
+    networks = {
+        material: add_material_network(builder, material, textures)
+        for material, textures in materials.items()
+    }
+    builder.commit()
+
+    shading_groups = {
+        material: get_node_name(om.MObjectHandle(network["shading_group"]))
+        for material, network in networks.items()
+    }
+    print(
+        f"Created {len(shading_groups)} materials ({builder.nodes_created} nodes) "
+        f"in {time.perf_counter() - start_time:.3f}s"
+    )
+    if dedup:
+        print(f"Saved {builder.nodes_saved} nodes by sharing identical nodes")
+
+    return shading_groups
+
+
+def init_texture_shaders_from_directory(
+    directory: str, dedup: bool = False, tiled: bool = False
+):
+    start_time = time.perf_counter()
+    materials = discover_materials(directory)
+    print(
+        f"Found {len(materials)} texture sets in {directory} "
+        f"in {time.perf_counter() - start_time:.3f}s"
+    )
+    return build_material_networks(materials, dedup=dedup, tiled=tiled)
+
+
+def init_texture_shaders_from_manifest(
+    manifest_path: str, dedup: bool = False, tiled: bool = False
+):
+    materials = load_manifest(manifest_path)
+    return build_material_networks(materials, dedup=dedup, tiled=tiled)
+
+
+# Pick a texture directory or a JSON manifest and build all of its materials
+# The build only creates nodes, so it runs with undo paused, a failed build
+# still deletes everything it created
+def batch_init_texture_shader_dialog():
+    if cmds.window(BATCH_DIALOG_NAME, exists=True):
+        cmds.deleteUI(BATCH_DIALOG_NAME)
+
+    dialog = cmds.window(BATCH_DIALOG_NAME, title="Batch Initialize Texture Shaders")
+    cmds.columnLayout(adjustableColumn=True)
+    dedup_checkbox = cmds.checkBox("Share Identical Nodes", value=False)
+    tiled_checkbox = cmds.checkBox("Tiled Textures (.tx)", value=False)
+
+    def call_from_directory(x):
+        directory = cmds.fileDialog2(fileMode=3, caption="Texture Directory")
+        if directory:
+            dedup = cmds.checkBox(dedup_checkbox, q=1, v=1)
+            tiled = cmds.checkBox(tiled_checkbox, q=1, v=1)
+            cmds.deleteUI(BATCH_DIALOG_NAME)
+            with Transaction("batch_init_texture_shaders", pause_undo=True):
+                init_texture_shaders_from_directory(
+                    directory[0], dedup=dedup, tiled=tiled
+                )
+
+    def call_from_manifest(x):
+        manifest = cmds.fileDialog2(
+            fileMode=1, fileFilter="Manifest (*.json)", caption="Asset Manifest"
+        )
+        if manifest:
+            dedup = cmds.checkBox(dedup_checkbox, q=1, v=1)
+            tiled = cmds.checkBox(tiled_checkbox, q=1, v=1)
+            cmds.deleteUI(BATCH_DIALOG_NAME)
+            with Transaction("batch_init_texture_shaders", pause_undo=True):
+                init_texture_shaders_from_manifest(
+                    manifest[0], dedup=dedup, tiled=tiled
+                )
+
+    cmds.button(label="From Texture Directory", command=call_from_directory)
+    cmds.button(label="From Asset Manifest", command=call_from_manifest)
+    cmds.showWindow(dialog)
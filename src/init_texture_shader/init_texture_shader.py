@@ -1,4 +1,19 @@
+import os
+
 import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from .batch_texture_shader import COLOR_SPACES, get_place_texture_key, network_cache
+from .texture_discovery import discover_materials, parse_texture_name
+from .texture_mipmaps import (
+    TX_EXTENSION,
+    configure_arnold_texture_streaming,
+    get_arnold_texture_path,
+    is_udim_path,
+    use_tx_textures,
+)
+from ..utils.handles import get_handle, get_node_name
+from ..utils.transaction import Transaction
 
 DIALOG_NAME = "init_texture_shader_dialog"
 
@@ -15,24 +30,111 @@ def init_texture_shader_dialog():
     normal_checkbox = cmds.checkBox("Normal Map", value=True)
     metallic_checkbox = cmds.checkBox("Metallic Map", value=False)
     ao_checkbox = cmds.checkBox("Ambient Occlusion (Map)", value=False)
+    share_place_texture_checkbox = cmds.checkBox("Share place2dTexture", value=False)
+    # Any texture of a set, e.g. chair_BaseColor.1001.exr, fills in the paths of
+    # the whole set, UDIM sets become one <UDIM> texture like in batch mode
+    texture_field = cmds.textFieldButtonGrp(
+        label="Texture Set", buttonLabel="...", adjustableColumn=2
+    )
+    cmds.textFieldButtonGrp(
+        texture_field,
+        edit=True,
+        buttonCommand=lambda *args: browse_texture(texture_field),
+    )
+    tiled_checkbox = cmds.checkBox("Tiled Textures (.tx)", value=False)
 
     # command always passes one boolean argument
+    # The shelf's Transaction closed when the window was shown, the build is
+    # one undo step of its own
     def call_init_texture_shader(x):
-        init_texture_shader(
-            albedo_checkbox=albedo_checkbox,
-            roughness_checkbox=roughness_checkbox,
-            normal_checkbox=normal_checkbox,
-            metallic_checkbox=metallic_checkbox,
-            ao_checkbox=ao_checkbox,
-        )
+        with Transaction("init_texture_shader"):
+            init_texture_shader(
+                albedo_checkbox=albedo_checkbox,
+                roughness_checkbox=roughness_checkbox,
+                normal_checkbox=normal_checkbox,
+                metallic_checkbox=metallic_checkbox,
+                ao_checkbox=ao_checkbox,
+                share_place_texture_checkbox=share_place_texture_checkbox,
+                texture_field=texture_field,
+                tiled_checkbox=tiled_checkbox,
+            )
 
     cmds.button(label="Initialize", command=call_init_texture_shader)
     cmds.showWindow(dialog)
 
 
+def browse_texture(texture_field):
+    path = cmds.fileDialog2(fileMode=1, caption="Texture Set")
+    if path:
+        cmds.textFieldButtonGrp(texture_field, edit=True, text=path[0])
+
+
 def init_texture_shader(
-    albedo_checkbox, roughness_checkbox, normal_checkbox, metallic_checkbox, ao_checkbox
+    albedo_checkbox,
+    roughness_checkbox,
+    normal_checkbox,
+    metallic_checkbox,
+    ao_checkbox,
+    share_place_texture_checkbox=None,
+    texture_field=None,
+    tiled_checkbox=None,
+):
+    share_place_texture = share_place_texture_checkbox is not None and (
+        cmds.checkBox(share_place_texture_checkbox, q=1, v=1) is True
+    )
+    textures = None
+    if texture_field is not None:
+        texture_path = cmds.textFieldButtonGrp(texture_field, q=1, text=1)
+        if texture_path:
+            textures = find_texture_set(texture_path)
+    tiled = tiled_checkbox is not None and (
+        cmds.checkBox(tiled_checkbox, q=1, v=1) is True
+    )
+    create_texture_shader(
+        albedo=cmds.checkBox(albedo_checkbox, q=1, v=1) is True,
+        roughness=cmds.checkBox(roughness_checkbox, q=1, v=1) is True,
+        normal=cmds.checkBox(normal_checkbox, q=1, v=1) is True,
+        metallic=cmds.checkBox(metallic_checkbox, q=1, v=1) is True,
+        ao=cmds.checkBox(ao_checkbox, q=1, v=1) is True,
+        share_place_texture=share_place_texture,
+        textures=textures,
+        tiled=tiled,
+    )
+
+    cmds.deleteUI(DIALOG_NAME)
+
+
+# The textures of the set a texture file belongs to, found like in batch mode
+# Returns {channel: texture info} from texture_discovery
+def find_texture_set(path: str):
+    parsed = parse_texture_name(path)
+    if parsed is None:
+        cmds.error(f"No texture channel found in the name of {path}")
+
+    materials = discover_materials(os.path.dirname(path))
+    return materials.get(parsed[0], {})
+
+
+# Build the shader, its shading group and the chosen texture maps
+# textures: {channel: texture info} from texture_discovery, fills in the paths
+# of the maps, without it the file nodes are left empty
+# tiled uses .tx versions of the textures like batch mode
+# Returns the shader node name
+def create_texture_shader(
+    albedo: bool = True,
+    roughness: bool = True,
+    normal: bool = True,
+    metallic: bool = False,
+    ao: bool = False,
+    share_place_texture: bool = False,
+    textures: dict = None,
+    tiled: bool = False,
 ):
+    textures = textures or {}
+    if tiled and textures:
+        use_tx_textures({"texture_set": textures})
+        configure_arnold_texture_streaming()
+
     # Shader
     shader_node = cmds.shadingNode(
         "aiStandardSurface", asShader=True, isColorManaged=True
@@ -41,46 +143,92 @@ def init_texture_shader(
     cmds.connectAttr(shader_node + ".outColor", shadingGroupNode + ".surfaceShader")
 
     # Place Texture UV Node
-    place_texture_node = cmds.shadingNode("place2dTexture", asUtility=True)
+    place_texture_node = get_place_texture_node(share_place_texture)
 
     # Albedo
-    if cmds.checkBox(albedo_checkbox, q=1, v=1) is True:
+    if albedo:
         albedo_file_node = cmds.shadingNode("file", asTexture=True, isColorManaged=True)
         cmds.connectAttr(place_texture_node + ".outUV", albedo_file_node + ".uv")
+        set_file_texture(albedo_file_node, textures.get("albedo"))
 
         # Ambient Occlusion
         # NOTE: Don't (yet? ever?) allow AO input without albedo
-        if cmds.checkBox(ao_checkbox, q=1, v=1) is True:
-            add_ao_map(place_texture_node, albedo_file_node, shader_node)
+        if ao:
+            add_ao_map(
+                place_texture_node, albedo_file_node, shader_node, textures.get("ao")
+            )
 
         else:
             cmds.connectAttr(albedo_file_node + ".outColor", shader_node + ".baseColor")
 
     # Roughness
-    if cmds.checkBox(roughness_checkbox, q=1, v=1) is True:
-        add_roughness_map(place_texture_node, shader_node)
+    if roughness:
+        add_roughness_map(place_texture_node, shader_node, textures.get("roughness"))
 
     # Normal
-    if cmds.checkBox(normal_checkbox, q=1, v=1) is True:
-        add_normal_map(place_texture_node, shader_node)
+    if normal:
+        add_normal_map(place_texture_node, shader_node, textures.get("normal"))
 
     # Metallic
-    if cmds.checkBox(metallic_checkbox, q=1, v=1) is True:
-        add_metallic_map(place_texture_node, shader_node)
+    if metallic:
+        add_metallic_map(place_texture_node, shader_node, textures.get("metallic"))
 
-    cmds.deleteUI(DIALOG_NAME)
+    return shader_node
 
 
-def add_normal_map(place_texture_node, shader_node):
+# Shared place2dTexture nodes come from the batch mode's network cache,
+# so both modes reuse the same node
+def get_place_texture_node(share: bool = False):
+    if share:
+        shared_node = network_cache.get(get_place_texture_key())
+        if shared_node is not None:
+            return get_node_name(om.MObjectHandle(shared_node))
+
+    place_texture_node = cmds.shadingNode("place2dTexture", asUtility=True)
+    if share:
+        shared_node = get_handle(place_texture_node).object()
+        network_cache.add(get_place_texture_key(), shared_node)
+
+    return place_texture_node
+
+
+# Point a file node at a texture from texture_discovery, like batch mode's
+# add_file_node, nothing is set without a texture
+def set_file_texture(file_node: str, texture: dict = None):
+    if texture is None:
+        return
+
+    path = texture["path"]
+    cmds.setAttr(file_node + ".fileTextureName", path, type="string")
+    color_space = COLOR_SPACES[texture["channel"]]
+    cmds.setAttr(file_node + ".colorSpace", color_space, type="string")
+    cmds.setAttr(file_node + ".ignoreColorSpaceFileRules", True)
+    if is_udim_path(path):
+        # UDIM (Mari)
+        cmds.setAttr(file_node + ".uvTilingMode", 3)
+    if path.lower().endswith(TX_EXTENSION):
+        # Already tiled and mipmapped
+        cmds.setAttr(file_node + ".aiAutoTx", False)
+
+
+def add_normal_map(place_texture_node, shader_node, texture: dict = None):
     aiImageNode = cmds.shadingNode("aiImage", asTexture=True, isColorManaged=True)
+    if texture is not None:
+        cmds.setAttr(
+            aiImageNode + ".filename",
+            get_arnold_texture_path(texture["path"]),
+            type="string",
+        )
+        cmds.setAttr(aiImageNode + ".colorSpace", COLOR_SPACES["normal"], type="string")
     aiNormalNode = cmds.shadingNode("aiNormalMap", asShader=True)
     cmds.connectAttr(aiImageNode + ".outColor", aiNormalNode + ".input")
     cmds.connectAttr(aiNormalNode + ".outValue", shader_node + ".normalCamera")
     cmds.connectAttr(place_texture_node + ".outUV", aiImageNode + ".uvcoords")
 
 
-def add_roughness_map(place_texture_node, shader_node):
+def add_roughness_map(place_texture_node, shader_node, texture: dict = None):
     roughness_file_node = cmds.shadingNode("file", asTexture=True, isColorManaged=True)
+    set_file_texture(roughness_file_node, texture)
     roughness_color_to_float_node = cmds.shadingNode("aiColorToFloat", asUtility=True)
     roughness_remap_value_node = cmds.shadingNode("remapValue", asUtility=True)
     cmds.connectAttr(
@@ -97,8 +245,9 @@ def add_roughness_map(place_texture_node, shader_node):
     cmds.connectAttr(place_texture_node + ".outUV", roughness_file_node + ".uv")
 
 
-def add_metallic_map(place_texture_node, shader_node):
+def add_metallic_map(place_texture_node, shader_node, texture: dict = None):
     metallic_file_node = cmds.shadingNode("file", asTexture=True, isColorManaged=True)
+    set_file_texture(metallic_file_node, texture)
     metallic_color_to_float_node = cmds.shadingNode("aiColorToFloat", asUtility=True)
     metallic_remap_value_node = cmds.shadingNode("remapValue", asUtility=True)
     cmds.connectAttr(
@@ -115,8 +264,9 @@ def add_metallic_map(place_texture_node, shader_node):
     cmds.connectAttr(place_texture_node + ".outUV", metallic_file_node + ".uv")
 
 
-def add_ao_map(place_texture_node, albedo_file_node, shader_node):
+def add_ao_map(place_texture_node, albedo_file_node, shader_node, texture=None):
     ao_file_node = cmds.shadingNode("file", asTexture=True, isColorManaged=True)
+    set_file_texture(ao_file_node, texture)
     cmds.connectAttr(place_texture_node + ".outUV", ao_file_node + ".uv")
 
     ao_math_node = cmds.shadingNode("colorMath", asUtility=True)
@@ -0,0 +1,301 @@
+import json
+import os
+import re
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+# Filename tokens that identify the map type, e.g. "chair_BaseColor.png"
+# Two-token names like "base_color" are matched without their separator
+CHANNEL_TOKENS = {
+    "albedo": ["albedo", "basecolor", "diffuse", "diff", "color", "col"],
+    "roughness": ["roughness", "rough", "rgh"],
+    "normal": ["normal", "normalgl", "nrm", "nor", "norm"],
+    "metallic": ["metallic", "metalness", "metal", "mtl"],
+    "ao": ["ao", "ambientocclusion", "occlusion", "occ"],
+}
+CHANNELS = list(CHANNEL_TOKENS)
+
+TEXTURE_EXTENSIONS = [".exr", ".tif", ".tiff", ".png", ".jpg", ".jpeg", ".tga", ".hdr"]
+
+MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+TOKEN_SEPARATOR = re.compile(r"[._\- ]+")
+
+# UDIM tile numbers right before the extension, e.g. "chair_BaseColor.1001.exr"
+# Other numbers are part of the name, e.g. the resolution in "chair_1024_albedo.png"
+UDIM_TOKEN = "<UDIM>"
+UDIM_TILE = re.compile(r"(?<=[._])(1[0-9]{3})$")
+
+
+################
+### Scanning ###
+################
+
+
+# List the texture files and subdirectories of one directory
+def scan_directory(directory: str):
+    files = []
+    subdirectories = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in TEXTURE_EXTENSIONS:
+                    files.append(entry.path)
+    except OSError as error:
+        print(f"Could not scan {directory}: {error}")
+
+    return files, subdirectories
+
+
+# Find every texture file below directory, scanning each level of
+# subdirectories in parallel on a thread pool
+def find_texture_files(directory: str, executor: ThreadPoolExecutor):
+    files = []
+    directories = [directory]
+    while directories:
+        next_directories = []
+        for found_files, subdirectories in executor.map(scan_directory, directories):
+            files.extend(found_files)
+            next_directories.extend(subdirectories)
+        directories = next_directories
+
+    return sorted(files)
+
+
+###############
+### Headers ###
+###############
+
+
+# Read the start of an image to check that it is one and get its resolution
+# Returns None for files that are not images, width and height are None
+# for formats whose resolution is not read here
+def probe_image_header(path: str):
+    try:
+        with open(path, "rb") as image_file:
+            header = image_file.read(32)
+            image_format = get_image_format(header)
+            if image_format is None:
+                return None
+
+            width, height = None, None
+            if image_format == "png" and len(header) >= 24:
+                width, height = struct.unpack(">II", header[16:24])
+            elif image_format == "jpeg":
+                image_file.seek(2)
+                width, height = read_jpeg_size(image_file)
+    except OSError as error:
+        print(f"Could not read {path}: {error}")
+        return None
+
+    return {"path": path, "format": image_format, "width": width, "height": height}
+
+
+def get_image_format(header: bytes):
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header.startswith(b"\xff\xd8"):
+        return "jpeg"
+    if header[:4] in (b"II*\x00", b"MM\x00*"):
+        # .tx files are tiled, mipmapped TIFFs
+        return "tiff"
+    if header.startswith(b"\x76\x2f\x31\x01"):
+        return "exr"
+    if header.startswith(b"#?"):
+        return "hdr"
+    if len(header) >= 3 and header[2] in (2, 10) and header[1] in (0, 1):
+        return "tga"
+
+    return None
+
+
+# Walk the JPEG markers until the start of frame, which holds the size
+def read_jpeg_size(image_file):
+    while True:
+        marker = image_file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None, None
+
+        length_bytes = image_file.read(2)
+        if len(length_bytes) < 2:
+            return None, None
+        (length,) = struct.unpack(">H", length_bytes)
+
+        if marker[1] in (0xC0, 0xC1, 0xC2):
+            size = image_file.read(5)
+            if len(size) < 5:
+                return None, None
+            height, width = struct.unpack(">HH", size[1:5])
+            return width, height
+
+        image_file.seek(length - 2, os.SEEK_CUR)
+
+
+##############
+### Naming ###
+##############
+
+
+# Split a texture filename into its material name and channel
+# e.g. "chair_wood_BaseColor.png" -> ("chair_wood", "albedo")
+# Returns None for files without a known channel token
+def parse_texture_name(path: str):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    tokens = [token for token in TOKEN_SEPARATOR.split(stem) if token]
+
+    # The channel is usually last, so search from the end
+    for index in reversed(range(len(tokens))):
+        channel = None
+        if index > 0:
+            channel = get_channel(tokens[index - 1] + tokens[index])
+            if channel is not None:
+                index -= 1
+        if channel is None:
+            channel = get_channel(tokens[index])
+        if channel is not None:
+            material_tokens = tokens[:index]
+            if not material_tokens:
+                # e.g. "albedo.png" inside a folder named after the material
+                material_tokens = [os.path.basename(os.path.dirname(path))]
+            return "_".join(material_tokens), channel
+
+    return None
+
+
+# Get the UDIM tile number of a texture, or None for single images
+def get_udim_tile(path: str):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    match = UDIM_TILE.search(stem)
+    return int(match.group(1)) if match else None
+
+
+# Replace the UDIM tile number with the <UDIM> token, e.g. "chair.<UDIM>.exr"
+def get_udim_path(path: str):
+    directory, filename = os.path.split(path)
+    stem, extension = os.path.splitext(filename)
+    stem = UDIM_TILE.sub(UDIM_TOKEN, stem)
+    return os.path.join(directory, stem + extension)
+
+
+# Tile files on disk of a path with the <UDIM> token, sorted by tile
+def find_udim_tiles(path: str):
+    directory, filename = os.path.split(path)
+    pattern = re.compile(
+        re.escape(filename).replace(re.escape(UDIM_TOKEN), "1[0-9]{3}")
+    )
+    try:
+        names = os.listdir(directory or ".")
+    except OSError:
+        return []
+
+    return sorted(
+        os.path.join(directory, name) for name in names if pattern.fullmatch(name)
+    )
+
+
+def get_channel(token: str):
+    token = token.lower()
+    for channel, channel_tokens in CHANNEL_TOKENS.items():
+        if token in channel_tokens:
+            return channel
+
+    return None
+
+
+#################
+### Materials ###
+#################
+
+
+# Find texture sets in a directory by filename convention
+# Returns {material name: {channel: texture info}}
+def discover_materials(directory: str, max_workers: int = MAX_WORKERS):
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        files = find_texture_files(directory, executor)
+        named_files = []
+        for path in files:
+            parsed = parse_texture_name(path)
+            if parsed is not None:
+                named_files.append((path, *parsed))
+
+        headers = executor.map(probe_image_header, [path for path, _, _ in named_files])
+        materials = {}
+        for (path, material, channel), texture in zip(named_files, headers):
+            if texture is None:
+                continue
+            texture["channel"] = channel
+            add_texture(materials, material, texture)
+
+    return materials
+
+
+# Read a JSON manifest of {material name: {channel: path}}, optionally under
+# a "materials" key. Relative paths are relative to the manifest.
+def load_manifest(manifest_path: str, max_workers: int = MAX_WORKERS):
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    manifest = manifest.get("materials", manifest)
+    manifest_directory = os.path.dirname(os.path.abspath(manifest_path))
+
+    entries = []
+    for material, channels in manifest.items():
+        for channel, path in channels.items():
+            if channel not in CHANNEL_TOKENS:
+                print(f"Skipping unknown channel {channel} of material {material}")
+                continue
+            entries.append((os.path.join(manifest_directory, path), material, channel))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        headers = executor.map(probe_texture, [path for path, _, _ in entries])
+        materials = {}
+        for (path, material, channel), texture in zip(entries, headers):
+            if texture is None:
+                print(f"Skipping {path}, it is not a readable image")
+                continue
+            texture["channel"] = channel
+            add_texture(materials, material, texture)
+
+    return materials
+
+
+# Probe a manifest path, a path with the <UDIM> token is probed through its
+# first tile on disk
+def probe_texture(path: str):
+    if UDIM_TOKEN not in path:
+        return probe_image_header(path)
+
+    tiles = find_udim_tiles(path)
+    texture = probe_image_header(tiles[0]) if tiles else None
+    if texture is not None:
+        texture["path"] = path
+        texture["tiles"] = tiles
+    return texture
+
+
+# Keep one texture per channel, preferring formats earlier in TEXTURE_EXTENSIONS
+# UDIM tiles are collected under one texture whose path has the <UDIM> token
+def add_texture(materials: dict, material: str, texture: dict):
+    channels = materials.setdefault(material, {})
+    existing = channels.get(texture["channel"])
+
+    if UDIM_TOKEN not in texture["path"] and get_udim_tile(texture["path"]):
+        texture["tiles"] = [texture["path"]]
+        texture["path"] = get_udim_path(texture["path"])
+        if existing is not None and existing["path"] == texture["path"]:
+            existing["tiles"].extend(texture["tiles"])
+            return
+
+    if existing is None or get_extension_rank(texture["path"]) < get_extension_rank(
+        existing["path"]
+    ):
+        channels[texture["channel"]] = texture
+
+
+def get_extension_rank(path: str):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in TEXTURE_EXTENSIONS:
+        return TEXTURE_EXTENSIONS.index(extension)
+
+    return len(TEXTURE_EXTENSIONS)
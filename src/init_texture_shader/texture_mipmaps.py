@@ -0,0 +1,157 @@
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import maya.cmds as cmds
+
+from .texture_discovery import UDIM_TOKEN
+from ..utils.attr_writer import AttrWriter
+
+TX_EXTENSION = ".tx"
+MAKETX_ARGUMENTS = ["-u", "--oiio", "--monochrome-detect", "--opaque-detect"]
+# Each job is its own maketx process, this is how many run at once
+MAX_TX_JOBS = max(1, (os.cpu_count() or 2) // 2)
+
+ARNOLD_OPTIONS_NAME = "defaultArnoldRenderOptions"
+TEXTURE_MAX_MEMORY_MB = 4096
+
+
+def get_tx_path(path: str):
+    return os.path.splitext(path)[0] + TX_EXTENSION
+
+
+# A .tx is current when it is at least as new as its source image
+def is_tx_current(source_path: str, tx_path: str):
+    if not os.path.exists(tx_path):
+        return False
+
+    return os.path.getmtime(tx_path) >= os.path.getmtime(source_path)
+
+
+# maketx ships with MtoA, prefer one on the PATH
+def find_maketx():
+    maketx = shutil.which("maketx")
+    if maketx:
+        return maketx
+
+    try:
+        mtoa_path = cmds.getModulePath(moduleName="mtoa")
+    except RuntimeError:
+        return None
+
+    for name in ["maketx", "maketx.exe"]:
+        maketx = os.path.join(mtoa_path, "bin", name)
+        if os.path.exists(maketx):
+            return maketx
+
+    return None
+
+
+# Queue of images to convert to tiled, mipmapped .tx files
+# run() converts them with up to max_jobs maketx processes at a time,
+# images that already have a current .tx are not queued
+class TxJobQueue:
+    def __init__(self, maketx: str = None, max_jobs: int = MAX_TX_JOBS):
+        self.maketx = maketx or find_maketx()
+        self.max_jobs = max_jobs
+        self.jobs = {}
+
+    def add(self, source_path: str):
+        tx_path = get_tx_path(source_path)
+        if not is_tx_current(source_path, tx_path):
+            self.jobs[source_path] = tx_path
+
+        return tx_path
+
+    # Returns the source paths whose conversion failed
+    def run(self):
+        if not self.jobs:
+            return []
+        if self.maketx is None:
+            print("Could not find maketx, textures will not be converted to .tx")
+            return list(self.jobs)
+
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_jobs) as executor:
+            results = list(executor.map(self.run_job, self.jobs.items()))
+
+        failed = [source_path for source_path, succeeded in results if not succeeded]
+        print(
+            f"Converted {len(self.jobs) - len(failed)} of {len(self.jobs)} textures "
+            f"to .tx in {time.perf_counter() - start_time:.1f}s"
+        )
+        self.jobs = {}
+        return failed
+
+    def run_job(self, job: tuple):
+        source_path, tx_path = job
+        result = subprocess.run(
+            [self.maketx, *MAKETX_ARGUMENTS, source_path, "-o", tx_path],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            print(f"maketx failed for {source_path}:\n{result.stderr or result.stdout}")
+
+        return source_path, result.returncode == 0
+
+
+# Point every texture at its .tx version, converting the images that have none
+# materials: {material name: {channel: texture info}} from texture_discovery
+def use_tx_textures(
+    materials: dict, generate: bool = True, max_jobs: int = MAX_TX_JOBS
+):
+    queue = TxJobQueue(max_jobs=max_jobs)
+    textures = [
+        texture
+        for channels in materials.values()
+        for texture in channels.values()
+        if not texture["path"].lower().endswith(TX_EXTENSION)
+    ]
+
+    for texture in textures:
+        for source_path in texture.get("tiles", [texture["path"]]):
+            queue.add(source_path)
+
+    if generate:
+        failed = set(queue.run())
+    else:
+        failed = set(queue.jobs)
+
+    for texture in textures:
+        source_paths = texture.get("tiles", [texture["path"]])
+        if failed.isdisjoint(source_paths):
+            texture["path"] = get_tx_path(texture["path"])
+            if "tiles" in texture:
+                texture["tiles"] = [get_tx_path(path) for path in texture["tiles"]]
+
+
+def is_udim_path(path: str):
+    return UDIM_TOKEN in path
+
+
+# Arnold texture names use a lowercase <udim> token
+def get_arnold_texture_path(path: str):
+    return path.replace(UDIM_TOKEN, "<udim>")
+
+
+# Have Arnold stream tiles of existing .tx files from its texture cache
+# instead of loading full resolution images up front
+def configure_arnold_texture_streaming(max_memory_mb: int = TEXTURE_MAX_MEMORY_MB):
+    if not cmds.objExists(ARNOLD_OPTIONS_NAME):
+        print(f"{ARNOLD_OPTIONS_NAME} not found, is the Arnold renderer loaded?")
+        return
+
+    writer = AttrWriter(undo_chunk_name="arnold_texture_streaming")
+    writer.set_many(
+        ARNOLD_OPTIONS_NAME,
+        {
+            "use_existing_tiled_textures": 1,
+            "textureAutomip": 1,
+            "textureAutotile": 1,
+            "textureMaxMemoryMB": max_memory_mb,
+        },
+    )
+    writer.flush()
@@ -0,0 +1,259 @@
+import json
+import math
+import os
+from fnmatch import fnmatchcase
+
+import maya.api.OpenMaya as om
+
+from ..environment_lighting.environment_lighting import (
+    DISABLED_SKY_RAYS,
+    SKY_BOUNCES,
+    SKY_DIFFUSE,
+    SUN_BEAM,
+    SUN_SPILL,
+)
+from ..utils.attr_writer import AttrWriter
+from ..utils.handles import get_node_name
+from ..utils.scene_index import get_scene_index, get_tag
+
+ARNOLD_LIGHT_TYPES = [
+    "spotLight",
+    "pointLight",
+    "directionalLight",
+    "areaLight",
+    "aiAreaLight",
+    "aiSkyDomeLight",
+    "aiMeshLight",
+    "aiPhotometricLight",
+]
+
+# Per ray type contribution multipliers on Arnold lights
+RAY_ATTRIBUTES = ["aiDiffuse", "aiSpecular", "aiSss", "aiIndirect", "aiVolume"]
+# How much each ray type typically adds to the image, relative to diffuse
+RAY_WEIGHTS = {
+    "aiDiffuse": 1.0,
+    "aiSpecular": 0.5,
+    "aiSss": 0.25,
+    "aiIndirect": 0.3,
+    "aiVolume": 0.2,
+}
+# Relative render cost of each ray type per light sample
+RAY_COSTS = {
+    "aiDiffuse": 1.0,
+    "aiSpecular": 1.0,
+    "aiSss": 1.5,
+    "aiIndirect": 2.0,
+    "aiVolume": 3.0,
+}
+# Indirect cost grows with bounces, up to the usual render settings depth
+MAX_COSTED_BOUNCES = 2
+
+# A ray type is turned off when the light's share of the scene's light,
+# times the ray weight, is below this
+DEFAULT_CONTRIBUTION_THRESHOLD = 0.01
+# Light samples are squared by Arnold, noise falls with the sample count
+# Lights get the fewest samples that keep share / samples ** 2 under this
+DEFAULT_NOISE_THRESHOLD = 0.02
+
+# Rays each light role needs, and the most bounces it gets
+# Roles come from the scene index tag of the light, or else from its name
+ROLE_RAYS = {
+    SUN_BEAM: RAY_ATTRIBUTES,
+    SUN_SPILL: RAY_ATTRIBUTES,
+    SKY_DIFFUSE: [ray for ray in RAY_ATTRIBUTES if ray not in DISABLED_SKY_RAYS],
+    "godray": ["aiVolume"],
+}
+ROLE_MAX_BOUNCES = {SKY_DIFFUSE: SKY_BOUNCES, "godray": 0}
+# The ray a light is there for is never turned off, however dim the light is
+ROLE_MAIN_RAY = {"godray": "aiVolume"}
+DEFAULT_MAIN_RAY = "aiDiffuse"
+ROLE_NAME_PATTERNS = {
+    SUN_BEAM: [f"*{SUN_BEAM}*"],
+    SUN_SPILL: [f"*{SUN_SPILL}*"],
+    SKY_DIFFUSE: [f"*{SKY_DIFFUSE}*"],
+    "godray": ["*godray*", "spot_gobo_noise_*"],
+}
+
+
+#############
+### Scene ###
+#############
+
+
+# Every visible Arnold light in the scene, with the settings the optimizer reads
+def read_scene_lights():
+    index = get_scene_index()
+    lights = []
+    for light_type in ARNOLD_LIGHT_TYPES:
+        for handle in index.find_by_type(light_type):
+            light = read_light(handle)
+            if light is not None:
+                lights.append(light)
+
+    return lights
+
+
+def read_light(handle: om.MObjectHandle):
+    shape = om.MFnDagNode(handle.object())
+    transform = om.MFnDagNode(shape.parent(0))
+    if not get_plug(transform, "visibility").asBool():
+        return None
+
+    settings = {ray: get_plug(shape, ray).asFloat() for ray in RAY_ATTRIBUTES}
+    settings["aiMaxBounces"] = get_plug(shape, "aiMaxBounces").asInt()
+    settings["aiSamples"] = get_plug(shape, "aiSamples").asInt()
+    return {
+        "name": get_node_name(handle),
+        "role": get_light_role(shape, transform),
+        "brightness": get_light_brightness(shape),
+        "settings": settings,
+    }
+
+
+def get_plug(node: om.MFnDependencyNode, attribute: str):
+    return node.findPlug(attribute, False)
+
+
+# Intensity scaled by exposure stops, comparable between lights of any type
+def get_light_brightness(shape: om.MFnDependencyNode):
+    intensity = get_plug(shape, "intensity").asFloat()
+    return intensity * 2 ** get_plug(shape, "aiExposure").asFloat()
+
+
+# The tag of the shape or its transform, or the first role whose name pattern
+# matches the transform, "default" when nothing does
+def get_light_role(shape: om.MFnDagNode, transform: om.MFnDagNode):
+    tag = get_tag(shape) or get_tag(transform)
+    if tag:
+        return tag
+
+    name = transform.name().rpartition(":")[2]
+    for role, patterns in ROLE_NAME_PATTERNS.items():
+        if any(fnmatchcase(name, pattern) for pattern in patterns):
+            return role
+
+    return "default"
+
+
+################
+### Settings ###
+################
+
+
+# Relative render cost of a light, in samples times enabled ray costs
+def estimate_light_cost(settings: dict):
+    cost = 0.0
+    for ray in RAY_ATTRIBUTES:
+        if settings[ray] <= 0:
+            continue
+        ray_cost = RAY_COSTS[ray]
+        if ray == "aiIndirect":
+            ray_cost *= max(1, min(settings["aiMaxBounces"], MAX_COSTED_BOUNCES))
+        cost += ray_cost
+
+    return cost * settings["aiSamples"] ** 2
+
+
+# The cheapest settings of one light that keep it under both thresholds
+# share is the light's part of the scene's total brightness
+# Settings are only ever lowered, rays are not turned back on and samples
+# already below what the noise threshold asks for are kept
+def optimize_light_settings(
+    light: dict,
+    share: float,
+    contribution_threshold: float = DEFAULT_CONTRIBUTION_THRESHOLD,
+    noise_threshold: float = DEFAULT_NOISE_THRESHOLD,
+):
+    before = light["settings"]
+    role_rays = ROLE_RAYS.get(light["role"], RAY_ATTRIBUTES)
+    main_ray = ROLE_MAIN_RAY.get(light["role"], DEFAULT_MAIN_RAY)
+    after = {}
+    for ray in RAY_ATTRIBUTES:
+        contribution = share * RAY_WEIGHTS[ray] * before[ray]
+        keep = ray == main_ray or (
+            ray in role_rays and contribution >= contribution_threshold
+        )
+        after[ray] = before[ray] if keep else 0.0
+
+    max_bounces = before["aiMaxBounces"]
+    if after["aiIndirect"] <= 0:
+        max_bounces = 0
+    elif light["role"] in ROLE_MAX_BOUNCES:
+        max_bounces = min(max_bounces, ROLE_MAX_BOUNCES[light["role"]])
+    after["aiMaxBounces"] = max_bounces
+
+    samples = math.ceil(math.sqrt(share / noise_threshold)) if share > 0 else 1
+    after["aiSamples"] = min(max(samples, 1), before["aiSamples"])
+    return after
+
+
+##############
+### Report ###
+##############
+
+
+# Set every Arnold light to its cheapest settings and report the estimated cost
+# With apply=False the settings are only reported
+# The report is also written as JSON when output_path is given
+def optimize_ray_visibility(
+    contribution_threshold: float = DEFAULT_CONTRIBUTION_THRESHOLD,
+    noise_threshold: float = DEFAULT_NOISE_THRESHOLD,
+    apply: bool = True,
+    output_path: str = None,
+):
+    lights = read_scene_lights()
+    total_brightness = sum(light["brightness"] for light in lights)
+
+    writer = AttrWriter(use_modifier=True)
+    light_reports = []
+    for light in lights:
+        share = light["brightness"] / total_brightness if total_brightness else 0
+        settings = optimize_light_settings(
+            light, share, contribution_threshold, noise_threshold
+        )
+        changes = {
+            attribute: value
+            for attribute, value in settings.items()
+            if value != light["settings"][attribute]
+        }
+        writer.set_many(light["name"], changes)
+        light_reports.append(
+            {
+                "name": light["name"],
+                "role": light["role"],
+                "share": share,
+                "cost_before": estimate_light_cost(light["settings"]),
+                "cost_after": estimate_light_cost(settings),
+                "before": light["settings"],
+                "after": settings,
+                "changes": changes,
+            }
+        )
+
+    if apply:
+        writer.flush()
+
+    cost_before = sum(light["cost_before"] for light in light_reports)
+    cost_after = sum(light["cost_after"] for light in light_reports)
+    report = {
+        "applied": apply,
+        "contribution_threshold": contribution_threshold,
+        "noise_threshold": noise_threshold,
+        "cost_before": cost_before,
+        "cost_after": cost_after,
+        "cost_reduction": 1 - cost_after / cost_before if cost_before else 0.0,
+        "lights": light_reports,
+    }
+    if output_path is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        with open(output_path, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+    changed_count = sum(1 for light in light_reports if light["changes"])
+    print(
+        f"{'Optimized' if apply else 'Checked'} {len(light_reports)} lights, "
+        f"{changed_count} changed. Estimated light cost "
+        f"{cost_before:.0f} -> {cost_after:.0f} "
+        f"({report['cost_reduction']:.0%} less)"
+    )
+    return report
@@ -0,0 +1,181 @@
+import math
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from ..environment_lighting.environment_lighting import (
+    CHARACTER_NAME,
+    euclidean_distance,
+)
+from ..utils.attr_writer import AttrWriter
+from ..utils.handles import get_handle, get_node_name
+from ..utils.scene_index import get_scene_index
+from .ray_visibility import ARNOLD_LIGHT_TYPES, get_light_brightness, get_plug
+
+# Arnold traces aiSamples ** 2 shadow rays per light, a budget is the total of
+# squared samples, so a shot's light sampling cost is fixed by its budget
+DEFAULT_SAMPLE_BUDGET = 64
+MIN_LIGHT_SAMPLES = 1
+MAX_LIGHT_SAMPLES = 10
+
+AREA_LIGHT_TYPES = ["areaLight", "aiAreaLight"]
+# Lights that surround the scene, they cover half the sky seen from anywhere
+DOME_LIGHT_TYPES = ["aiSkyDomeLight"]
+HEMISPHERE = 2 * math.pi
+
+
+#############
+### Scene ###
+#############
+
+
+# Position, brightness and size of each light, seen from the target
+# lights: MObjectHandles of light shapes
+def read_budget_lights(lights: list, target_position: list):
+    budget_lights = []
+    for handle in lights:
+        shape = om.MFnDagNode(handle.object())
+        transform = om.MFnDagNode(shape.parent(0))
+        position = om.MFnTransform(transform.getPath()).rotatePivot(om.MSpace.kWorld)
+        distance = euclidean_distance(
+            [position.x, position.y, position.z], target_position
+        )
+        solid_angle = get_solid_angle(shape, transform, distance)
+        budget_lights.append(
+            {
+                "name": get_node_name(handle),
+                "distance": distance,
+                "solid_angle": solid_angle,
+                # Soft lights are noisier the brighter and larger they look
+                "weight": get_light_brightness(shape) * solid_angle,
+                "samples": get_plug(shape, "aiSamples").asInt(),
+            }
+        )
+
+    return budget_lights
+
+
+# Solid angle the light covers seen from the target, lights without a size
+# cast hard shadows that need no extra samples and cover none
+def get_solid_angle(shape: om.MFnDagNode, transform: om.MFnDagNode, distance: float):
+    if shape.typeName in DOME_LIGHT_TYPES:
+        return HEMISPHERE
+    if shape.typeName == "directionalLight":
+        half_angle = math.radians(get_plug(shape, "aiAngle").asFloat()) / 2
+        return HEMISPHERE * (1 - math.cos(half_angle))
+
+    if shape.typeName in AREA_LIGHT_TYPES:
+        # A 2 x 2 quad scaled by the transform, as a disc of the same area
+        area = 4 * abs(
+            get_plug(transform, "scaleX").asFloat()
+            * get_plug(transform, "scaleY").asFloat()
+        )
+        radius = math.sqrt(area / math.pi)
+    else:
+        radius = get_plug(shape, "aiRadius").asFloat()
+
+    if radius <= 0:
+        return 0.0
+    # Disc facing the target
+    return HEMISPHERE * (1 - distance / math.sqrt(distance**2 + radius**2))
+
+
+# Handles of the Arnold light shapes anywhere under a group
+def get_group_lights(group: str):
+    shapes = cmds.listRelatives(
+        group, allDescendents=True, fullPath=True, type=ARNOLD_LIGHT_TYPES
+    )
+    return [get_handle(shape) for shape in shapes or []]
+
+
+def get_target_position(target: str):
+    selection = om.MSelectionList()
+    selection.add(target)
+    position = om.MFnTransform(selection.getDagPath(0)).rotatePivot(om.MSpace.kWorld)
+    return [position.x, position.y, position.z]
+
+
+##################
+### Allocation ###
+##################
+
+
+# Split a budget of squared samples between lights by weight
+# Every light gets at least MIN_LIGHT_SAMPLES, the rest goes to the lights
+# furthest below their share, one sample at a time, while it fits the budget
+# Returns the samples of each light, in the order of the weights
+def allocate_samples(weights: list, budget: int):
+    samples = [MIN_LIGHT_SAMPLES] * len(weights)
+    total_weight = sum(weights)
+    remaining = budget - sum(s**2 for s in samples)
+    if total_weight <= 0 or remaining <= 0:
+        return samples
+
+    targets = [
+        math.sqrt(MIN_LIGHT_SAMPLES**2 + remaining * weight / total_weight)
+        for weight in weights
+    ]
+    while True:
+        candidates = [
+            i
+            for i, count in enumerate(samples)
+            if count < MAX_LIGHT_SAMPLES
+            and count < targets[i]
+            and (count + 1) ** 2 - count**2 <= remaining
+        ]
+        if not candidates:
+            return samples
+
+        # Furthest below its target, relative to it
+        i = max(candidates, key=lambda i: (targets[i] - samples[i]) / targets[i])
+        remaining -= (samples[i] + 1) ** 2 - samples[i] ** 2
+        samples[i] += 1
+
+
+# Spread a sample budget over lights, weighted by how bright and how large each
+# one looks from the target, and write aiSamples to all of them at once
+# lights: MObjectHandles of light shapes, every Arnold light by default
+# target: the node the lights are weighted toward, e.g. the character
+# writer: queue the samples on this AttrWriter instead of writing them,
+# so many shots can be written together
+# Returns a report of each light's weight and samples
+def allocate_light_samples(
+    budget: int = DEFAULT_SAMPLE_BUDGET,
+    lights: list = None,
+    target: str = CHARACTER_NAME,
+    apply: bool = True,
+    writer: AttrWriter = None,
+):
+    index = get_scene_index()
+    if lights is None:
+        lights = [
+            handle
+            for light_type in ARNOLD_LIGHT_TYPES
+            for handle in index.find_by_type(light_type)
+        ]
+    target_position = [0.0, 0.0, 0.0]
+    if index.exists(target):
+        target_position = get_target_position(target)
+
+    budget_lights = read_budget_lights(lights, target_position)
+    samples = allocate_samples([light["weight"] for light in budget_lights], budget)
+
+    own_writer = writer is None
+    if own_writer:
+        writer = AttrWriter(use_modifier=True)
+    for light, light_samples in zip(budget_lights, samples):
+        light["samples_before"] = light.pop("samples")
+        light["samples"] = light_samples
+        if light_samples != light["samples_before"]:
+            writer.set(light["name"], "aiSamples", light_samples)
+
+    used = sum(light["samples"] ** 2 for light in budget_lights)
+    if own_writer:
+        if apply:
+            writer.flush()
+        print(
+            f"Allocated {used} of {budget} squared light samples "
+            f"over {len(budget_lights)} lights"
+        )
+
+    return {"budget": budget, "used": used, "lights": budget_lights}
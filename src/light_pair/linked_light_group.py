@@ -0,0 +1,143 @@
+import math
+import time
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from ..utils.handles import get_handle, get_node_name
+from ..utils.light_builder import build_lights
+from ..utils.transaction import commit_modifier
+
+# Attributes added to the group's control transform, and what they drive on each light
+# (attribute, addAttr flags, light node, light attribute)
+# Every control attribute fans out with one connection per light,
+# compound attributes like scale and color are connected as a whole
+# Angles are doubleAngle like the light's, so they show degrees and connect without
+# a unit conversion node, addAttr takes their defaults in radians
+CONTROL_ATTRIBUTES = [
+    ("lightScale", {"attributeType": "double3"}, "transform", "scale"),
+    ("radius", {"attributeType": "double", "defaultValue": 0}, "shape", "aiRadius"),
+    (
+        "coneAngle",
+        {"attributeType": "doubleAngle", "defaultValue": math.radians(20)},
+        "shape",
+        "coneAngle",
+    ),
+    (
+        "penumbraAngle",
+        {"attributeType": "doubleAngle", "defaultValue": 0},
+        "shape",
+        "penumbraAngle",
+    ),
+    (
+        "colorTemperature",
+        {"attributeType": "double", "defaultValue": 5500},
+        "shape",
+        "aiColorTemperature",
+    ),
+    (
+        "useColorTemperature",
+        {"attributeType": "bool", "defaultValue": 1},
+        "shape",
+        "aiUseColorTemperature",
+    ),
+    ("exposure", {"attributeType": "double", "defaultValue": 8}, "shape", "aiExposure"),
+    ("lightColor", {"usedAsColor": True, "attributeType": "float3"}, "shape", "color"),
+]
+
+# Children of the compound control attributes, with their defaults
+COMPOUND_CHILDREN = {
+    "lightScale": [("lightScaleX", 1), ("lightScaleY", 1), ("lightScaleZ", 1)],
+    "lightColor": [("lightColorR", 1), ("lightColorG", 1), ("lightColorB", 1)],
+}
+
+
+# Add the control attributes to a transform
+def add_control_attributes(control: str):
+    for attribute, flags, _, _ in CONTROL_ATTRIBUTES:
+        cmds.addAttr(control, longName=attribute, keyable=True, **flags)
+        child_type = "float" if flags["attributeType"] == "float3" else "double"
+        for child, default in COMPOUND_CHILDREN.get(attribute, []):
+            cmds.addAttr(
+                control,
+                longName=child,
+                attributeType=child_type,
+                defaultValue=default,
+                parent=attribute,
+                keyable=True,
+            )
+
+    # Compound defaults only apply once all children exist
+    for attribute, children in COMPOUND_CHILDREN.items():
+        cmds.setAttr(f"{control}.{attribute}", *[default for _, default in children])
+
+
+# Connect the control attributes to every light with a single modifier
+# lights: {"transform": MObjectHandle, "shape": MObjectHandle} from light_builder
+def connect_linked_lights(control: om.MObjectHandle, lights: list):
+    control_node = om.MFnDependencyNode(control.object())
+    modifier = om.MDGModifier()
+    for light in lights:
+        for attribute, _, light_node, light_attribute in CONTROL_ATTRIBUTES:
+            destination = om.MFnDependencyNode(light[light_node].object())
+            # e.g. only spot lights have cone and penumbra angles
+            if not destination.hasAttribute(light_attribute):
+                continue
+            modifier.connect(
+                control_node.findPlug(attribute, False),
+                destination.findPlug(light_attribute, False),
+            )
+
+    commit_modifier(modifier)
+
+
+# Create lights under the control transform and link them to it
+# Lights are named f"{name}_{number}", name defaults to the control's name
+# Returns the light transform names
+def add_linked_lights(
+    control: str,
+    count: int,
+    name: str = None,
+    light_type: str = "spotLight",
+    spacing: float = 0,
+):
+    control_handle = get_handle(control)
+    if name is None:
+        control_short_name = control.rpartition("|")[2]
+        name = control_short_name.rpartition("_control")[0] or control_short_name
+    existing = len(cmds.listRelatives(control, children=True, type="transform") or [])
+    offset = (count - 1) / 2
+    lights = build_lights(
+        [
+            {
+                "name": f"{name}_{existing + i + 1}",
+                "type": light_type,
+                "parent": control_handle,
+                "transform_attributes": {"translateX": (i - offset) * spacing},
+            }
+            for i in range(count)
+        ]
+    )
+    connect_linked_lights(control_handle, lights)
+    return [get_node_name(light["transform"]) for light in lights]
+
+
+# Create a group of N lights that share their attributes through one control transform
+# Moving the control moves the group, its attributes drive every light
+# Returns the control transform name
+def create_linked_light_group(
+    count: int = 2,
+    name: str = None,
+    light_type: str = "spotLight",
+    spacing: float = 0,
+):
+    if name is None:
+        name = f"linked_lights_{int(time.time())}"
+
+    control = build_lights([{"name": f"{name}_control"}])[0]["transform"]
+    control_name = get_node_name(control)
+    add_control_attributes(control_name)
+    add_linked_lights(
+        control_name, count, name=name, light_type=light_type, spacing=spacing
+    )
+    return get_node_name(control)
@@ -1,50 +1,142 @@
+import math
+
 import maya.cmds as cmds
+import maya.api.OpenMaya as om
 
+from ..utils.light_builder import build_lights
+from ..utils.rig_template import get_rig_template, instantiate_template
 
-# Get the parent of the light using listRelatives
-def get_spotlight_parent(spot_light):
-    spot_light_parent = cmds.listRelatives(spot_light, parent=True)
-    if spot_light_parent:
-        return spot_light_parent[0]
+# Bump when create_easy_light_rig changes, so its cached template is captured again
+EASY_LIGHT_RIG_TEMPLATE = "easy_light_rig"
+EASY_LIGHT_RIG_VERSION = 1
 
+# The default rig frames a subject around the origin from this camera distance,
+# a framed rig is moved to the subject and scaled by its distance over this one
+CAMERA_DISTANCE = 7.5
+# Maya's default camera, 35mm lens and 0.945 inch (24mm) vertical film aperture
+CAMERA_FOCAL_LENGTH = 35.0
+CAMERA_VERTICAL_APERTURE = 0.945
+CAMERA_NEAR_CLIP = 0.1
+CAMERA_FAR_CLIP = 10000.0
 
-def create_easy_light_rig():
-    # Create a point light for the key light
-    key_light = cmds.spotLight(name="key_light")
-    key_light_parent = get_spotlight_parent(key_light)
 
-    cmds.setAttr(key_light_parent + ".translateX", 5)
-    cmds.setAttr(key_light_parent + ".translateY", 0)
-    cmds.setAttr(key_light_parent + ".translateZ", 5)
-    cmds.setAttr(key_light_parent + ".rotateY", 35)
+# center: world position the rig is built around
+# scale: multiplies light distances, light sizes and camera clipping
+# Light exposures follow the inverse square law, so the subject is lit the same
+# whatever the scale
+def create_easy_light_rig(center: tuple = (0, 0, 0), scale: float = 1.0):
+    # Twice the distance needs four times the intensity, 2 stops
+    exposure_offset = 2 * math.log2(scale)
 
-    # Create a spot light for the fill light
-    fill_light = cmds.spotLight(name="fill_light")
-    fill_light_parent = get_spotlight_parent(fill_light)
+    def place(offset: tuple):
+        return tuple(c + o * scale for c, o in zip(center, offset))
 
-    cmds.setAttr(fill_light_parent + ".translateX", -5)
-    cmds.setAttr(fill_light_parent + ".translateY", 0)
-    cmds.setAttr(fill_light_parent + ".translateZ", 5)
-    cmds.setAttr(fill_light_parent + ".rotateY", -45)
+    # Group all lights under a parent group
+    light_group = {"name": "light_rig"}
 
-    # Create a directional light for the backlight
-    back_light = cmds.spotLight(name="back_light")
-    back_light_parent = get_spotlight_parent(back_light)
+    # Create a spot light for the key light
+    key_light = {
+        "name": "key_light",
+        "type": "spotLight",
+        "parent": light_group,
+        "transform_attributes": {
+            "translate": place((5, 0, 5)),
+            "rotateY": 35,
+            "scale": (scale, scale, scale),
+        },
+        "attributes": {"aiExposure": 8 + exposure_offset},
+    }
 
-    cmds.setAttr(back_light_parent + ".translateX", 0)
-    cmds.setAttr(back_light_parent + ".translateY", 5)
-    cmds.setAttr(back_light_parent + ".translateZ", -5)
-    cmds.setAttr(back_light_parent + ".rotateY", 180)
-    cmds.setAttr(back_light_parent + ".rotateX", -30)
+    # Create a spot light for the fill light
+    fill_light = {
+        "name": "fill_light",
+        "type": "spotLight",
+        "parent": light_group,
+        "transform_attributes": {
+            "translate": place((-5, 0, 5)),
+            "rotateY": -45,
+            "scale": (scale, scale, scale),
+        },
+        "attributes": {"aiExposure": 6 + exposure_offset},
+    }
 
-    cmds.setAttr(key_light + ".aiExposure", 8)
-    cmds.setAttr(fill_light + ".aiExposure", 6)
-    cmds.setAttr(back_light + ".aiExposure", 8)
+    # Create a spot light for the backlight
+    back_light = {
+        "name": "back_light",
+        "type": "spotLight",
+        "parent": light_group,
+        "transform_attributes": {
+            "translate": place((0, 5, -5)),
+            "rotate": (-30, 180, 0),
+            "scale": (scale, scale, scale),
+        },
+        "attributes": {"aiExposure": 8 + exposure_offset},
+    }
 
-    # Group all lights under a parent group
-    light_group = cmds.group(key_light, fill_light, back_light, name="light_rig")
+    # All lights, their group and attributes are created in one pass
+    build_lights([light_group, key_light, fill_light, back_light])
 
-    # Create a camera
-    render_cam = cmds.camera(name="renderCam")
+    # Create a camera, clipping scales with the rig so large sets are not cut off
+    render_cam = cmds.camera(
+        name="renderCam",
+        nearClipPlane=CAMERA_NEAR_CLIP * scale,
+        farClipPlane=CAMERA_FAR_CLIP * scale,
+    )
     render_cam_transform = render_cam[0]
-    cmds.setAttr(render_cam_transform + ".translateZ", 7.5)
+    cmds.setAttr(
+        render_cam_transform + ".translate", *place((0, 0, CAMERA_DISTANCE))
+    )
+
+
+# Build the easy light rig framed around the selected geometry
+# The rig is centered on the selection's bounding box and scaled so the camera
+# fits its bounding sphere
+def create_framed_easy_light_rig():
+    bounds = get_selection_bounding_box()
+    if bounds is None:
+        cmds.error("Select the geometry to frame the light rig around")
+
+    radius = math.sqrt(bounds.width**2 + bounds.height**2 + bounds.depth**2) / 2
+    center = bounds.center
+    scale = max(get_camera_fit_distance(radius), 1e-3) / CAMERA_DISTANCE
+    create_easy_light_rig((center.x, center.y, center.z), scale)
+
+
+# World space bounding box of the selected DAG nodes, None if nothing is selected
+# Each selected node is read once through the API, a selected group is
+# bounded by its transform without visiting its descendants
+def get_selection_bounding_box():
+    selection = om.MGlobal.getActiveSelectionList()
+    selection_iterator = om.MItSelectionList(selection, om.MFn.kDagNode)
+    bounds = None
+    while not selection_iterator.isDone():
+        path = selection_iterator.getDagPath()
+        # In the space of the node's parent, for a shape its transform's
+        node_bounds = om.MFnDagNode(path).boundingBox
+        node_bounds.transformUsing(path.exclusiveMatrix())
+        if bounds is None:
+            bounds = node_bounds
+        else:
+            bounds.expand(node_bounds)
+        selection_iterator.next()
+
+    return bounds
+
+
+# Distance at which the default camera fits a sphere of this radius vertically
+def get_camera_fit_distance(radius: float):
+    half_height = CAMERA_VERTICAL_APERTURE * 25.4 / 2
+    half_angle = math.atan(half_height / CAMERA_FOCAL_LENGTH)
+    return radius / math.sin(half_angle)
+
+
+# Stamp copies of the easy light rig from its cached template, the rig is only
+# built once and then created in bulk, e.g. for every shot of a sequence
+# Node names are prefixed, e.g. "shot010_key_light" for the prefix "shot010_"
+# overrides: {node name: {attribute: value}}, e.g. {"key_light": {"aiExposure": 9}}
+# Returns the root transform handles of each rig
+def stamp_easy_light_rigs(prefixes: list, overrides: dict = None):
+    template = get_rig_template(
+        EASY_LIGHT_RIG_TEMPLATE, create_easy_light_rig, EASY_LIGHT_RIG_VERSION
+    )
+    return instantiate_template(template, prefixes, overrides)
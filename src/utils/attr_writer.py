@@ -0,0 +1,149 @@
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from .handles import resolve_node_name
+from .transaction import commit_modifier
+
+# Compound attributes that can be written with one setAttr call
+# when all of their children are queued for the same node
+COMPOUND_ATTRIBUTES = {
+    "translate": ("translateX", "translateY", "translateZ"),
+    "rotate": ("rotateX", "rotateY", "rotateZ"),
+    "scale": ("scaleX", "scaleY", "scaleZ"),
+    "color": ("colorR", "colorG", "colorB"),
+}
+
+DEFAULT_UNDO_CHUNK_NAME = "maya_tools_attr_writer"
+
+
+# Queue attribute writes and flush them together
+#
+# Writes to the same plug collapse to the last value, compound children
+# (e.g. scaleX/Y/Z) are merged into a single setAttr, and every flush is
+# one undo chunk. With use_modifier=True the writes go through a single
+# MDGModifier instead, which is faster for bulk builds and is only recorded
+# in the undo queue when the undo plugin is loaded, see transaction.py
+class AttrWriter:
+    def __init__(
+        self, use_modifier: bool = False, undo_chunk_name: str = DEFAULT_UNDO_CHUNK_NAME
+    ):
+        self.use_modifier = use_modifier
+        self.undo_chunk_name = undo_chunk_name
+        self.queue = {}
+        self.commands_issued = 0
+        self.writes_flushed = 0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.clear()
+
+    # obj_name can also be an MObjectHandle, e.g. from light_builder
+    def set(self, obj_name: str, attribute: str, value: any):
+        obj_name = resolve_node_name(obj_name)
+        # Re-insert so the plug is flushed in the order of its last write
+        self.queue.pop((obj_name, attribute), None)
+        self.queue[(obj_name, attribute)] = value
+
+    def set_many(self, obj_name: str, values: dict):
+        for attribute, value in values.items():
+            self.set(obj_name, attribute, value)
+
+    def clear(self):
+        self.queue = {}
+
+    # Write all queued values, returns the number of commands issued
+    def flush(self):
+        if not self.queue:
+            return 0
+
+        writes = self.merge_compound_writes()
+        if self.use_modifier:
+            commands_issued = flush_with_modifier(writes)
+        else:
+            commands_issued = flush_with_cmds(writes, self.undo_chunk_name)
+
+        self.writes_flushed += len(self.queue)
+        self.commands_issued += commands_issued
+        self.clear()
+        return commands_issued
+
+    # Replace complete sets of compound children with one compound write
+    def merge_compound_writes(self):
+        writes = dict(self.queue)
+        nodes = {obj_name for obj_name, _ in writes}
+        for obj_name in nodes:
+            for compound, children in COMPOUND_ATTRIBUTES.items():
+                keys = [(obj_name, child) for child in children]
+                if all(key in writes for key in keys):
+                    values = [writes.pop(key) for key in keys]
+                    writes[(obj_name, compound)] = values
+
+        return writes
+
+
+def flush_with_cmds(writes: dict, undo_chunk_name: str = DEFAULT_UNDO_CHUNK_NAME):
+    cmds.undoInfo(openChunk=True, chunkName=undo_chunk_name)
+    try:
+        for (obj_name, attribute), value in writes.items():
+            plug = f"{obj_name}.{attribute}"
+            if isinstance(value, str):
+                cmds.setAttr(plug, value, type="string")
+            elif isinstance(value, (list, tuple)):
+                cmds.setAttr(plug, *value, type=f"double{len(value)}")
+            else:
+                cmds.setAttr(plug, value)
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+    return len(writes)
+
+
+def flush_with_modifier(writes: dict):
+    modifier = om.MDGModifier()
+    for (obj_name, attribute), value in writes.items():
+        selection = om.MSelectionList()
+        selection.add(f"{obj_name}.{attribute}")
+        plug = selection.getPlug(0)
+        if isinstance(value, (list, tuple)):
+            for i, child_value in enumerate(value):
+                set_plug_value(modifier, plug.child(i), child_value)
+        else:
+            set_plug_value(modifier, plug, value)
+
+    commit_modifier(modifier)
+    return 1
+
+
+# Values are given in UI units, like cmds.setAttr
+def set_plug_value(modifier: om.MDGModifier, plug: om.MPlug, value: any):
+    unit_type = get_unit_type(plug)
+    if unit_type == om.MFnUnitAttribute.kAngle:
+        modifier.newPlugValueMAngle(plug, om.MAngle(value, om.MAngle.uiUnit()))
+    elif unit_type == om.MFnUnitAttribute.kDistance:
+        distance = om.MDistance(value, om.MDistance.uiUnit())
+        modifier.newPlugValueMDistance(plug, distance)
+    # bool is checked first since it is a subclass of int
+    elif isinstance(value, bool):
+        modifier.newPlugValueBool(plug, value)
+    elif isinstance(value, int):
+        modifier.newPlugValueInt(plug, value)
+    elif isinstance(value, str):
+        modifier.newPlugValueString(plug, value)
+    else:
+        modifier.newPlugValueDouble(plug, value)
+
+
+def get_unit_type(plug: om.MPlug):
+    attribute = plug.attribute()
+    if attribute.hasFn(om.MFn.kUnitAttribute):
+        return om.MFnUnitAttribute(attribute).unitType()
+
+    return None
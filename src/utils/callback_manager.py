@@ -0,0 +1,165 @@
+import time
+import traceback
+from functools import partial
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+# Callbacks registered through this module, by name
+# name -> {"kind": "script_job" or "message", "id": job number or callback id}
+registered = {}
+# Names whose deferred run is queued, events before it runs are folded into it
+pending = set()
+# Names that already ran with once=True this session
+finished = set()
+# name -> {"calls", "total_seconds", "last_seconds", "max_seconds"}
+timings = {}
+
+
+####################
+### Registration ###
+####################
+
+
+# Run function on a scriptJob event, e.g. event="NewSceneOpened"
+# Registering a name again replaces its job, so re-sourcing a setup script
+# never stacks duplicate jobs
+# deferred: run once Maya is idle instead of inside the event, a burst of
+# events before then runs function only once
+# once: unregister after the first successful run, for setup that only needs
+# to happen once per session
+def register_script_job(
+    name: str,
+    function,
+    event: str,
+    deferred: bool = True,
+    once: bool = False,
+):
+    unregister(name)
+    handler = partial(handle_event, name, function, deferred, once)
+    job = cmds.scriptJob(event=[event, handler])
+    registered[name] = {"kind": "script_job", "id": job}
+    return job
+
+
+# Run function on an MMessage callback, e.g.
+# register_message_callback("reset", om.MSceneMessage.addCallback,
+#                           om.MSceneMessage.kAfterOpen, reset)
+# The callback arguments are not passed on, see register_script_job for the rest
+def register_message_callback(
+    name: str,
+    add_callback,
+    message,
+    function,
+    deferred: bool = True,
+    once: bool = False,
+):
+    unregister(name)
+    handler = partial(handle_event, name, function, deferred, once)
+    callback_id = add_callback(message, lambda *args: handler())
+    registered[name] = {"kind": "message", "id": callback_id}
+    return callback_id
+
+
+def unregister(name: str):
+    record = registered.pop(name, None)
+    pending.discard(name)
+    if record is None:
+        return
+
+    if record["kind"] == "message":
+        om.MMessage.removeCallback(record["id"])
+    elif cmds.scriptJob(exists=record["id"]):
+        cmds.scriptJob(kill=record["id"], force=True)
+
+
+def unregister_all():
+    for name in list(registered):
+        unregister(name)
+
+
+def is_registered(name: str):
+    return name in registered
+
+
+###############
+### Running ###
+###############
+
+
+def handle_event(name: str, function, deferred: bool, once: bool, *args):
+    if once and name in finished:
+        return
+    if not deferred:
+        run_callback(name, function, once)
+        return
+
+    if name in pending:
+        return
+    pending.add(name)
+    cmds.evalDeferred(partial(run_pending, name, function, once), lowestPriority=True)
+
+
+def run_pending(name: str, function, once: bool):
+    # Unregistered while it was waiting
+    if name not in pending:
+        return
+
+    pending.discard(name)
+    run_callback(name, function, once)
+
+
+# Run function once Maya is idle, only the first call for a name runs it
+# e.g. tool setup from userSetup.py, which then costs nothing on scene opens
+def run_once_when_idle(name: str, function):
+    if name in finished or name in pending:
+        return
+
+    pending.add(name)
+    cmds.evalDeferred(partial(run_pending, name, function, True), lowestPriority=True)
+
+
+# A failing callback is reported, it never interrupts Maya's event processing
+def run_callback(name: str, function, once: bool = False):
+    start_time = time.perf_counter()
+    try:
+        function()
+    except Exception:
+        cmds.warning(f"Callback {name} failed:\n{traceback.format_exc()}")
+        return
+    finally:
+        record_timing(name, time.perf_counter() - start_time)
+
+    if once:
+        finished.add(name)
+        unregister(name)
+
+
+##############
+### Timing ###
+##############
+
+
+def record_timing(name: str, seconds: float):
+    timing = timings.setdefault(
+        name,
+        {"calls": 0, "total_seconds": 0.0, "last_seconds": 0.0, "max_seconds": 0.0},
+    )
+    timing["calls"] += 1
+    timing["total_seconds"] += seconds
+    timing["last_seconds"] = seconds
+    timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+
+# Print how long each callback took, slowest first
+def report_timings():
+    for name, timing in sorted(
+        timings.items(), key=lambda item: item[1]["total_seconds"], reverse=True
+    ):
+        print(
+            f"{name:<32} {timing['calls']:>5} calls "
+            f"{timing['total_seconds'] * 1000:>9.1f}ms total "
+            f"{timing['max_seconds'] * 1000:>8.1f}ms max"
+        )
+
+    return timings
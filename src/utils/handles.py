@@ -0,0 +1,29 @@
+import maya.api.OpenMaya as om
+
+
+# Get a handle to a node by name, handles stay valid through renames and reparenting
+def get_handle(node_name: str):
+    selection = om.MSelectionList()
+    selection.add(node_name)
+    return om.MObjectHandle(selection.getDependNode(0))
+
+
+# Get the current name of a node from its handle
+# DAG nodes return the shortest unique path, so duplicate short names still resolve
+def get_node_name(handle: om.MObjectHandle):
+    if not handle.isValid():
+        raise RuntimeError("Node no longer exists")
+
+    node = handle.object()
+    if node.hasFn(om.MFn.kDagNode):
+        return om.MFnDagNode(node).partialPathName()
+
+    return om.MFnDependencyNode(node).name()
+
+
+# Accept either a node name or a handle and return the name
+def resolve_node_name(node):
+    if isinstance(node, om.MObjectHandle):
+        return get_node_name(node)
+
+    return node
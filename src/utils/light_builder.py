@@ -0,0 +1,111 @@
+import maya.api.OpenMaya as om
+
+from .attr_writer import set_plug_value
+from .handles import get_handle
+from .transaction import commit_modifier
+
+LIGHT_SET_NAME = "defaultLightSet"
+
+# Shape types that are not lights and should not join the default light set
+NON_LIGHT_TYPES = ["transform", "camera", "locator"]
+
+
+# Create transforms, light shapes, their parenting and initial attributes
+# with a single MDagModifier.doIt()
+#
+# Each spec is a dict:
+#   name: transform name, the shape is named f"{name}Shape"
+#   type: shape type, e.g. "spotLight" or "aiAreaLight", or "transform" for a group
+#   parent: a spec earlier in the list, an MObjectHandle, a node name, or None
+#   children: existing MObjectHandles or node names to reparent under the transform
+#   transform_attributes: {attribute: value} set on the transform
+#   attributes: {attribute: value} set on the shape
+#
+# Returns one {"transform": MObjectHandle, "shape": MObjectHandle or None} per spec.
+# Maya renames nodes whose names collide, so names should always be read
+# back from the handles with handles.get_node_name.
+def build_lights(specs: list):
+    modifier = om.MDagModifier()
+    created = {}
+    results = []
+    light_transforms = []
+
+    for spec in specs:
+        parent = get_parent_object(spec.get("parent"), created)
+        transform = modifier.createNode("transform", parent)
+        modifier.renameNode(transform, spec["name"])
+
+        shape = None
+        shape_type = spec.get("type", "transform")
+        if shape_type != "transform":
+            shape = modifier.createNode(shape_type, transform)
+            modifier.renameNode(shape, f"{spec['name']}Shape")
+            if shape_type not in NON_LIGHT_TYPES:
+                light_transforms.append(transform)
+
+        set_attributes(modifier, transform, spec.get("transform_attributes", {}))
+        if shape is not None:
+            set_attributes(modifier, shape, spec.get("attributes", {}))
+
+        for child in spec.get("children", []):
+            if isinstance(child, str):
+                child = get_handle(child)
+            modifier.reparentNode(child.object(), transform)
+
+        created[id(spec)] = transform
+        results.append(
+            {
+                "transform": om.MObjectHandle(transform),
+                "shape": om.MObjectHandle(shape) if shape is not None else None,
+            }
+        )
+
+    add_to_light_set(modifier, light_transforms)
+    commit_modifier(modifier)
+    return results
+
+
+def build_light(spec: dict):
+    return build_lights([spec])[0]
+
+
+def get_parent_object(parent, created: dict):
+    if parent is None:
+        return om.MObject.kNullObj
+    if isinstance(parent, dict):
+        return created[id(parent)]
+    if isinstance(parent, str):
+        parent = get_handle(parent)
+
+    return parent.object()
+
+
+def set_attributes(modifier: om.MDagModifier, node: om.MObject, attributes: dict):
+    dependency_node = om.MFnDependencyNode(node)
+    for attribute, value in attributes.items():
+        plug = dependency_node.findPlug(attribute, False)
+        if isinstance(value, (list, tuple)):
+            for i, child_value in enumerate(value):
+                set_plug_value(modifier, plug.child(i), child_value)
+        else:
+            set_plug_value(modifier, plug, value)
+
+
+# Lights illuminate by default through membership in the default light set,
+# which the light commands normally set up
+def add_to_light_set(modifier: om.MDagModifier, light_transforms: list):
+    if not light_transforms:
+        return
+
+    light_set = get_handle(LIGHT_SET_NAME).object()
+    members_plug = om.MFnDependencyNode(light_set).findPlug("dagSetMembers", False)
+    indices = members_plug.getExistingArrayAttributeIndices()
+    next_index = max(indices) + 1 if indices else 0
+
+    for i, transform in enumerate(light_transforms):
+        transform_node = om.MFnDependencyNode(transform)
+        inst_obj_groups = transform_node.findPlug("instObjGroups", False)
+        modifier.connect(
+            inst_obj_groups.elementByLogicalIndex(0),
+            members_plug.elementByLogicalIndex(next_index + i),
+        )
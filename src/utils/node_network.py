@@ -0,0 +1,123 @@
+import re
+
+import maya.api.OpenMaya as om
+
+from .attr_writer import set_plug_value
+from .handles import get_handle
+from .transaction import commit_modifier
+
+# Where shadingNode would list each kind of node, and the plug it connects
+DEFAULT_LISTS = {
+    "shader": ("defaultShaderList1", "shaders", "message"),
+    "texture": ("defaultTextureList1", "textures", "message"),
+    "utility": ("defaultRenderUtilityList1", "utilities", "message"),
+    "shading_group": ("renderPartition", "sets", "partition"),
+}
+
+ARRAY_ELEMENT = re.compile(r"^(\w+)\[(\d+)\]$")
+
+
+# Content-keyed handles of shading nodes that were already built
+# Used by the dedup mode to share nodes between networks and between builds
+class NetworkCache:
+    def __init__(self):
+        self.nodes = {}
+
+    def get(self, key: tuple):
+        handle = self.nodes.get(key)
+        if handle is None:
+            return None
+        if not handle.isValid():
+            # Deleted, or the scene was replaced
+            del self.nodes[key]
+            return None
+
+        return handle.object()
+
+    def add(self, key: tuple, node: om.MObject):
+        self.nodes[key] = om.MObjectHandle(node)
+
+
+# Create shading nodes, their connections and values with one MDGModifier
+# Nothing exists in the scene until commit() is called
+# With a cache, nodes with matching content keys are reused instead of created
+class ShadingNetworkBuilder:
+    def __init__(self, cache: NetworkCache = None):
+        self.modifier = om.MDGModifier()
+        self.cache = cache
+        self.next_list_indices = {}
+        self.nodes_created = 0
+        self.nodes_saved = 0
+
+    # Nodes without a classification are kept out of the default lists
+    def create_node(self, node_type: str, name: str, classification: str = None):
+        node = self.modifier.createNode(node_type)
+        self.modifier.renameNode(node, name)
+        if classification is not None:
+            self.add_to_default_list(node, classification)
+        self.nodes_created += 1
+        return node
+
+    # node_count is how many nodes the cached node stands in for
+    def get_cached(self, key: tuple, node_count: int = 1):
+        if self.cache is None:
+            return None
+
+        node = self.cache.get(key)
+        if node is not None:
+            self.nodes_saved += node_count
+
+        return node
+
+    def add_cached(self, key: tuple, node: om.MObject):
+        if self.cache is not None:
+            self.cache.add(key, node)
+
+    # Connect the node to its default list, like shadingNode and sets -renderable
+    def add_to_default_list(self, node: om.MObject, classification: str):
+        list_name, list_attribute, source_attribute = DEFAULT_LISTS[classification]
+        list_node = get_handle(list_name).object()
+        list_plug = om.MFnDependencyNode(list_node).findPlug(list_attribute, False)
+
+        if list_name not in self.next_list_indices:
+            indices = list_plug.getExistingArrayAttributeIndices()
+            self.next_list_indices[list_name] = max(indices) + 1 if indices else 0
+        index = self.next_list_indices[list_name]
+        self.next_list_indices[list_name] += 1
+
+        self.modifier.connect(
+            get_plug(node, source_attribute), list_plug.elementByLogicalIndex(index)
+        )
+
+    def connect(
+        self,
+        source: om.MObject,
+        source_attribute: str,
+        destination: om.MObject,
+        destination_attribute: str,
+    ):
+        self.modifier.connect(
+            get_plug(source, source_attribute),
+            get_plug(destination, destination_attribute),
+        )
+
+    def set(self, node: om.MObject, attribute: str, value: any):
+        plug = get_plug(node, attribute)
+        if isinstance(value, (list, tuple)):
+            for i, child_value in enumerate(value):
+                set_plug_value(self.modifier, plug.child(i), child_value)
+        else:
+            set_plug_value(self.modifier, plug, value)
+
+    def commit(self):
+        commit_modifier(self.modifier)
+
+
+# Array elements are given like "worldMatrix[0]" or "input1D[1]"
+def get_plug(node: om.MObject, attribute: str):
+    match = ARRAY_ELEMENT.match(attribute)
+    if match is None:
+        return om.MFnDependencyNode(node).findPlug(attribute, False)
+
+    plug = om.MFnDependencyNode(node).findPlug(match.group(1), False)
+    return plug.elementByLogicalIndex(int(match.group(2)))
@@ -0,0 +1,294 @@
+import json
+import os
+import time
+from functools import wraps
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from ..create_shelf import run_tool
+
+# cmds calls are grouped into these categories in the report,
+# commands not listed are reported under "other"
+CALL_CATEGORIES = {
+    "create": [
+        "createNode",
+        "shadingNode",
+        "spotLight",
+        "pointLight",
+        "directionalLight",
+        "ambientLight",
+        "camera",
+        "group",
+        "sets",
+        "duplicate",
+        "instance",
+    ],
+    "connect": ["connectAttr", "disconnectAttr", "defaultNavigation"],
+    "set": ["setAttr", "addAttr", "rename", "parent", "move", "rotate", "scale"],
+    "query": [
+        "getAttr",
+        "ls",
+        "objExists",
+        "listRelatives",
+        "listConnections",
+        "nodeType",
+        "attributeQuery",
+        "xform",
+    ],
+    "delete": ["delete"],
+}
+CALL_CATEGORY_BY_COMMAND = {
+    command: category
+    for category, commands in CALL_CATEGORIES.items()
+    for command in commands
+}
+
+# Frames evaluated before and after running the tool
+DEFAULT_FRAME_COUNT = 24
+
+
+# Times every maya.cmds call made while active, keyed by command name
+# Tools use cmds through the module, so the module's functions are wrapped
+# in place and restored on exit. Only the outermost call is timed,
+# commands that run Python which calls more commands count once.
+class CmdsCallTimer:
+    def __init__(self):
+        self.calls = {}  # command -> {"count": int, "seconds": float}
+        self.originals = {}
+        self.depth = 0
+
+    def __enter__(self):
+        for command in dir(cmds):
+            function = getattr(cmds, command)
+            if command.startswith("_") or not callable(function):
+                continue
+            self.originals[command] = function
+            setattr(cmds, command, self.wrap(command, function))
+
+        return self
+
+    def __exit__(self, *exc_info):
+        for command, function in self.originals.items():
+            setattr(cmds, command, function)
+        self.originals = {}
+        return False
+
+    def wrap(self, command: str, function):
+        @wraps(function)
+        def timed(*args, **kwargs):
+            if self.depth > 0:
+                return function(*args, **kwargs)
+
+            self.depth += 1
+            start_time = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.depth -= 1
+                call = self.calls.setdefault(command, {"count": 0, "seconds": 0.0})
+                call["count"] += 1
+                call["seconds"] += time.perf_counter() - start_time
+
+        return timed
+
+    @property
+    def total_seconds(self):
+        return sum(call["seconds"] for call in self.calls.values())
+
+    def get_categories(self):
+        categories = {}
+        for command, call in self.calls.items():
+            category = CALL_CATEGORY_BY_COMMAND.get(command, "other")
+            totals = categories.setdefault(category, {"count": 0, "seconds": 0.0})
+            totals["count"] += call["count"]
+            totals["seconds"] += call["seconds"]
+
+        return categories
+
+
+#################
+### Snapshots ###
+#################
+
+
+# Every node in the scene by hash code, and every connection as
+# (source plug, destination plug) names
+def take_scene_snapshot():
+    nodes = {}
+    connections = set()
+    node_iterator = om.MItDependencyNodes()
+    while not node_iterator.isDone():
+        node = node_iterator.thisNode()
+        handle = om.MObjectHandle(node)
+        nodes[handle.hashCode()] = handle
+        dependency_node = om.MFnDependencyNode(node)
+        for plug in dependency_node.getConnections():
+            for source in plug.connectedTo(True, False):
+                connections.add((source.name(), plug.name()))
+        node_iterator.next()
+
+    return {"nodes": nodes, "connections": connections}
+
+
+# What changed between two snapshots
+# Hash codes can be reused by new nodes, so a key only matches when the
+# earlier handle is still valid
+def diff_scene_snapshots(before: dict, after: dict):
+    created = [
+        handle
+        for key, handle in after["nodes"].items()
+        if key not in before["nodes"] or not before["nodes"][key].isValid()
+    ]
+    deleted_count = sum(
+        1 for handle in before["nodes"].values() if not handle.isValid()
+    )
+
+    created_by_type = {}
+    for handle in created:
+        node_type = om.MFnDependencyNode(handle.object()).typeName
+        created_by_type[node_type] = created_by_type.get(node_type, 0) + 1
+
+    connections_created = after["connections"] - before["connections"]
+    connections_removed = before["connections"] - after["connections"]
+    return {
+        "nodes_created": len(created),
+        "nodes_deleted": deleted_count,
+        "nodes_created_by_type": dict(sorted(created_by_type.items())),
+        "connections_created": len(connections_created),
+        "connections_removed": len(connections_removed),
+        "connections": sorted(connections_created),
+    }
+
+
+##################
+### Evaluation ###
+##################
+
+
+def get_frames(frame_count: int = DEFAULT_FRAME_COUNT):
+    start_frame = cmds.playbackOptions(q=True, minTime=True)
+    return [start_frame + i for i in range(frame_count)]
+
+
+# Evaluate each frame from a dirty graph and time it
+# The DG timer total covers DG evaluation, the wall time per frame also covers
+# the evaluation manager, whichever mode is active
+def measure_evaluation(frames: list):
+    current_frame = cmds.currentTime(q=True)
+    cmds.dgtimer(on=True, reset=True)
+    frame_seconds = []
+    try:
+        for frame in frames:
+            cmds.dgdirty(allPlugs=True)
+            start_time = time.perf_counter()
+            cmds.currentTime(frame, update=True)
+            frame_seconds.append(time.perf_counter() - start_time)
+    finally:
+        cmds.dgtimer(off=True)
+        dg_seconds = cmds.dgtimer(q=True)
+        cmds.currentTime(current_frame, update=True)
+
+    return {
+        "evaluation_mode": cmds.evaluationManager(q=True, mode=True)[0],
+        "frames": frames,
+        "frame_seconds": frame_seconds,
+        "mean_frame_seconds": sum(frame_seconds) / max(1, len(frame_seconds)),
+        "dg_timer_seconds": dg_seconds,
+    }
+
+
+#################
+### Profiling ###
+#################
+
+
+def get_default_output_path(label: str):
+    directory = os.path.join(cmds.internalVar(userAppDir=True), "maya_tools_profiles")
+    return os.path.join(directory, f"{label}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+
+
+# Run a shelf tool and report what it adds to the scene and what that costs
+# The report is written as JSON to output_path, next to a Maya profiler
+# recording of the run (.txt) that can be loaded in the Profiler window
+# Returns the report
+def profile_tool(
+    label: str,
+    output_path: str = None,
+    frame_count: int = DEFAULT_FRAME_COUNT,
+):
+    if output_path is None:
+        output_path = get_default_output_path(label)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    frames = get_frames(frame_count)
+    evaluation_before = measure_evaluation(frames)
+    snapshot_before = take_scene_snapshot()
+
+    cmds.profiler(reset=True)
+    cmds.profiler(sampling=True)
+    start_time = time.perf_counter()
+    try:
+        with CmdsCallTimer() as call_timer:
+            run_tool(label)
+    finally:
+        tool_seconds = time.perf_counter() - start_time
+        cmds.profiler(sampling=False)
+
+    profiler_path = os.path.splitext(output_path)[0] + ".txt"
+    cmds.profiler(output=profiler_path)
+
+    scene_changes = diff_scene_snapshots(snapshot_before, take_scene_snapshot())
+    evaluation_after = measure_evaluation(frames)
+
+    report = {
+        "tool": label,
+        "maya_version": cmds.about(version=True),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "tool_seconds": tool_seconds,
+        # Time spent outside cmds, e.g. in OpenMaya modifiers
+        "other_seconds": tool_seconds - call_timer.total_seconds,
+        "cmds_seconds": call_timer.total_seconds,
+        "cmds_categories": call_timer.get_categories(),
+        "cmds_calls": dict(sorted(call_timer.calls.items())),
+        "scene": scene_changes,
+        "evaluation_before": evaluation_before,
+        "evaluation_after": evaluation_after,
+        "profiler_recording": profiler_path,
+    }
+    with open(output_path, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+
+    print(
+        f"Profiled {label} in {tool_seconds * 1000:.1f}ms: "
+        f"{scene_changes['nodes_created']} nodes and "
+        f"{scene_changes['connections_created']} connections created, "
+        f"{evaluation_before['mean_frame_seconds'] * 1000:.2f}ms -> "
+        f"{evaluation_after['mean_frame_seconds'] * 1000:.2f}ms per frame. "
+        f"Report written to {output_path}"
+    )
+    return report
+
+
+# Compare two reports, e.g. of the same tool before and after a change
+# Returns the differences of the headline numbers, positive is a regression
+def compare_reports(baseline_path: str, report_path: str):
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(report_path) as report_file:
+        report = json.load(report_file)
+
+    return {
+        "tool_seconds": report["tool_seconds"] - baseline["tool_seconds"],
+        "nodes_created": (
+            report["scene"]["nodes_created"] - baseline["scene"]["nodes_created"]
+        ),
+        "connections_created": (
+            report["scene"]["connections_created"]
+            - baseline["scene"]["connections_created"]
+        ),
+        "mean_frame_seconds": (
+            report["evaluation_after"]["mean_frame_seconds"]
+            - baseline["evaluation_after"]["mean_frame_seconds"]
+        ),
+    }
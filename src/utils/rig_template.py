@@ -0,0 +1,465 @@
+import json
+import os
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from .handles import get_node_name
+from .light_builder import build_lights, set_attributes
+from .node_network import get_plug
+from .transaction import Transaction, commit_modifier
+
+# On-disk templates with another format version are captured again
+TEMPLATE_FORMAT = "maya_tools_rig_template"
+TEMPLATE_VERSION = 1
+
+# Attributes captured from every transform and shape,
+# user defined attributes are always captured
+TRANSFORM_ATTRIBUTES = ["translate", "rotate", "scale", "visibility"]
+LIGHT_ATTRIBUTES = [
+    "color",
+    "intensity",
+    "aiExposure",
+    "aiColorTemperature",
+    "aiUseColorTemperature",
+    "aiRadius",
+    "aiSamples",
+    "aiDiffuse",
+    "aiSpecular",
+    "aiSss",
+    "aiIndirect",
+    "aiVolume",
+    "aiMaxBounces",
+]
+SHAPE_ATTRIBUTES = {
+    "spotLight": LIGHT_ATTRIBUTES + ["coneAngle", "penumbraAngle", "dropoff"],
+    "camera": ["focalLength", "nearClipPlane", "farClipPlane", "orthographic"],
+}
+
+# addAttr attribute types that can be added again through the API
+NUMERIC_TYPES = {
+    "double": om.MFnNumericData.kDouble,
+    "float": om.MFnNumericData.kFloat,
+    "bool": om.MFnNumericData.kBoolean,
+    "long": om.MFnNumericData.kInt,
+}
+COMPOUND_TYPES = {"double3": "double", "float3": "float"}
+# Unit attributes, their values are captured and set in UI units
+UNIT_TYPES = {
+    "doubleAngle": om.MFnUnitAttribute.kAngle,
+    "doubleLinear": om.MFnUnitAttribute.kDistance,
+}
+
+# Templates loaded or captured this session, by name
+template_cache = {}
+
+
+###############
+### Capture ###
+###############
+
+
+# Describe the DAG hierarchies under roots as a template
+#
+# Each transform is one node record, with its shape if it has one:
+#   name, type: like light_builder specs, type is "transform" for groups
+#   parent: index of the parent record, None for roots
+#   transform_attributes, attributes: captured values of the transform and shape
+#   dynamic_attributes: {"transform": [...], "shape": [...]} user defined
+#   attribute definitions, their values are in the attribute dicts
+# Connections between the captured nodes are kept as
+# [source index, "transform" or "shape", attribute, destination index, ...]
+def capture_template(roots: list, name: str, tool_version: int = 1):
+    records = []
+    parts = {}  # node name -> (record index, "transform" or "shape")
+    for root in roots:
+        capture_hierarchy(get_node_name(root), None, records, parts)
+
+    connections = []
+    for node_name, (index, part) in parts.items():
+        # Unit conversion nodes are skipped, they are created again on connect
+        for destination, source in iterate_pairs(
+            cmds.listConnections(
+                node_name,
+                source=True,
+                destination=False,
+                connections=True,
+                plugs=True,
+                skipConversionNodes=True,
+            )
+        ):
+            source_node, _, source_attribute = source.partition(".")
+            # Plugs are named by their shortest unique path, parts by full path
+            source_path = (cmds.ls(source_node, long=True) or [None])[0]
+            if source_path not in parts:
+                continue
+            source_index, source_part = parts[source_path]
+            attribute = destination.partition(".")[2]
+            connections.append(
+                [source_index, source_part, source_attribute, index, part, attribute]
+            )
+            # Connected values come from the connection
+            records[index][ATTRIBUTE_KEYS[part]].pop(attribute, None)
+
+    return {
+        "format": TEMPLATE_FORMAT,
+        "version": TEMPLATE_VERSION,
+        "name": name,
+        "tool_version": tool_version,
+        "nodes": records,
+        "connections": connections,
+    }
+
+
+ATTRIBUTE_KEYS = {"transform": "transform_attributes", "shape": "attributes"}
+
+
+def capture_hierarchy(transform: str, parent: int, records: list, parts: dict):
+    shapes = cmds.listRelatives(transform, shapes=True, fullPath=True) or []
+    shape = shapes[0] if shapes else None
+    shape_type = cmds.nodeType(shape) if shape else "transform"
+
+    record = {
+        "name": transform.rpartition("|")[2].rpartition(":")[2],
+        "type": shape_type,
+        "parent": parent,
+        "transform_attributes": capture_attributes(transform, TRANSFORM_ATTRIBUTES),
+        "attributes": {},
+        "dynamic_attributes": {"transform": capture_dynamic_attributes(transform)},
+    }
+    record["transform_attributes"].update(
+        capture_dynamic_values(transform, record["dynamic_attributes"]["transform"])
+    )
+    index = len(records)
+    records.append(record)
+    parts[transform] = (index, "transform")
+
+    if shape is not None:
+        attributes = SHAPE_ATTRIBUTES.get(shape_type, LIGHT_ATTRIBUTES)
+        record["attributes"] = capture_attributes(shape, attributes)
+        record["dynamic_attributes"]["shape"] = capture_dynamic_attributes(shape)
+        record["attributes"].update(
+            capture_dynamic_values(shape, record["dynamic_attributes"]["shape"])
+        )
+        parts[shape] = (index, "shape")
+
+    children = cmds.listRelatives(
+        transform, children=True, fullPath=True, type="transform"
+    )
+    for child in children or []:
+        capture_hierarchy(child, index, records, parts)
+
+
+# Values left at their defaults are skipped, new nodes already have them
+def capture_attributes(node: str, attributes: list, skip_defaults: bool = True):
+    values = {}
+    for attribute in attributes:
+        if not cmds.attributeQuery(attribute, node=node, exists=True):
+            continue
+        value = cmds.getAttr(f"{node}.{attribute}")
+        # Compound values come back as a list of one tuple
+        if isinstance(value, list):
+            value = list(value[0])
+        if skip_defaults:
+            default = cmds.attributeQuery(attribute, node=node, listDefault=True)
+            if default == (value if isinstance(value, list) else [value]):
+                continue
+        values[attribute] = value
+
+    return values
+
+
+# Definitions of the top level user defined attributes of a node
+def capture_dynamic_attributes(node: str):
+    definitions = []
+    for attribute in cmds.listAttr(node, userDefined=True) or []:
+        if cmds.attributeQuery(attribute, node=node, listParent=True):
+            continue
+        attribute_type = cmds.attributeQuery(attribute, node=node, attributeType=True)
+        if (
+            attribute_type not in NUMERIC_TYPES
+            and attribute_type not in COMPOUND_TYPES
+            and attribute_type not in UNIT_TYPES
+        ):
+            raise ValueError(
+                f"{node}.{attribute} is a {attribute_type} attribute, "
+                "only numeric attributes can be templated"
+            )
+        definitions.append(
+            {
+                "name": attribute,
+                "type": attribute_type,
+                "children": cmds.attributeQuery(
+                    attribute, node=node, listChildren=True
+                )
+                or [],
+                "color": bool(
+                    cmds.attributeQuery(attribute, node=node, usedAsColor=True)
+                ),
+            }
+        )
+
+    return definitions
+
+
+# Added attributes are created with zero defaults, so every value is kept
+def capture_dynamic_values(node: str, definitions: list):
+    names = [definition["name"] for definition in definitions]
+    return capture_attributes(node, names, skip_defaults=False)
+
+
+def iterate_pairs(values: list):
+    values = values or []
+    return zip(values[::2], values[1::2])
+
+
+#####################
+### Instantiation ###
+#####################
+
+
+# Create one copy of the template per prefix, node names are prefixed
+# overrides: {template node name: {attribute: value}}, applied to every copy,
+#   set where the attribute was captured, transform attributes not captured
+#   go on the transform and anything else on the shape
+# parent: MObjectHandle or name the root nodes are parented under
+# Everything is built in three modifier passes however many copies are made:
+# nodes and values, then user defined attributes, then their values and the
+# connections. Returns one list of root transform handles per copy.
+def instantiate_template(
+    template: dict, prefixes: list = None, overrides: dict = None, parent=None
+):
+    prefixes = prefixes if prefixes is not None else [""]
+    overrides = overrides or {}
+    records = template["nodes"]
+
+    specs = []
+    for prefix in prefixes:
+        copy_specs = []
+        for record in records:
+            copy_specs.append(
+                get_record_spec(record, prefix, overrides, copy_specs, parent)
+            )
+        specs.extend(copy_specs)
+    results = build_lights(specs)
+
+    roots = []
+    dynamic_values = []
+    attribute_modifier = om.MDGModifier()
+    for copy_index in range(len(prefixes)):
+        copy_results = results[copy_index * len(records) :][: len(records)]
+        for record, result in zip(records, copy_results):
+            for part, definitions in record["dynamic_attributes"].items():
+                node = result[part].object()
+                for definition in definitions:
+                    attribute_modifier.addAttribute(
+                        node, create_dynamic_attribute(definition)
+                    )
+                values = get_dynamic_values(record, part, overrides)
+                dynamic_values.append((node, values))
+        roots.append(
+            [
+                result["transform"]
+                for record, result in zip(records, copy_results)
+                if record["parent"] is None
+            ]
+        )
+    # Added attributes only have plugs once the modifier is applied
+    commit_modifier(attribute_modifier)
+
+    value_modifier = om.MDGModifier()
+    for node, values in dynamic_values:
+        set_attributes(value_modifier, node, values)
+    for copy_index in range(len(prefixes)):
+        copy_results = results[copy_index * len(records) :][: len(records)]
+        for connection in template["connections"]:
+            source_index, source_part, source_attribute = connection[:3]
+            index, part, attribute = connection[3:]
+            source = copy_results[source_index][source_part].object()
+            destination = copy_results[index][part].object()
+            value_modifier.connect(
+                get_plug(source, source_attribute), get_plug(destination, attribute)
+            )
+
+    commit_modifier(value_modifier)
+    return roots
+
+
+# light_builder spec of one record, without the user defined attribute values
+def get_record_spec(
+    record: dict, prefix: str, overrides: dict, copy_specs: list, parent
+):
+    record_overrides = overrides.get(record["name"], {})
+    dynamic_names = get_dynamic_names(record)
+    spec = {"name": f"{prefix}{record['name']}", "type": record["type"]}
+    spec["parent"] = parent
+    if record["parent"] is not None:
+        spec["parent"] = copy_specs[record["parent"]]
+    for part, key in ATTRIBUTE_KEYS.items():
+        values = dict(record[key])
+        for attribute, value in record_overrides.items():
+            if get_override_part(record, attribute) == part:
+                values[attribute] = value
+        spec[key] = {
+            attribute: value
+            for attribute, value in values.items()
+            if attribute not in dynamic_names[part]
+        }
+
+    return spec
+
+
+def get_dynamic_names(record: dict):
+    names = {"transform": set(), "shape": set()}
+    for part, definitions in record["dynamic_attributes"].items():
+        for definition in definitions:
+            names[part].add(definition["name"])
+            names[part].update(definition["children"])
+
+    return names
+
+
+def get_dynamic_values(record: dict, part: str, overrides: dict):
+    dynamic_names = get_dynamic_names(record)[part]
+    values = {
+        attribute: value
+        for attribute, value in record[ATTRIBUTE_KEYS[part]].items()
+        if attribute in dynamic_names
+    }
+    for attribute, value in overrides.get(record["name"], {}).items():
+        if attribute in dynamic_names:
+            values[attribute] = value
+
+    return values
+
+
+def get_override_part(record: dict, attribute: str):
+    for part, names in get_dynamic_names(record).items():
+        if attribute in names:
+            return part
+    if attribute in record["attributes"]:
+        return "shape"
+    if (
+        attribute in record["transform_attributes"]
+        or attribute.rstrip("XYZ") in TRANSFORM_ATTRIBUTES
+        or record["type"] == "transform"
+    ):
+        return "transform"
+
+    return "shape"
+
+
+def create_dynamic_attribute(definition: dict):
+    name = definition["name"]
+    if definition["type"] in UNIT_TYPES:
+        unit_attribute = om.MFnUnitAttribute()
+        attribute = unit_attribute.create(name, name, UNIT_TYPES[definition["type"]])
+        unit_attribute.keyable = True
+        return attribute
+
+    numeric_attribute = om.MFnNumericAttribute()
+    if definition["type"] in COMPOUND_TYPES:
+        if definition["color"]:
+            attribute = numeric_attribute.createColor(name, name)
+        else:
+            child_type = NUMERIC_TYPES[COMPOUND_TYPES[definition["type"]]]
+            children = []
+            for child in definition["children"]:
+                children.append(numeric_attribute.create(child, child, child_type))
+                numeric_attribute.keyable = True
+            attribute = numeric_attribute.create(name, name, *children)
+    else:
+        attribute = numeric_attribute.create(
+            name, name, NUMERIC_TYPES[definition["type"]]
+        )
+
+    numeric_attribute.keyable = True
+    return attribute
+
+
+###############
+### Storage ###
+###############
+
+
+def get_template_path(name: str):
+    directory = os.path.join(cmds.internalVar(userAppDir=True), "maya_tools_templates")
+    return os.path.join(directory, f"{name}.json")
+
+
+def save_template(template: dict, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as template_file:
+        json.dump(template, template_file, separators=(",", ":"))
+
+
+# Returns None when there is no template at path, or it is out of date
+def load_template(path: str, tool_version: int = 1):
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as template_file:
+        try:
+            template = json.load(template_file)
+        except ValueError:
+            return None
+
+    if (
+        template.get("format") != TEMPLATE_FORMAT
+        or template.get("version") != TEMPLATE_VERSION
+        or template.get("tool_version") != tool_version
+    ):
+        return None
+
+    return template
+
+
+# Get the template of a rig tool, from this session, from disk, or else by
+# running build once, capturing what it created and deleting it again
+# Bump tool_version when the tool changes to capture it again
+def get_rig_template(name: str, build, tool_version: int = 1):
+    template = template_cache.get(name)
+    if template is not None and template["tool_version"] == tool_version:
+        return template
+
+    path = get_template_path(name)
+    template = load_template(path, tool_version)
+    if template is None:
+        template = capture_tool_template(name, build, tool_version)
+        save_template(template, path)
+
+    template_cache[name] = template
+    return template
+
+
+# Created nodes are tracked by a callback of its own, a Transaction nested in
+# another one joins it and tracks nothing
+# Raises a RuntimeError when build creates no DAG hierarchy, so no empty
+# template is ever saved
+def capture_tool_template(name: str, build, tool_version: int = 1):
+    created_handles = []
+    callback_id = om.MDGMessage.addNodeAddedCallback(
+        lambda node, client_data=None: created_handles.append(om.MObjectHandle(node))
+    )
+    try:
+        with Transaction(f"capture_{name}_template"):
+            build()
+    finally:
+        om.MMessage.removeCallback(callback_id)
+
+    created = {handle.hashCode() for handle in created_handles}
+    roots = []
+    for handle in created_handles:
+        node = handle.object()
+        if not handle.isValid() or not node.hasFn(om.MFn.kTransform):
+            continue
+        parent = om.MFnDagNode(node).parent(0)
+        if om.MObjectHandle(parent).hashCode() not in created:
+            roots.append(handle)
+    # cmds.delete with nothing to delete would delete the selection
+    if not roots:
+        raise RuntimeError(f"Building {name} created no nodes to capture")
+
+    template = capture_template(roots, name, tool_version)
+    cmds.delete([get_node_name(root) for root in roots])
+    return template
@@ -0,0 +1,221 @@
+from fnmatch import fnmatchcase
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from .callback_manager import is_registered, register_message_callback
+
+# String attribute the tools use to tag the nodes they create, e.g. with a light role
+TAG_ATTRIBUTE = "mayaToolsTag"
+
+# Scene events that replace every node, the index is dropped and rebuilt on next use
+# It is dropped before the old scene is torn down and the new one loaded, so its
+# callbacks do not run for every node of either
+DROP_EVENTS = [om.MSceneMessage.kBeforeNew, om.MSceneMessage.kBeforeOpen]
+# Sent once the new scene is complete
+LOADED_EVENTS = [om.MSceneMessage.kAfterNew, om.MSceneMessage.kAfterOpen]
+
+scene_index = None
+
+
+# Name, type and tag lookups of every node in the scene in O(1)
+#
+# The scene is walked once when the index is built, afterwards node
+# added/removed/renamed callbacks keep it current, so tools can look nodes up
+# without repeated ls/objExists scans. Lookups return MObjectHandles.
+class SceneIndex:
+    def __init__(self):
+        self.nodes = {}  # hash code -> (handle, name, type, tag)
+        self.by_name = {}
+        self.by_base_name = {}  # name without namespace
+        self.by_type = {}
+        self.by_tag = {}
+        self.callback_ids = []
+        self.build()
+        self.add_callbacks()
+
+    def build(self):
+        node_iterator = om.MItDependencyNodes()
+        while not node_iterator.isDone():
+            self.add_node(node_iterator.thisNode())
+            node_iterator.next()
+
+    def add_callbacks(self):
+        self.callback_ids = [
+            om.MDGMessage.addNodeAddedCallback(self.on_node_added),
+            om.MDGMessage.addNodeRemovedCallback(self.on_node_removed),
+            om.MNodeMessage.addNameChangedCallback(
+                om.MObject.kNullObj, self.on_name_changed
+            ),
+        ]
+
+    def remove_callbacks(self):
+        if self.callback_ids:
+            om.MMessage.removeCallbacks(self.callback_ids)
+        self.callback_ids = []
+
+    ###############
+    ### Updates ###
+    ###############
+
+    def add_node(self, node: om.MObject):
+        handle = om.MObjectHandle(node)
+        dependency_node = om.MFnDependencyNode(node)
+        name = dependency_node.name()
+        node_type = dependency_node.typeName
+        tag = get_tag(dependency_node)
+
+        self.nodes[handle.hashCode()] = (handle, name, node_type, tag)
+        add_to_lookup(self.by_name, name, handle)
+        add_to_lookup(self.by_base_name, get_base_name(name), handle)
+        add_to_lookup(self.by_type, node_type, handle)
+        if tag:
+            add_to_lookup(self.by_tag, tag, handle)
+
+    def remove_node(self, node: om.MObject):
+        hash_code = om.MObjectHandle(node).hashCode()
+        record = self.nodes.pop(hash_code, None)
+        if record is None:
+            return
+
+        _, name, node_type, tag = record
+        remove_from_lookup(self.by_name, name, hash_code)
+        remove_from_lookup(self.by_base_name, get_base_name(name), hash_code)
+        remove_from_lookup(self.by_type, node_type, hash_code)
+        if tag:
+            remove_from_lookup(self.by_tag, tag, hash_code)
+
+    def update_node(self, node: om.MObject):
+        self.remove_node(node)
+        self.add_node(node)
+
+    def on_node_added(self, node, client_data=None):
+        self.add_node(node)
+
+    def on_node_removed(self, node, client_data=None):
+        self.remove_node(node)
+
+    def on_name_changed(self, node, previous_name, client_data=None):
+        # Name changes also fire for nodes that are still being created
+        if om.MObjectHandle(node).hashCode() in self.nodes:
+            self.update_node(node)
+
+    ###############
+    ### Lookups ###
+    ###############
+
+    # Nodes with this name, including the namespace, e.g. "shot010:mainCharacter"
+    def find(self, name: str):
+        if "|" in name:
+            # Full DAG paths are resolved by Maya directly
+            selection = om.MSelectionList()
+            try:
+                selection.add(name)
+            except RuntimeError:
+                return []
+            return [om.MObjectHandle(selection.getDependNode(0))]
+
+        return get_valid_handles(self.by_name, name)
+
+    def find_one(self, name: str):
+        handles = self.find(name)
+        return handles[0] if handles else None
+
+    def exists(self, name: str):
+        return self.find_one(name) is not None
+
+    def find_by_type(self, node_type: str):
+        return get_valid_handles(self.by_type, node_type)
+
+    def find_by_tag(self, tag: str):
+        return get_valid_handles(self.by_tag, tag)
+
+    # Names matching a wildcard pattern in any namespace, like cmds.ls(recursive=True)
+    def match(self, pattern: str, node_type: str = None):
+        if not any(character in pattern for character in "*?["):
+            handles = get_valid_handles(self.by_base_name, pattern)
+        else:
+            names = [
+                name
+                for name in self.by_name
+                if fnmatchcase(get_base_name(name), pattern)
+                or fnmatchcase(name, pattern)
+            ]
+            handles = [handle for name in names for handle in self.find(name)]
+
+        if node_type is not None:
+            handles = [
+                handle
+                for handle in handles
+                if self.nodes[handle.hashCode()][2] == node_type
+            ]
+
+        return handles
+
+
+def add_to_lookup(lookup: dict, key: str, handle: om.MObjectHandle):
+    lookup.setdefault(key, {})[handle.hashCode()] = handle
+
+
+def remove_from_lookup(lookup: dict, key: str, hash_code: int):
+    handles = lookup.get(key)
+    if handles is None:
+        return
+
+    handles.pop(hash_code, None)
+    if not handles:
+        del lookup[key]
+
+
+def get_valid_handles(lookup: dict, key: str):
+    return [handle for handle in lookup.get(key, {}).values() if handle.isValid()]
+
+
+def get_base_name(name: str):
+    return name.rpartition(":")[2]
+
+
+def get_tag(dependency_node: om.MFnDependencyNode):
+    if not dependency_node.hasAttribute(TAG_ATTRIBUTE):
+        return None
+
+    return dependency_node.findPlug(TAG_ATTRIBUTE, False).asString() or None
+
+
+# Get the scene index, building it on first use
+def get_scene_index():
+    global scene_index
+    if scene_index is None:
+        scene_index = SceneIndex()
+        # Registered once per session, they outlive the index they drop
+        for event in DROP_EVENTS:
+            name = f"scene_index_drop_{event}"
+            if not is_registered(name):
+                register_message_callback(
+                    name,
+                    om.MSceneMessage.addCallback,
+                    event,
+                    drop_scene_index,
+                    deferred=False,
+                )
+
+    return scene_index
+
+
+def drop_scene_index():
+    global scene_index
+    if scene_index is not None:
+        scene_index.remove_callbacks()
+    scene_index = None
+
+
+# Tag a node so the tools can find it again, e.g. tag_node(light, "sun_beam")
+def tag_node(node_name: str, tag: str):
+    if not cmds.attributeQuery(TAG_ATTRIBUTE, node=node_name, exists=True):
+        cmds.addAttr(node_name, longName=TAG_ATTRIBUTE, dataType="string")
+    cmds.setAttr(f"{node_name}.{TAG_ATTRIBUTE}", tag, type="string")
+
+    if scene_index is not None:
+        handle = scene_index.find_one(node_name)
+        if handle is not None:
+            scene_index.update_node(handle.object())
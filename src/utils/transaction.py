@@ -0,0 +1,151 @@
+import os
+from functools import wraps
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from .handles import get_node_name
+
+# Plugin with the command that puts committed modifiers on the undo queue
+UNDO_PLUGIN_NAME = "undo_plugin"
+UNDO_COMMAND_NAME = "mayaToolsModifierUndo"
+
+# Modifiers waiting for the undo command to pick them up, see undo_plugin.py
+pending_modifiers = []
+# Transactions that are open, nested ones join the first
+active_transactions = []
+
+
+# Load the undo plugin once, returns whether its command is available
+def load_undo_plugin():
+    if cmds.pluginInfo(UNDO_PLUGIN_NAME, q=True, loaded=True):
+        return True
+
+    try:
+        cmds.loadPlugin(os.path.join(os.path.dirname(__file__), "undo_plugin.py"))
+    except RuntimeError:
+        cmds.warning("Could not load the undo plugin, API edits will not undo")
+        return False
+
+    return True
+
+
+# Apply a modifier so it undoes with the cmds edits around it
+# Without the undo plugin the modifier is applied outside of the undo queue,
+# an open transaction still undoes it when it rolls back
+def commit_modifier(modifier: om.MDGModifier):
+    modifier.doIt()
+    recorded = False
+    if cmds.undoInfo(q=True, state=True) and load_undo_plugin():
+        pending_modifiers.append(modifier)
+        try:
+            getattr(cmds, UNDO_COMMAND_NAME)()
+            recorded = not pending_modifiers
+        finally:
+            pending_modifiers.clear()
+
+    if active_transactions:
+        active_transactions[0].modifiers.append((modifier, recorded))
+
+
+# One undo step for everything done inside, rolled back when an error escapes
+#
+# Every node created while the transaction is open is tracked, whether by cmds
+# or by modifiers. On error the undo chunk is undone and whatever is left of the
+# tracked nodes is deleted, then the error is raised again.
+# With pause_undo=True nothing is recorded, which is faster for bulk builds,
+# but edits to nodes that existed before cannot be rolled back.
+class Transaction:
+    def __init__(self, name: str, pause_undo: bool = False):
+        self.name = name
+        self.pause_undo = pause_undo
+        self.modifiers = []  # (modifier, recorded on the undo queue)
+        self.created = []  # MObjectHandles
+        self.joined = False
+        self.undo_was_enabled = False
+        self.undo_name_before = None
+        self.callback_id = None
+
+    def __enter__(self):
+        if active_transactions:
+            # The outer transaction rolls back everything
+            self.joined = True
+            return self
+
+        self.undo_was_enabled = cmds.undoInfo(q=True, state=True)
+        if self.undo_was_enabled:
+            if self.pause_undo:
+                cmds.undoInfo(stateWithoutFlush=False)
+            else:
+                load_undo_plugin()
+                self.undo_name_before = cmds.undoInfo(q=True, undoName=True)
+                cmds.undoInfo(openChunk=True, chunkName=self.name)
+
+        self.callback_id = om.MDGMessage.addNodeAddedCallback(self.on_node_added)
+        active_transactions.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.joined:
+            return False
+
+        active_transactions.remove(self)
+        om.MMessage.removeCallback(self.callback_id)
+        if exc_type is None:
+            self.close_undo()
+        else:
+            self.rollback()
+
+        return False
+
+    def on_node_added(self, node: om.MObject, client_data=None):
+        self.created.append(om.MObjectHandle(node))
+
+    @property
+    def is_recording(self):
+        return self.undo_was_enabled and not self.pause_undo
+
+    def close_undo(self):
+        if not self.undo_was_enabled:
+            return
+
+        if self.pause_undo:
+            cmds.undoInfo(stateWithoutFlush=True)
+        else:
+            cmds.undoInfo(closeChunk=True)
+
+    # Maya drops an empty chunk, undoing then would undo the user's last action
+    # Call after the chunk is closed
+    def has_recorded(self):
+        if any(recorded for _, recorded in self.modifiers):
+            return True
+        return cmds.undoInfo(q=True, undoName=True) != self.undo_name_before
+
+    def rollback(self):
+        for modifier, recorded in reversed(self.modifiers):
+            if not recorded:
+                modifier.undoIt()
+
+        self.close_undo()
+        if self.is_recording and self.has_recorded():
+            cmds.undo()
+
+        # Nodes that were never on the undo queue
+        leftover_nodes = [
+            get_node_name(handle) for handle in self.created if handle.isValid()
+        ]
+        if leftover_nodes:
+            cmds.delete(leftover_nodes)
+
+
+# Run the decorated function in a Transaction, named after it by default
+def transactional(name: str = None, pause_undo: bool = False):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with Transaction(name or function.__name__, pause_undo):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,46 @@
+import maya.api.OpenMaya as om
+
+# Maya loads plugins as top level modules, where the package is imported by name
+if __package__:
+    from . import transaction
+else:
+    from maya_tools.src.utils import transaction
+
+
+def maya_useNewAPI():
+    pass
+
+
+# Puts the modifier last applied by transaction.commit_modifier on the undo
+# queue, so API edits undo and redo in order with the cmds edits around them
+class ModifierUndoCommand(om.MPxCommand):
+    def __init__(self):
+        om.MPxCommand.__init__(self)
+        self.modifier = None
+
+    @staticmethod
+    def creator():
+        return ModifierUndoCommand()
+
+    def doIt(self, args: om.MArgList):
+        # Already applied by commit_modifier
+        self.modifier = transaction.pending_modifiers.pop()
+
+    def redoIt(self):
+        self.modifier.doIt()
+
+    def undoIt(self):
+        self.modifier.undoIt()
+
+    def isUndoable(self):
+        return True
+
+
+def initializePlugin(plugin: om.MObject):
+    om.MFnPlugin(plugin, "maya_tools", "1.0").registerCommand(
+        transaction.UNDO_COMMAND_NAME, ModifierUndoCommand.creator
+    )
+
+
+def uninitializePlugin(plugin: om.MObject):
+    om.MFnPlugin(plugin).deregisterCommand(transaction.UNDO_COMMAND_NAME)
@@ -1,4 +1,4 @@
-from maya import cmds
+from maya_tools.src.utils.callback_manager import run_once_when_idle
 
 
 def setup():
@@ -8,4 +8,6 @@ def setup():
     add_or_update_custom_shelf()
 
 
-cmds.scriptJob(event=["NewSceneOpened", setup])
+# The shelf is set up once per session when Maya is first idle, sourcing this
+# again or opening scenes does not run it again
+run_once_when_idle("maya_tools_setup", setup)